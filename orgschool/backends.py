@@ -0,0 +1,63 @@
+"""
+Authentication backends for the OrgSchool project
+"""
+from django.conf import settings
+from django.contrib.auth import backends, get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+from .hashers import acheck_password, amake_password
+
+UserModel = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """
+    Drop the cached user; the next request loads it from the database.
+    """
+    cache.delete(user_cache_key(user_id))
+
+
+class ModelBackend(backends.ModelBackend):
+    """
+    Django's ModelBackend whose async authentication hashes on the hashing
+    pool (orgschool.hashers) instead of on the event loop, and which resolves
+    the session's user through the cache (for AUTH_USER_CACHE_TIMEOUT
+    seconds, 0 to turn it off). Saving, deleting or logging out a user drops
+    the cached copy (see schools.signals).
+    """
+
+    def get_user(self, user_id):
+        if not settings.AUTH_USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+        try:
+            user_id = UserModel._meta.pk.to_python(user_id)
+        except ValidationError:
+            return None
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so unknown emails take as long as wrong passwords
+            await amake_password(password)
+            return None
+        if await acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
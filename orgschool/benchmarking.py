@@ -0,0 +1,52 @@
+"""
+Helpers for the benchmark commands (`manage.py bench_*`)
+Timing with timeit and comparison of result files: keys ending in ``_us`` or
+``_ms`` are costs (lower is better), keys ending in ``_per_s`` are rates
+(higher is better); other values are context and are not compared.
+"""
+import timeit
+
+
+def time_us(func, repeat=5):
+    """
+    Microseconds per call of ``func``: enough calls per run to take about
+    0.2 s (timeit's autorange), the fastest of ``repeat`` runs.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return round(min(timer.repeat(repeat=repeat, number=number)) / number * 1e6, 1)
+
+
+def metrics(results, prefix=''):
+    """
+    Flatten nested results into ``{'group.key': value}`` for the compared keys.
+    """
+    flat = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(metrics(value, f'{path}.'))
+        elif isinstance(value, (int, float)) and key.endswith(('_us', '_ms', '_per_s')):
+            flat[path] = value
+    return flat
+
+
+def compare_results(baseline, current, threshold):
+    """
+    Compare two result dicts. Returns ``[(metric, baseline, current, change,
+    regressed)]`` for the metrics present in both, where ``change`` is the
+    relative change in the metric's own direction (positive is slower) and
+    ``regressed`` is true past ``threshold`` (0.1 = 10%).
+    """
+    before, after = metrics(baseline), metrics(current)
+    rows = []
+    for metric in sorted(before.keys() & after.keys()):
+        old, new = before[metric], after[metric]
+        if not old or not new:
+            continue
+        if metric.endswith('_per_s'):
+            change = old / new - 1
+        else:
+            change = new / old - 1
+        rows.append((metric, old, new, change, change > threshold))
+    return rows
@@ -0,0 +1,113 @@
+"""
+Password hashing policy for the OrgSchool project
+Hashers whose cost comes from settings, so it is a measured choice
+(`manage.py bench_auth`) rather than Django's default. Hashes made under an
+older policy are upgraded by Django on the next successful login, because
+``must_update`` compares each stored hash with the current cost.
+
+All hashing runs on a bounded thread pool (PASSWORD_HASH_WORKERS), so a burst
+of logins or registrations queues instead of running hundreds of hashes at
+once, and async code can wait for a hash without blocking the event loop.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def mark_worker():
+    _worker.active = True
+
+
+def get_hash_executor():
+    """
+    The process-wide hashing pool, created on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix='hash',
+                initializer=mark_worker,
+            )
+    return _executor
+
+
+def run_bounded(func, *args):
+    """
+    Run ``func`` on the hashing pool and wait for the result. hashlib and
+    argon2 release the GIL, so the pool hashes in parallel up to its size.
+    """
+    if getattr(_worker, 'active', False):
+        # Already on the pool (e.g. a check started by async code)
+        return func(*args)
+    return get_hash_executor().submit(func, *args).result()
+
+
+async def arun_bounded(func, *args):
+    """
+    Await ``func`` on the hashing pool without blocking the event loop.
+    """
+    return await asyncio.wrap_future(get_hash_executor().submit(func, *args))
+
+
+async def amake_password(password):
+    return await arun_bounded(hashers.make_password, password)
+
+
+async def acheck_password(user, raw_password):
+    """
+    ``user.check_password`` for async code. Django's own ``acheck_password``
+    hashes on the event loop; here the hash runs on the pool, and so does the
+    upgrade of a hash made under an older policy.
+    """
+    outdated = []
+    is_correct = await arun_bounded(hashers.check_password, raw_password, user.password, outdated.append)
+    if outdated:
+        user.password = await amake_password(raw_password)
+        await user.asave(update_fields=['password'])
+    return is_correct
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with PASSWORD_PBKDF2_ITERATIONS rounds. Keeps Django's
+    algorithm name, so existing hashes still verify.
+    """
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        # verify() and harden_runtime() hash through encode()
+        return run_bounded(super().encode, password, salt, iterations)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2id with the PASSWORD_ARGON2_* costs. Needs the optional argon2-cffi package.
+    """
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+    def encode(self, password, salt):
+        return run_bounded(super().encode, password, salt)
+
+    def verify(self, password, encoded):
+        return run_bounded(super().verify, password, encoded)
@@ -0,0 +1,154 @@
+"""
+Project-level middleware for the OrgSchool project
+Serves collected static assets with far-future caching and precompressed variants,
+and compresses dynamic responses according to Accept-Encoding.
+"""
+import gzip
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, responses are gzipped without it
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+
+
+def accepts_encoding(accept_encoding, coding):
+    """
+    Return True if the Accept-Encoding header allows ``coding`` (q > 0).
+    """
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() not in (coding, '*'):
+            continue
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        return not match or float(match.group(1)) > 0
+    return False
+
+
+class StaticAssetMiddleware:
+    """
+    Serve files from STATIC_ROOT straight from the app server.
+    Picks the ``.br``/``.gz`` variant written at build time according to the
+    request's Accept-Encoding, and marks content-hashed names as immutable.
+    Disabled in DEBUG, where the staticfiles dev server takes over.
+    """
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not getattr(settings, 'STATIC_ROOT', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.root = Path(settings.STATIC_ROOT).resolve()
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        """
+        Build the response for static file ``name``, or None if it is not collected.
+        """
+        path = (self.root / name).resolve()
+        if self.root not in path.parents or not path.is_file():
+            return None
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        encoding = None
+        for coding, suffix in self.encodings:
+            variant = path.with_name(path.name + suffix)
+            if accepts_encoding(accept_encoding, coding) and variant.is_file():
+                encoding, path = coding, variant
+                break
+
+        stat = path.stat()
+        etag = '"%x-%x%s"' % (int(stat.st_mtime), stat.st_size, '-' + encoding if encoding else '')
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(
+                path.open('rb'),
+                content_type=content_type or 'application/octet-stream',
+                filename=Path(name).name,
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if name in self.hashed_names else DEFAULT_CACHE_CONTROL
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress API and HTML responses of at least COMPRESSION_MIN_SIZE bytes:
+    brotli when it is installed and accepted, otherwise gzip.
+    HTML carries CSRF tokens, so it is only gzipped, with Django's random
+    padding against BREACH; brotli is used for the API formats.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.content_types = tuple(settings.COMPRESSION_CONTENT_TYPES)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(self.content_types):
+            return response
+        # Responses of any size vary: a larger body for the same URL would be compressed
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.min_size:
+            return response
+
+        coding = self.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), content_type)
+        if coding is None:
+            return response
+        compressed = self.compress(response.content, coding, content_type)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # The representation changed, so a strong validator would lie
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def choose_encoding(self, accept_encoding, content_type):
+        if brotli is not None and not content_type.startswith('text/html') and accepts_encoding(accept_encoding, 'br'):
+            return 'br'
+        if accepts_encoding(accept_encoding, 'gzip'):
+            return 'gzip'
+        return None
+
+    def compress(self, content, coding, content_type):
+        if coding == 'br':
+            return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        if content_type.startswith('text/html'):
+            return compress_string(content, max_random_bytes=100)
+        return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
@@ -0,0 +1,143 @@
+"""
+OpenAPI schema for the OrgSchool REST API
+Generates the drf_yasg schema once per code version and serves it from memory or disk.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecYaml
+from drf_yasg.renderers import OpenAPIRenderer, SwaggerJSONRenderer, SwaggerYAMLRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+# The renderers of the spec itself (?format=openapi is what the Swagger UI fetches)
+SPEC_RENDERERS = (OpenAPIRenderer, SwaggerJSONRenderer, SwaggerYAMLRenderer)
+
+API_INFO = openapi.Info(
+    title="OrgSchool API",
+    default_version='v1',
+    description="A comprehensive school management system API",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@orgschool.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+BaseSchemaView = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+# Source trees whose contents define the API, hashed when CODE_VERSION is not set
+VERSIONED_SOURCES = ('orgschool', 'restapi', 'schools')
+
+_code_version = None
+_documents = {}
+_lock = threading.Lock()
+
+
+def get_code_version():
+    """
+    Return the deployed code version: settings.CODE_VERSION (e.g. a git SHA)
+    or a digest of the project's Python sources, computed once per process.
+    """
+    global _code_version
+    if _code_version is None:
+        version = getattr(settings, 'CODE_VERSION', '')
+        if not version:
+            digest = hashlib.sha1()
+            for package in VERSIONED_SOURCES:
+                for path in sorted((Path(settings.BASE_DIR) / package).rglob('*.py')):
+                    digest.update(path.read_bytes())
+            version = digest.hexdigest()[:12]
+        _code_version = version
+    return _code_version
+
+
+def get_schema_format(renderer_class):
+    """
+    Map a drf_yasg spec renderer to the encoding it produces.
+    """
+    return 'yaml' if issubclass(renderer_class.codec_class, OpenAPICodecYaml) else 'json'
+
+
+def generate_schema():
+    """
+    Walk every viewset and serializer to build the full public schema.
+    """
+    generator = BaseSchemaView.generator_class(API_INFO)
+    return generator.get_schema(request=None, public=True)
+
+
+def get_schema_document(fmt):
+    """
+    Return ``(content, etag)`` for the encoded schema in ``fmt`` ('json' or 'yaml').
+    Looks in memory first, then in API_SCHEMA_DIR, and only generates on a miss.
+    """
+    key = (get_code_version(), fmt)
+    document = _documents.get(key)
+    if document is not None:
+        return document
+
+    with _lock:
+        document = _documents.get(key)
+        if document is None:
+            path = Path(settings.API_SCHEMA_DIR) / f'{key[0]}.{fmt}'
+            if path.exists():
+                content = path.read_bytes()
+            else:
+                content = write_schema_documents()[fmt]
+            document = (content, '"%s"' % hashlib.sha1(content).hexdigest()[:20])
+            _documents[key] = document
+    return document
+
+
+def write_schema_documents():
+    """
+    Generate the schema once, encode it in every format and store the files
+    in API_SCHEMA_DIR under the current code version. Returns the contents by format.
+    """
+    schema = generate_schema()
+    schema_dir = Path(settings.API_SCHEMA_DIR)
+    schema_dir.mkdir(parents=True, exist_ok=True)
+    contents = {}
+    for renderer_class in (SwaggerJSONRenderer, SwaggerYAMLRenderer):
+        fmt = get_schema_format(renderer_class)
+        contents[fmt] = renderer_class().render(schema)
+        path = schema_dir / f'{get_code_version()}.{fmt}'
+        temp_path = path.with_suffix(f'{path.suffix}.{os.getpid()}.tmp')
+        temp_path.write_bytes(contents[fmt])
+        temp_path.replace(path)  # Atomic, so concurrent workers never read a partial file
+    return contents
+
+
+class SchemaView(BaseSchemaView):
+    """
+    Schema view that serves the precomputed document with an ETag.
+    The Swagger/ReDoc shells still render normally; the spec they fetch is the cached one.
+    """
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, SPEC_RENDERERS):
+            return super().get(request, version, format)
+
+        content, etag = get_schema_document(get_schema_format(type(renderer)))
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+schema_json_view = SchemaView.without_ui()
+schema_swagger_view = SchemaView.with_ui('swagger')
+schema_redoc_view = SchemaView.with_ui('redoc')
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from decouple import config, Csv
 
@@ -50,11 +51,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'orgschool.middleware.CompressionMiddleware',
+    'orgschool.middleware.StaticAssetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'schools.middleware.TenantShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,6 +83,19 @@ TEMPLATES = [
 WSGI_APPLICATION = 'orgschool.wsgi.application'
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+
+# Cache shared by every process. Set CACHE_URL to a Redis server (redis://host:6379/0, needs the
+# redis package) when running more than one process: without it each process keeps its own
+# memory cache, and the session, user and tenant caches, which must agree across processes, stay off.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -97,6 +114,31 @@ DATABASES = {
     }
 }
 
+# Tenant sharding: database aliases that hold School/SClass/Student/Teacher rows.
+# Each extra alias is configured from <ALIAS>_DB_ENGINE, <ALIAS>_DB_NAME, <ALIAS>_DB_HOST, ...
+# and migrated with `manage.py migrate --database=<alias>`.
+TENANT_SHARDS = config('TENANT_SHARDS', default='default', cast=Csv())
+for _alias in TENANT_SHARDS:
+    if _alias not in DATABASES:
+        _prefix = _alias.upper()
+        _engine = config(f'{_prefix}_DB_ENGINE', default=DATABASES['default']['ENGINE'])
+        DATABASES[_alias] = dict(
+            DATABASES['default'],
+            ENGINE=_engine,
+            # The MySQL session options only apply to the same engine
+            OPTIONS=DATABASES['default']['OPTIONS'] if _engine == DATABASES['default']['ENGINE'] else {},
+            NAME=config(f'{_prefix}_DB_NAME'),
+            USER=config(f'{_prefix}_DB_USER', default=DATABASES['default']['USER']),
+            PASSWORD=config(f'{_prefix}_DB_PASSWORD', default=DATABASES['default']['PASSWORD']),
+            HOST=config(f'{_prefix}_DB_HOST', default=DATABASES['default']['HOST']),
+            PORT=config(f'{_prefix}_DB_PORT', default=DATABASES['default']['PORT']),
+        )
+# Tenant -> shard alias across requests, dropped by set_shard; 0 reads the mapping once per request
+TENANT_SHARD_CACHE_TIMEOUT = config('TENANT_SHARD_CACHE_TIMEOUT', default=300 if CACHE_URL else 0, cast=int)
+# request.tenant.schools across requests, dropped on School save/delete; 0 loads them once per request
+TENANT_SCHOOLS_CACHE_TIMEOUT = config('TENANT_SCHOOLS_CACHE_TIMEOUT', default=300 if CACHE_URL else 0, cast=int)
+DATABASE_ROUTERS = ['schools.sharding.TenantShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -116,6 +158,37 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+AUTHENTICATION_BACKENDS = ['orgschool.backends.ModelBackend']
+# request.user, dropped on Admin save/delete and logout; 0 loads it from the database on every request
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300 if CACHE_URL else 0, cast=int)
+
+# With a shared cache, sessions are read from it and written through to the
+# database, so a logged-in request needs no session query; 'django.contrib.sessions.backends.signed_cookies'
+# drops the table altogether. The session and user caches need CACHE_URL (checked by schools.checks).
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cached_db' if CACHE_URL else 'django.contrib.sessions.backends.db',
+)
+
+# Password hashing (orgschool.hashers). New passwords use PASSWORD_HASHER; hashes made
+# with another hasher or cost are upgraded on the next login. Measure with `manage.py bench_auth`.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')  # 'pbkdf2' or 'argon2' (needs argon2-cffi)
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=1000000, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)  # KiB
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=os.cpu_count() or 2, cast=int)  # Hashes run at once
+PASSWORD_HASHERS = [
+    'orgschool.hashers.PBKDF2PasswordHasher',
+    'orgschool.hashers.Argon2PasswordHasher',
+    # Verify only: older hashes are upgraded on login
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if PASSWORD_HASHER == 'argon2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -136,6 +209,33 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
+
+# Hashed file names plus build-time gzip/brotli variants (see `manage.py build_assets`)
+USE_ASSET_BUNDLES = config('USE_ASSET_BUNDLES', default=not DEBUG, cast=bool)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'orgschool.storage.CompressedManifestStaticFilesStorage' if USE_ASSET_BUNDLES
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# CSS/JS loaded by templates/schools/base.html, bundled in production
+ASSET_BUNDLES = {
+    'css': {
+        'output': 'bundles/orgschool.min.css',
+        'sources': ['main.css', 'style.css', 'style2.css', 'style3.css', 'style4.css'],
+    },
+    'js': {
+        'output': 'bundles/orgschool.min.js',
+        'sources': ['scripts/main.js', 'scripts/script.js'],
+    },
+}
 
 # Media files
 MEDIA_URL = '/media/'
@@ -155,7 +255,92 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_RENDERER_CLASSES': [
+        'restapi.renderers.FastJSONRenderer',  # orjson when installed
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'restapi.throttling.TenantRateThrottle',
+    ],
+    # Token buckets: per admin for each request kind, and one shared by everyone
+    'DEFAULT_THROTTLE_RATES': {
+        'read': config('THROTTLE_READ_RATE', default='1200/min'),
+        'write': config('THROTTLE_WRITE_RATE', default='300/min'),
+        'bulk': config('THROTTLE_BULK_RATE', default='30/min'),
+        'global': config('THROTTLE_GLOBAL_RATE', default='20000/min'),
+    },
+    # Reverse proxies in front of the site: anonymous clients are throttled by the
+    # X-Forwarded-For entry they added, not one the client sent (0: REMOTE_ADDR)
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
+# 'local' keeps buckets per process (limits scale with the worker count), 'cache' shares them
+API_THROTTLE_BACKEND = config('API_THROTTLE_BACKEND', default='local')
+API_THROTTLE_CACHE = 'default'
+
+# MessagePack (Accept / Content-Type: application/msgpack) when the optional msgpack package is installed
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'restapi.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('restapi.parsers.MessagePackParser')
+
+# Admin changelists use the database's row estimate instead of COUNT(*) past this many rows
+ADMIN_COUNT_ESTIMATE_THRESHOLD = config('ADMIN_COUNT_ESTIMATE_THRESHOLD', default=100000, cast=int)
+
+# Response compression (orgschool.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = 1024  # Smaller bodies gain little and cost CPU
+COMPRESSION_CONTENT_TYPES = [
+    'application/json', 'application/openapi+json', 'application/yaml', 'application/msgpack',
+    'text/html', 'text/css', 'text/plain', 'application/javascript',
+]
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4  # Dynamic responses: fast levels, static assets use 11 at build time
+
+# OpenAPI schema, generated once per code version (see `manage.py build_api_schema`)
+CODE_VERSION = config('CODE_VERSION', default='')
+API_SCHEMA_DIR = config('API_SCHEMA_DIR', default=str(BASE_DIR / 'var' / 'openapi'))
+
+# Delta-sync feed (/api/v1/sync/)
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 5  # Changes younger than this wait for the next sync
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=90, cast=int)  # Older tokens must resync in full
+
+# Batch requests (/api/v1/batch/)
+BATCH_MAX_REQUESTS = 20  # Sub-requests per batch
+BATCH_READ_WORKERS = config('BATCH_READ_WORKERS', default=4, cast=int)  # Threads for concurrent reads; 1 runs them in turn
+
+# Live change events (/api/v1/events/, served by the ASGI application)
+# 'local' streams events within one process; 'cache' shares them through EVENTS_CACHE
+# (a cache backend every process reaches, the default with CACHE_URL); or the dotted path of a broadcaster class.
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='cache' if CACHE_URL else 'local')
+EVENTS_CACHE = 'default'
+EVENTS_CACHE_TIMEOUT = 3600  # Seconds the cache backend keeps events for replay
+EVENTS_POLL_INTERVAL = config('EVENTS_POLL_INTERVAL', default=0.5, cast=float)  # Cache backend delivery delay
+EVENTS_BUFFER = 1000  # Recent events per admin a reconnecting stream can replay
+EVENTS_QUEUE_SIZE = 1000  # Events a slow stream may fall behind before it is closed
+EVENTS_HEARTBEAT = 15  # Seconds between keep-alive comments on an idle stream
+EVENTS_RETRY_MS = 3000  # Client reconnect delay
+
+# Automatic class assignment (/api/v1/schools/<id>/assign/)
+CLASS_TARGET_SIZE = config('CLASS_TARGET_SIZE', default=30, cast=int)  # Classes are not filled past this
+ASSIGN_MAX_STUDENTS = 50000  # Students one request can place
+
+# Attendance rates (/api/v1/attendance/)
+ATTENDANCE_MAX_RANGE_DAYS = 366  # Longest date range one request aggregates
+
+# Background jobs (`manage.py run_workers`)
+JOB_WORKERS = config('JOB_WORKERS', default=4, cast=int)
+JOB_POOL = config('JOB_POOL', default='thread')  # 'thread' or 'process'
+JOB_POLL_SECONDS = 1.0
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30  # Seconds before the first retry, doubled on each attempt
+JOB_LEASE_SECONDS = 300  # A running job without progress for this long is picked up again
+
+# Class roster report bundles (the class_reports job)
+REPORT_WORKERS = config('REPORT_WORKERS', default=os.cpu_count() or 2, cast=int)  # Processes rendering documents
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
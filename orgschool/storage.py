@@ -0,0 +1,49 @@
+"""
+Static files storage for the OrgSchool project
+Adds build-time gzip/brotli variants on top of Django's manifest storage.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants are always produced
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (content-hashed file names) that also writes
+    precompressed ``.gz`` and ``.br`` siblings for every hashed text asset,
+    so the app server never compresses static files per request.
+    """
+    compress_extensions = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+    compress_min_size = 512  # Smaller files are not worth a second round trip of headers
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(self.compress_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        """
+        Write the compressed variants of ``name`` that are smaller than the original.
+        """
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < self.compress_min_size:
+            return
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
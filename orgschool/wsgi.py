@@ -7,10 +7,19 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orgschool.settings')
 
 application = get_wsgi_application()
+
+if settings.EVENTS_BACKEND == 'local' and settings.CACHE_URL:
+    # A shared cache means several processes; the ASGI ones streaming events never see events published here
+    logging.getLogger(__name__).warning(
+        "EVENTS_BACKEND is 'local': changes made through WSGI workers do not reach the ASGI event streams. "
+        "Unset EVENTS_BACKEND to share events through CACHE_URL."
+    )
@@ -0,0 +1,182 @@
+"""
+Batch requests for the REST API
+Runs a list of sub-requests through the regular URL router and views inside
+one HTTP request, with the caller's session, tenant and shard. Consecutive
+reads run concurrently on a small thread pool; writes run one at a time in
+order. An atomic batch runs everything in order in one transaction per
+database and rolls back at the first failure.
+"""
+import contextvars
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = {'GET'}
+
+
+class BatchFailed(Exception):
+    """
+    Raised inside an atomic batch to roll it back.
+    """
+
+
+def resolve_api_view(path):
+    """
+    The resolver match for ``path`` if it is served by a REST framework view
+    of this API, else None. The batch endpoint itself and plain Django views
+    (the event stream, the browsable API login) are not reachable.
+    """
+    if not path.startswith('/api/'):
+        return None
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None or getattr(view_class, 'batchable', True) is False:
+        return None
+    return match
+
+
+def sub_request(request, method, path, body):
+    """
+    A request for ``path`` that shares the authentication of the batch
+    ``request`` (a REST framework Request). ``body`` is sent as JSON, and
+    responses are negotiated to the batch's own renderer.
+    """
+    path, _, query = path.partition('?')
+    content = b'' if body is None else json.dumps(body, cls=DjangoJSONEncoder).encode()
+    outer = request._request
+    inner = HttpRequest()
+    inner.method = method
+    inner.path = inner.path_info = path
+    inner.META = {
+        **outer.META,
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_ACCEPT': request.accepted_renderer.media_type,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(content)),
+    }
+    inner.GET = QueryDict(query)
+    inner.COOKIES = outer.COOKIES
+    inner._stream = io.BytesIO(content)
+    inner._read_started = False
+    inner.user = request.user
+    inner.session = outer.session
+    inner.tenant = outer.tenant
+    # The batch request itself passed the CSRF check
+    inner._dont_enforce_csrf_checks = True
+    return inner
+
+
+def run_one(request, entry):
+    """
+    Run one sub-request and return ``{'status', 'body'}``.
+    """
+    match = resolve_api_view(entry['path'].partition('?')[0])
+    if match is None:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+    inner = sub_request(request, entry['method'], entry['path'], entry.get('body'))
+    inner.resolver_match = match
+    response = match.func(inner, *match.args, **match.kwargs)
+    # Views answering with something else than data (e.g. file downloads) report their status only
+    return {'status': response.status_code, 'body': response.data if isinstance(response, Response) else None}
+
+
+def run_logged(request, entry):
+    try:
+        return run_one(request, entry)
+    except Exception:
+        # Views handle API errors themselves; anything else is a bug in the view
+        logger.exception('Batch sub-request %s %s failed', entry['method'], entry['path'])
+        return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'detail': 'A server error occurred.'}}
+
+
+def run_in_thread(context, request, entry):
+    """
+    Run a sub-request on a pool thread with the caller's context (the tenant
+    shard), closing the connections the thread opened.
+    """
+    try:
+        return context.run(run_logged, request, entry)
+    finally:
+        connections.close_all()
+
+
+def read_groups(entries):
+    """
+    Split ``entries`` into runs of consecutive reads and single writes, in order.
+    """
+    groups = []
+    for entry in entries:
+        if entry['method'] in READ_METHODS and groups and groups[-1][0]['method'] in READ_METHODS:
+            groups[-1].append(entry)
+        else:
+            groups.append([entry])
+    return groups
+
+
+def run_batch(request, entries):
+    """
+    Run ``entries`` (``{'method', 'path', 'body'}`` dicts) in order, reads
+    between two writes concurrently. Returns one ``{'status', 'body'}`` per entry.
+    """
+    results = []
+    with ExitStack() as stack:
+        executor = None
+        for group in read_groups(entries):
+            if len(group) == 1 or settings.BATCH_READ_WORKERS < 2:
+                results.extend(run_logged(request, entry) for entry in group)
+                continue
+            if executor is None:
+                # Resolve the tenant's schools once, not in every thread
+                if request._request.tenant is not None:
+                    request._request.tenant.school_ids
+                executor = stack.enter_context(ThreadPoolExecutor(max_workers=settings.BATCH_READ_WORKERS))
+            # One copy of the caller's context per thread: a context cannot be entered twice at once
+            contexts = [contextvars.copy_context() for _ in group]
+            results.extend(executor.map(run_in_thread, contexts, [request] * len(group), group))
+    return results
+
+
+def run_atomic_batch(request, entries):
+    """
+    Run ``entries`` one after another in one transaction on the default
+    database and on the tenant's shard. The first sub-request answering with
+    an error status rolls everything back and the remaining ones are not run.
+    Returns ``(results, committed)``.
+    """
+    aliases = {DEFAULT_DB_ALIAS}
+    if request._request.tenant is not None:
+        aliases.add(request._request.tenant.using)
+    results = []
+    try:
+        with ExitStack() as stack:
+            for alias in sorted(aliases):
+                stack.enter_context(transaction.atomic(using=alias))
+            for entry in entries:
+                result = run_logged(request, entry)
+                results.append(result)
+                if result['status'] >= 400:
+                    raise BatchFailed
+    except BatchFailed:
+        skipped = {
+            'status': status.HTTP_424_FAILED_DEPENDENCY,
+            'body': {'detail': 'Not run: an earlier request failed and the batch was rolled back.'},
+        }
+        return results + [skipped] * (len(entries) - len(results)), False
+    return results, True
@@ -0,0 +1,234 @@
+"""
+Management command to microbenchmark serializers, forms and tenant querysets
+against a generated dataset in an in-memory SQLite database
+"""
+import json
+import platform
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from orgschool.benchmarking import compare_results, time_us
+from restapi.serializers import SClassSerializer, StudentSerializer, TeacherSerializer
+from schools.forms import StudentForm, TeacherForm
+from schools.models import School, SClass, Student, Teacher
+from schools.sharding import use_shard
+from schools.sync import changes_since
+from schools.tenancy import Tenant
+
+ALIAS = 'bench'
+TENANT_CLASSES = 40  # Classes of the benchmark tenant, which the forms list
+PAGE_SIZE = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+
+def add_memory_database(alias):
+    """
+    Register and migrate an in-memory SQLite database under ``alias``.
+    The router treats it like a shard: it holds the tenant models only.
+    """
+    connections.settings[alias] = connections.configure_settings({
+        DEFAULT_DB_ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    })[DEFAULT_DB_ALIAS]
+    call_command('migrate', database=alias, verbosity=0)
+
+
+def create_dataset(rows):
+    """
+    One tenant with a school of TENANT_CLASSES classes holding ``rows``
+    students and ``rows`` teachers, and a second school with ``rows`` classes
+    for the class serializer. Rows are dated an hour back so the change feed
+    (which skips the last SYNC_SETTLE_SECONDS) returns them.
+    Must run under use_shard(). Returns the tenant's admin id.
+    """
+    admin_id = uuid.uuid4()  # Ids only: no Admin row is needed on a shard
+    school = School.objects.create(name='Bench School', admin_id=admin_id)
+    classes = SClass.objects.bulk_create(
+        SClass(name=f'Class {i:02d}', school=school) for i in range(TENANT_CLASSES)
+    )
+    Student.objects.bulk_create(
+        (
+            Student(name=f'Student {i:05d}', age=6 + i % 12, sclass=classes[i % TENANT_CLASSES], admin_id=admin_id)
+            for i in range(rows)
+        ),
+        batch_size=1000,
+    )
+    Teacher.objects.bulk_create(
+        (
+            Teacher(name=f'Teacher {i:05d}', sclass=classes[i % TENANT_CLASSES], admin_id=admin_id)
+            for i in range(rows)
+        ),
+        batch_size=1000,
+    )
+    other = School.objects.create(name='Bench Classes', admin_id=uuid.uuid4())
+    SClass.objects.bulk_create(
+        (SClass(name=f'Class {i:05d}', school=other) for i in range(rows)),
+        batch_size=1000,
+    )
+    earlier = timezone.now() - timedelta(hours=1)
+    for model in (SClass, Student, Teacher):
+        model.objects.update(created_at=earlier, updated_at=earlier)
+    return admin_id
+
+
+def bench_serializers(sizes, repeat):
+    """
+    Serializing already fetched rows, as list endpoints do after the query.
+    """
+    students = list(Student.objects.select_related('sclass__school').order_by('pk')[:max(sizes)])
+    teachers = list(Teacher.objects.select_related('sclass__school').order_by('pk')[:max(sizes)])
+    classes = list(SClass.objects.select_related('school').with_counts().order_by('pk')[:max(sizes)])
+    results = {}
+    for rows in sizes:
+        results[f'{rows}_rows'] = {
+            'student_us': time_us(lambda: StudentSerializer(students[:rows], many=True).data, repeat),
+            'teacher_us': time_us(lambda: TeacherSerializer(teachers[:rows], many=True).data, repeat),
+            'sclass_us': time_us(lambda: SClassSerializer(classes[:rows], many=True).data, repeat),
+        }
+    return results
+
+
+def bench_forms(admin_id, repeat):
+    """
+    Building the create forms (tenant-filtered class queryset and crispy
+    helper) and listing the class choices, which runs the queryset. The
+    tenant's schools are loaded once beforehand, as in a request, so the
+    forms are timed with or without the cross-request schools cache.
+    """
+    tenant = Tenant(admin_id, ALIAS)
+    tenant.schools
+    results = {}
+    for name, form_class in (('student', StudentForm), ('teacher', TeacherForm)):
+        def build():
+            form = form_class(tenant=tenant)
+            form.helper
+            return form
+        results[f'{name}_form_us'] = time_us(build, repeat)
+        results[f'{name}_choices_us'] = time_us(lambda: list(build().fields['sclass'].choices), repeat)
+    return results
+
+
+def bench_querysets(admin_id, repeat):
+    """
+    The queries behind the main tenant pages and endpoints, fetched in full.
+    """
+    tenant = Tenant(admin_id, ALIAS)
+    classes = SClass.objects.filter(school_id__in=tenant.school_ids)
+    sclass = classes.order_by('name').first()
+    students = Student.objects.filter(admin_id=admin_id).select_related('sclass__school').order_by('pk')
+
+    def student_page():
+        students.count()
+        return list(students[PAGE_SIZE:PAGE_SIZE * 2])
+
+    return {
+        'class_list_us': time_us(lambda: list(classes.with_counts()), repeat),
+        'student_page_us': time_us(student_page, repeat),
+        'student_search_us': time_us(lambda: list(students.filter(name__startswith='Student 001')[:PAGE_SIZE]), repeat),
+        'class_roster_us': time_us(
+            lambda: list(Student.objects.filter(sclass=sclass).select_related('sclass__school').order_by('name', 'id')[:PAGE_SIZE]),
+            repeat,
+        ),
+        'changes_us': time_us(lambda: changes_since(admin_id, None, settings.SYNC_PAGE_SIZE), repeat),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark serializers, forms and tenant querysets on an in-memory SQLite dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Row counts for the serializer benchmarks; the largest also sizes the dataset'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement; the fastest is kept'
+        )
+        parser.add_argument(
+            '--output',
+            default=str(Path(settings.BASE_DIR) / 'var' / 'bench_micro.json'),
+            help='Where to write the results (compare two runs with compare_bench)'
+        )
+        parser.add_argument(
+            '--budget',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'micro.json'),
+            help='Budget file to check against or update'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Write the current measurements as the new budget'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.5,
+            help='Allowed slowdown over the budget before a measurement is flagged'
+        )
+
+    def handle(self, *args, **options):
+        budget_path = Path(options['budget'])
+        budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+        sizes = sorted(set(options['sizes']))
+        repeat = options['repeat']
+
+        add_memory_database(ALIAS)
+        with use_shard(ALIAS):
+            admin_id = create_dataset(max(sizes))
+            results = {
+                'meta': {
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'rows': max(sizes),
+                    'classes': TENANT_CLASSES,
+                },
+                'serializers': bench_serializers(sizes, repeat),
+                'forms': bench_forms(admin_id, repeat),
+                'querysets': bench_querysets(admin_id, repeat),
+            }
+
+        for group, values in results.items():
+            self.stdout.write(f'{group}:')
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    for name, us in value.items():
+                        self.stdout.write(f'  {key} {name:<14} {us:12.1f} us')
+                else:
+                    self.stdout.write(f'  {key:<19} {value}' if group == 'meta' else f'  {key:<19} {value:12.1f} us')
+
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2) + '\n')
+
+        if options['update']:
+            budget_path.parent.mkdir(parents=True, exist_ok=True)
+            budget_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Updated budget {budget_path}'))
+            return
+        if budget.get('meta', {}).get('rows', max(sizes)) != max(sizes):
+            self.stdout.write(self.style.WARNING(
+                f"The budget was measured on {budget['meta']['rows']} rows, not checking it"
+            ))
+            return
+        failures = [
+            f'{metric} {new} us exceeds budget {old} us'
+            for metric, old, new, _, regressed in compare_results(budget, results, options['tolerance'])
+            if regressed
+        ]
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} microbenchmark budget violation(s)')
+        self.stdout.write(self.style.SUCCESS('Microbenchmarks within budget'))
@@ -0,0 +1,146 @@
+"""
+Management command to measure API response rendering and compression cost
+"""
+import gzip
+import json
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from orgschool.middleware import brotli
+from restapi.renderers import FastJSONRenderer
+from restapi.serializers import StudentSerializer
+from schools.models import School, SClass, Student
+
+RENDERERS = {
+    'drf': JSONRenderer,
+    'fast': FastJSONRenderer,
+}
+
+
+def best_time(func, repeat, number=1):
+    """
+    Fastest wall time per call to ``func``, in microseconds, over ``repeat``
+    runs of ``number`` calls each.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+def student_page(rows):
+    """
+    A students list response body with ``rows`` results, built without the database.
+    """
+    now = timezone.now()
+    admin_id = uuid.uuid4()  # Ids only: assigning an Admin instance asks the router for its shard
+    school = School(name='Bench School', admin_id=admin_id)
+    sclasses = [SClass(name=f'Class 0{i}', school=school) for i in range(1, 5)]
+    students = [
+        Student(
+            id=uuid.uuid4(), name=f'Student {i:05d}', age=6 + i % 12, sclass=sclasses[i % 4],
+            admin_id=admin_id, created_at=now, updated_at=now,
+        )
+        for i in range(rows)
+    ]
+    return {
+        'count': rows,
+        'next': None,
+        'previous': None,
+        'results': StudentSerializer(students, many=True).data,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Time JSON rendering and gzip/brotli compression for 20- and 1000-row student lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'responses.json'),
+            help='Budget file to check against or update'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Write the current measurements as the new budget'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Runs per measurement; the fastest is kept'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.5,
+            help='Allowed growth of render and compression time over the budget'
+        )
+        parser.add_argument(
+            '--floor',
+            type=float,
+            default=20.0,
+            help='Growth in microseconds that is never flagged, whatever the tolerance'
+        )
+
+    def exceeds(self, us, allowed, options):
+        return us - allowed > max(allowed * options['tolerance'], options['floor'])
+
+    def handle(self, *args, **options):
+        budget_path = Path(options['budget'])
+        budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+        repeat = options['repeat']
+        results = {}
+        failures = []
+
+        for rows in (20, 1000):
+            data = student_page(rows)
+            # Time the small page over many calls per run, single calls are too close to timer noise
+            number = max(1, 1000 // rows)
+            result = {}
+            for name, renderer_class in RENDERERS.items():
+                renderer = renderer_class()
+                result[f'render_{name}_us'] = round(best_time(lambda: renderer.render(data), repeat, number), 1)
+            body = FastJSONRenderer().render(data)
+            result['identity_bytes'] = len(body)
+
+            codings = {'gzip': lambda: gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)}
+            if brotli is not None:
+                codings['br'] = lambda: brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            for coding, compress in codings.items():
+                result[f'{coding}_bytes'] = len(compress())
+                result[f'{coding}_us'] = round(best_time(compress, repeat, number), 1)
+            if len(body) < settings.COMPRESSION_MIN_SIZE:
+                result['note'] = 'below COMPRESSION_MIN_SIZE, sent uncompressed'
+            results[f'{rows}_rows'] = result
+
+            self.stdout.write(f'{rows} rows:')
+            for key, value in result.items():
+                self.stdout.write(f'  {key:<18} {value}')
+
+            allowed = budget.get(f'{rows}_rows', {})
+            for key, value in result.items():
+                if key.endswith('_us') and key in allowed and self.exceeds(value, allowed[key], options):
+                    failures.append(f'{rows} rows: {key} {value} exceeds budget {allowed[key]}')
+
+        if options['update']:
+            budget_path.parent.mkdir(parents=True, exist_ok=True)
+            budget_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Updated budget {budget_path}'))
+            return
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} response budget violation(s)')
+        self.stdout.write(self.style.SUCCESS('Response rendering within budget'))
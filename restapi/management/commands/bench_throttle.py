@@ -0,0 +1,103 @@
+"""
+Management command to measure the per-request cost of the API throttle
+"""
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from restapi import throttling
+from schools.models import Admin
+
+
+class BenchView(APIView):
+    pass
+
+
+class BenchThrottle(throttling.TenantRateThrottle):
+    """
+    Rates high enough that every check takes the full accept path.
+    """
+    def get_rates(self):
+        return {'read': '1000000/s', 'global': '1000000/s'}
+
+
+class Command(BaseCommand):
+    help = 'Time TenantRateThrottle.allow_request per bucket backend and check it against the budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'throttle.json'),
+            help='Budget file to check against or update'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Write the current measurements as the new budget'
+        )
+        parser.add_argument(
+            '--checks',
+            type=int,
+            default=20000,
+            help='Throttle checks per backend; the best of 5 runs is kept'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.5,
+            help='Allowed growth over the budget'
+        )
+
+    def handle(self, *args, **options):
+        budget_path = Path(options['budget'])
+        budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+
+        # Unsaved admins: the throttle only reads the primary key
+        users = [Admin(email=f'bench{i}@example.com') for i in range(100)] + [AnonymousUser()]
+        requests = []
+        factory = APIRequestFactory()
+        view = BenchView()
+        for i, user in enumerate(users):
+            request = view.initialize_request(factory.get('/api/v1/students/', REMOTE_ADDR=f'10.0.0.{i % 250}'))
+            request.user = user
+            requests.append(request)
+
+        results = {}
+        failures = []
+        original = throttling._buckets
+        try:
+            for backend, buckets in (('local', throttling.LocalBuckets()), ('cache', throttling.CacheBuckets(settings.API_THROTTLE_CACHE))):
+                throttling._buckets = buckets
+                throttle = BenchThrottle()
+                best = None
+                for _ in range(5):
+                    start = time.perf_counter()
+                    for i in range(options['checks']):
+                        throttle.allow_request(requests[i % len(requests)], view)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                us = round(best / options['checks'] * 1e6, 2)
+                results[backend] = {'us_per_check': us}
+                self.stdout.write(f'{backend:<6} {us:8.2f} us per check')
+                allowed = budget.get(backend, {}).get('us_per_check')
+                if allowed is not None and us > allowed * (1 + options['tolerance']):
+                    failures.append(f'{backend}: {us} us per check exceeds budget {allowed} us')
+        finally:
+            throttling._buckets = original
+
+        if options['update']:
+            budget_path.parent.mkdir(parents=True, exist_ok=True)
+            budget_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Updated budget {budget_path}'))
+            return
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} throttle budget violation(s)')
+        self.stdout.write(self.style.SUCCESS('Throttle checks within budget'))
@@ -0,0 +1,20 @@
+"""
+Management command to precompute the OpenAPI schema for the current code version
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orgschool.schema import get_code_version, write_schema_documents
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema once and store it in API_SCHEMA_DIR'
+
+    def handle(self, *args, **options):
+        contents = write_schema_documents()
+        for fmt, content in contents.items():
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Wrote {settings.API_SCHEMA_DIR}/{get_code_version()}.{fmt} ({len(content)} bytes)'
+                )
+            )
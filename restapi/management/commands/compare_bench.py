@@ -0,0 +1,55 @@
+"""
+Management command to compare two benchmark result files
+"""
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orgschool.benchmarking import compare_results
+
+
+class Command(BaseCommand):
+    help = 'Compare two benchmark result files (e.g. from bench_micro) and flag regressions past a threshold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Earlier results')
+        parser.add_argument('current', help='Results to check')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.1,
+            help='Relative slowdown flagged as a regression (0.1 = 10%%)'
+        )
+
+    def handle(self, *args, **options):
+        files = {}
+        for name in ('baseline', 'current'):
+            try:
+                files[name] = json.loads(Path(options[name]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options[name]}: {exc}')
+
+        # Results from different datasets or versions are not comparable one to one
+        before, after = files['baseline'].get('meta', {}), files['current'].get('meta', {})
+        for key in sorted(before.keys() & after.keys()):
+            if before[key] != after[key]:
+                self.stdout.write(self.style.WARNING(f'meta.{key} differs: {before[key]} -> {after[key]}'))
+
+        rows = compare_results(files['baseline'], files['current'], options['threshold'])
+        if not rows:
+            raise CommandError('The files have no measurements in common')
+        regressions = 0
+        for metric, old, new, change, regressed in rows:
+            line = f'{metric:<40} {old:>12} {new:>12} {change:+8.1%}'
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line))
+            elif change < -options['threshold']:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f'{regressions} regression(s) past {options["threshold"]:.0%}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions past {options["threshold"]:.0%}'))
@@ -0,0 +1,37 @@
+"""
+Request parsers for the REST API
+"""
+import uuid
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .renderers import msgpack
+
+
+def unpack_uuids(value):
+    """
+    Turn the 16-byte binaries MessagePack clients send for ids back into UUIDs.
+    """
+    if isinstance(value, bytes) and len(value) == 16:
+        return uuid.UUID(bytes=value)
+    if isinstance(value, dict):
+        return {unpack_uuids(key): unpack_uuids(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [unpack_uuids(item) for item in value]
+    return value
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses ``Content-Type: application/msgpack`` request bodies.
+    Timestamps arrive as aware datetimes and 16-byte binaries as UUIDs.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            data = msgpack.unpackb(stream.read(), raw=False, strict_map_key=False, timestamp=3)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+        return unpack_uuids(data)
@@ -0,0 +1,66 @@
+"""
+Response renderers for the REST API
+"""
+import datetime
+import uuid
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, DRF's encoder is used without it
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, the MessagePack format is only enabled with it
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. orjson encodes UUIDs
+    and datetimes natively (datetimes as ISO 8601 with a ``Z`` suffix, like DRF);
+    anything else it does not know goes through DRF's encoder. Requests for
+    indented output, and installs without orjson, use the stock renderer.
+    """
+    # Non-string keys as the json module writes them, e.g. the item indexes of nested list errors
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack for bulk clients (``Accept: application/msgpack``).
+    UUIDs are packed as 16-byte binaries and datetimes as the timestamp
+    extension type; serializers emit them natively for this renderer (see
+    restapi.serializers.NativeTypesMixin). Needs the optional msgpack package.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    native_types = True  # Serializers skip string formatting of UUIDs and datetimes
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=pack_default, datetime=True, use_bin_type=True)
+
+
+def pack_default(obj):
+    """
+    Pack what msgpack does not know: UUIDs, naive datetimes, and everything DRF's JSON encoder handles.
+    """
+    if isinstance(obj, uuid.UUID):
+        return obj.bytes
+    if isinstance(obj, datetime.datetime):
+        return msgpack.Timestamp.from_datetime(obj.replace(tzinfo=datetime.timezone.utc))
+    return JSONEncoder().default(obj)
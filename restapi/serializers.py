@@ -1,12 +1,39 @@
 """
 Django REST API serializers for the OrgSchool application
-Defines serializers for Admin, School, SClass, Student, and Teacher models.
+Defines serializers for Admin, School, SClass, Student, and Teacher models
+and the read-only archive of departed students and teachers.
 """
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
 from rest_framework import serializers
-from schools.models import Admin, School, SClass, Student, Teacher
+from schools.jobs import JOB_HANDLERS, clean_payload
+from schools.models import Admin, School, SClass, Student, Teacher, ArchivedStudent, ArchivedTeacher, Attendance, Job
+
+
+class NativeTypesMixin:
+    """
+    Leaves UUIDs and datetimes unformatted when the response renderer encodes
+    them natively (``native_types``, e.g. MessagePack), instead of turning
+    them into strings the client has to parse back.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if getattr(getattr(request, 'accepted_renderer', None), 'native_types', False):
+            for field in fields.values():
+                # Related primary keys are already UUID objects
+                if isinstance(field, serializers.UUIDField):
+                    field.uuid_format = 'bytes'
+                elif isinstance(field, serializers.DateTimeField):
+                    field.format = None
+        return fields
 
 
-class AdminSerializer(serializers.ModelSerializer):
+class AdminSerializer(NativeTypesMixin, serializers.ModelSerializer):
     """
     Serializes Admin model for API output.
     """
@@ -16,7 +43,7 @@ class AdminSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class SchoolSerializer(serializers.ModelSerializer):
+class SchoolSerializer(NativeTypesMixin, serializers.ModelSerializer):
     """
     Serializes School model. Includes admin email for reference.
     """
@@ -28,7 +55,7 @@ class SchoolSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class SClassSerializer(serializers.ModelSerializer):
+class SClassSerializer(NativeTypesMixin, serializers.ModelSerializer):
     """
     Serializes SClass model. Adds school name and student/teacher counts.
     """
@@ -42,15 +69,19 @@ class SClassSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_student_count(self, obj):
-        # Return number of students in class
+        # Return number of students in class, annotated by SClass.objects.with_counts() when available
+        if hasattr(obj, 'student_count'):
+            return obj.student_count
         return obj.students.count()
     
     def get_teacher_count(self, obj):
-        # Return number of teachers in class
+        # Return number of teachers in class, annotated by SClass.objects.with_counts() when available
+        if hasattr(obj, 'teacher_count'):
+            return obj.teacher_count
         return obj.teachers.count()
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(NativeTypesMixin, serializers.ModelSerializer):
     """
     Serializes Student model. Adds class and school names.
     """
@@ -59,11 +90,11 @@ class StudentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Student
-        fields = ['id', 'name', 'age', 'sclass', 'sclass_name', 'school_name', 'admin', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'age', 'sclass', 'sclass_name', 'school_name', 'admin', 'left_at', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(NativeTypesMixin, serializers.ModelSerializer):
     """
     Serializes Teacher model. Adds class and school names.
     """
@@ -72,5 +103,427 @@ class TeacherSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Teacher
-        fields = ['id', 'name', 'sclass', 'sclass_name', 'school_name', 'admin', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'sclass', 'sclass_name', 'school_name', 'admin', 'left_at', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class ArchivedStudentSerializer(NativeTypesMixin, serializers.ModelSerializer):
+    """
+    Serializes an archived student. Class and school names are the ones at departure.
+    """
+    class Meta:
+        model = ArchivedStudent
+        fields = ['id', 'name', 'age', 'sclass', 'sclass_name', 'school_name', 'admin',
+                  'left_at', 'archived_at', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class ArchivedTeacherSerializer(NativeTypesMixin, serializers.ModelSerializer):
+    """
+    Serializes an archived teacher. Class and school names are the ones at departure.
+    """
+    class Meta:
+        model = ArchivedTeacher
+        fields = ['id', 'name', 'sclass', 'sclass_name', 'school_name', 'admin',
+                  'left_at', 'archived_at', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class PromotionSerializer(serializers.Serializer):
+    """
+    Validates an end-of-year promotion request for a school (``context['school']``).
+    ``mapping`` maps source class ids to target class ids; a null target means
+    the students leave. Without a mapping every class but the last moves to the next by name.
+    """
+    mapping = serializers.DictField(child=serializers.UUIDField(allow_null=True), required=False)
+    dry_run = serializers.BooleanField(default=False)
+    
+    def validate_mapping(self, value):
+        school = self.context['school']
+        try:
+            mapping = {uuid.UUID(str(source)): target for source, target in value.items()}
+        except ValueError:
+            raise serializers.ValidationError('Keys must be class ids.')
+        if not mapping:
+            raise serializers.ValidationError('Map at least one class.')
+        class_ids = set(mapping) | {target for target in mapping.values() if target is not None}
+        found = set(SClass.objects.filter(school=school, pk__in=class_ids).values_list('pk', flat=True))
+        missing = class_ids - found
+        if missing:
+            raise serializers.ValidationError(
+                f"Not classes of this school: {', '.join(sorted(str(pk) for pk in missing))}"
+            )
+        return mapping
+
+
+class IncomingStudentSerializer(serializers.Serializer):
+    """
+    A new student to place in a class.
+    """
+    name = serializers.CharField(max_length=128)
+    age = serializers.IntegerField(min_value=0)
+
+
+class AssignmentSerializer(serializers.Serializer):
+    """
+    Validates an automatic class assignment for a school (``context['school']``).
+    ``students`` are created in the class they are assigned to; ``student_ids``
+    are current students of the school to redistribute. ``bands`` maps class
+    ids to ``[min age, max age]`` and limits the assignment to those classes;
+    without it the bands follow the classes' current students.
+    """
+    students = IncomingStudentSerializer(many=True, required=False)
+    student_ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+    target_size = serializers.IntegerField(min_value=1, default=settings.CLASS_TARGET_SIZE)
+    bands = serializers.DictField(
+        child=serializers.ListField(child=serializers.IntegerField(min_value=0), min_length=2, max_length=2),
+        required=False,
+    )
+    dry_run = serializers.BooleanField(default=False)
+    
+    def validate_student_ids(self, value):
+        school = self.context['school']
+        ids = set(value)
+        found = set(
+            Student.objects.filter(sclass__school=school, left_at__isnull=True, pk__in=list(ids))
+            .values_list('pk', flat=True)
+        )
+        missing = ids - found
+        if missing:
+            raise serializers.ValidationError(
+                f"Not current students of this school: {', '.join(sorted(str(pk) for pk in missing))}"
+            )
+        return list(ids)
+    
+    def validate_bands(self, value):
+        from schools.balancing import check_bands  # Imported on first use to keep it off startup
+        school = self.context['school']
+        try:
+            bands = {uuid.UUID(str(sclass)): tuple(band) for sclass, band in value.items()}
+        except ValueError:
+            raise serializers.ValidationError('Keys must be class ids.')
+        if not bands:
+            raise serializers.ValidationError('Give at least one class a band.')
+        found = set(SClass.objects.filter(school=school, pk__in=list(bands)).values_list('pk', flat=True))
+        missing = set(bands) - found
+        if missing:
+            raise serializers.ValidationError(
+                f"Not classes of this school: {', '.join(sorted(str(pk) for pk in missing))}"
+            )
+        try:
+            check_bands(bands.values())
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return bands
+    
+    def validate(self, attrs):
+        total = len(attrs.get('students', [])) + len(attrs.get('student_ids', []))
+        if not total:
+            raise serializers.ValidationError('Give students to create or student_ids to move.')
+        if total > settings.ASSIGN_MAX_STUDENTS:
+            raise serializers.ValidationError(f'At most {settings.ASSIGN_MAX_STUDENTS} students per request.')
+        return attrs
+
+
+class AssignedClassSerializer(serializers.Serializer):
+    """
+    Describes one class of an automatic assignment for the API docs.
+    ``low`` and ``high`` are null for classes without a band.
+    """
+    sclass = serializers.UUIDField()
+    sclass_name = serializers.CharField()
+    low = serializers.IntegerField(allow_null=True)
+    high = serializers.IntegerField(allow_null=True)
+    before = serializers.IntegerField()
+    after = serializers.IntegerField()
+
+
+class AssignmentResultSerializer(serializers.Serializer):
+    """
+    Describes the automatic assignment response for the API docs.
+    ``unplaced`` lists the positions of new students left out (outside every
+    band or no free seats), ``unplaced_students`` the existing ones left in place.
+    """
+    dry_run = serializers.BooleanField()
+    assigned = serializers.IntegerField()
+    unplaced = serializers.ListField(child=serializers.IntegerField())
+    unplaced_students = serializers.ListField(child=serializers.UUIDField())
+    classes = AssignedClassSerializer(many=True)
+
+
+class PromotedClassSerializer(serializers.Serializer):
+    """
+    Describes one source class of a promotion for the API docs.
+    """
+    sclass = serializers.UUIDField()
+    sclass_name = serializers.CharField()
+    target = serializers.UUIDField(allow_null=True)
+    target_name = serializers.CharField(allow_null=True)
+    students = serializers.IntegerField()
+
+
+class PromotionResultSerializer(serializers.Serializer):
+    """
+    Describes the promotion response for the API docs.
+    """
+    dry_run = serializers.BooleanField()
+    total = serializers.IntegerField()
+    classes = PromotedClassSerializer(many=True)
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the sync feed.
+    """
+    token = serializers.CharField(required=False, allow_blank=True, help_text='Token from the previous sync; omit for a full sync')
+    limit = serializers.IntegerField(required=False, min_value=1, help_text='Changes per page (capped at SYNC_PAGE_SIZE)')
+
+
+class SyncChangeSerializer(serializers.Serializer):
+    """
+    Describes one change in the sync feed for the API docs. ``data`` holds the
+    class, student or teacher as the regular endpoints return it, and is
+    absent for deletions.
+    """
+    type = serializers.ChoiceField(choices=['sclass', 'student', 'teacher'])
+    op = serializers.ChoiceField(choices=['upsert', 'delete'])
+    id = serializers.UUIDField()
+    at = serializers.DateTimeField()
+    data = serializers.DictField(required=False)
+
+
+class SyncSerializer(serializers.Serializer):
+    """
+    Describes a sync feed page for the API docs.
+    """
+    token = serializers.CharField()
+    has_more = serializers.BooleanField()
+    changes = SyncChangeSerializer(many=True)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """
+    One sub-request of a batch: an API path (with its query string) and,
+    for writes, the JSON body.
+    """
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.RegexField(r'^/api/', max_length=2048, help_text='e.g. /api/v1/sclasses/?page=2')
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    """
+    A batch of sub-requests, answered in order. With ``atomic`` they run one
+    after another in one transaction, rolled back at the first error.
+    """
+    atomic = serializers.BooleanField(default=False)
+    requests = BatchRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f'At most {settings.BATCH_MAX_REQUESTS} requests per batch.')
+        return value
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    """
+    Describes one sub-response for the API docs: the status code and the
+    body the endpoint would have returned.
+    """
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResultSerializer(serializers.Serializer):
+    """
+    Describes a batch response for the API docs. ``committed`` is false when
+    an atomic batch was rolled back.
+    """
+    committed = serializers.BooleanField()
+    responses = BatchResponseSerializer(many=True)
+
+
+class JobSerializer(NativeTypesMixin, serializers.ModelSerializer):
+    """
+    Serializes a background job. Only ``name`` and ``payload`` are writable,
+    and only jobs registered as public can be queued.
+    """
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'payload', 'status', 'attempts', 'max_attempts', 'run_at',
+                  'progress_done', 'progress_total', 'progress_message', 'result', 'error',
+                  'finished_at', 'created_at', 'updated_at']
+        read_only_fields = [field for field in fields if field not in ('name', 'payload')]
+    
+    def validate_name(self, value):
+        if not JOB_HANDLERS.get(value, (None, False))[1]:
+            raise serializers.ValidationError(f'Unknown job: {value}')
+        return value
+
+    def validate(self, attrs):
+        try:
+            attrs['payload'] = clean_payload(attrs['name'], attrs.get('payload', {}))
+        except DjangoValidationError as exc:
+            # Invalid parameters come by name, a bad payload as a list
+            detail = exc.message_dict if hasattr(exc, 'error_dict') else exc.messages
+            raise serializers.ValidationError({'payload': detail})
+        return attrs
+
+
+class StudentPageSerializer(serializers.Serializer):
+    """
+    Describes a page of students (PageNumberPagination envelope) for the API docs.
+    """
+    count = serializers.IntegerField()
+    next = serializers.URLField(allow_null=True)
+    previous = serializers.URLField(allow_null=True)
+    results = StudentSerializer(many=True)
+
+
+class TeacherPageSerializer(serializers.Serializer):
+    """
+    Describes a page of teachers (PageNumberPagination envelope) for the API docs.
+    """
+    count = serializers.IntegerField()
+    next = serializers.URLField(allow_null=True)
+    previous = serializers.URLField(allow_null=True)
+    results = TeacherSerializer(many=True)
+
+
+class RosterSerializer(serializers.Serializer):
+    """
+    Describes the combined class roster response for the API docs.
+    """
+    sclass = SClassSerializer()
+    teachers = TeacherSerializer(many=True)
+    students = StudentPageSerializer()
+
+
+class AttendanceDayQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of a class's attendance for one day.
+    """
+    date = serializers.DateField(default=timezone.localdate, help_text='Day to read; defaults to today')
+
+
+class AttendanceMarkSerializer(serializers.Serializer):
+    """
+    Validates marking a class (``context['sclass']``) for one day: every
+    current student gets ``status`` except those listed in ``exceptions``.
+    Statuses come back as their codes.
+    """
+    date = serializers.DateField(default=timezone.localdate)
+    status = serializers.ChoiceField(choices=list(Attendance.STATUS_CODES), default='present')
+    exceptions = serializers.DictField(child=serializers.ChoiceField(choices=list(Attendance.STATUS_CODES)), required=False)
+    
+    def validate_date(self, value):
+        if value > timezone.localdate():
+            raise serializers.ValidationError('Attendance cannot be marked ahead.')
+        return value
+    
+    def validate_status(self, value):
+        return Attendance.STATUS_CODES[value]
+    
+    def validate_exceptions(self, value):
+        sclass = self.context['sclass']
+        try:
+            exceptions = {uuid.UUID(str(student)): Attendance.STATUS_CODES[name] for student, name in value.items()}
+        except ValueError:
+            raise serializers.ValidationError('Keys must be student ids.')
+        found = set(
+            Student.objects.filter(sclass=sclass, left_at__isnull=True, pk__in=list(exceptions))
+            .values_list('pk', flat=True)
+        )
+        missing = set(exceptions) - found
+        if missing:
+            raise serializers.ValidationError(
+                f"Not current students of this class: {', '.join(sorted(str(pk) for pk in missing))}"
+            )
+        return exceptions
+
+
+class AttendanceRangeSerializer(serializers.Serializer):
+    """
+    Query parameters of the attendance rates: an inclusive date range,
+    the last 30 days by default, and optionally one class.
+    """
+    start = serializers.DateField(required=False, help_text='First day; defaults to 29 days before end')
+    end = serializers.DateField(required=False, help_text='Last day; defaults to today')
+    sclass = serializers.UUIDField(required=False, help_text='Only this class')
+    
+    def validate(self, attrs):
+        end = attrs.setdefault('end', timezone.localdate())
+        start = attrs.setdefault('start', end - timedelta(days=29))
+        if start > end:
+            raise serializers.ValidationError({'start': 'Must not be after end.'})
+        if (end - start).days >= settings.ATTENDANCE_MAX_RANGE_DAYS:
+            raise serializers.ValidationError(
+                {'start': f'Ranges are limited to {settings.ATTENDANCE_MAX_RANGE_DAYS} days.'}
+            )
+        return attrs
+
+
+class AttendanceRecordSerializer(serializers.Serializer):
+    """
+    Describes one student's attendance on a day for the API docs.
+    """
+    student = serializers.UUIDField()
+    status = serializers.ChoiceField(choices=list(Attendance.STATUS_CODES))
+
+
+class AttendanceDaySerializer(serializers.Serializer):
+    """
+    Describes a class's attendance for one day for the API docs.
+    """
+    date = serializers.DateField()
+    records = AttendanceRecordSerializer(many=True)
+
+
+class AttendanceMarkResultSerializer(serializers.Serializer):
+    """
+    Describes the result of marking a class for the API docs.
+    """
+    date = serializers.DateField()
+    marked = serializers.IntegerField()
+    counts = serializers.DictField(child=serializers.IntegerField())
+
+
+class AttendanceRateSerializer(serializers.Serializer):
+    """
+    Describes attendance totals over a date range for the API docs.
+    ``rate`` counts present and late records over all records.
+    """
+    days = serializers.IntegerField()
+    records = serializers.IntegerField()
+    present = serializers.IntegerField()
+    absent = serializers.IntegerField()
+    late = serializers.IntegerField()
+    excused = serializers.IntegerField()
+    rate = serializers.FloatField()
+
+
+class ClassAttendanceSerializer(AttendanceRateSerializer):
+    """
+    Describes one class's attendance rate for the API docs.
+    """
+    sclass = serializers.UUIDField()
+    sclass_name = serializers.CharField()
+
+
+class StudentAttendanceSerializer(AttendanceRateSerializer):
+    """
+    Describes one student's attendance rate for the API docs.
+    The name is null once the archived student is gone too.
+    """
+    student = serializers.UUIDField()
+    student_name = serializers.CharField(allow_null=True)
+
+
+class StudentAttendancePageSerializer(serializers.Serializer):
+    """
+    Describes a page of student attendance rates (PageNumberPagination envelope) for the API docs.
+    """
+    count = serializers.IntegerField()
+    next = serializers.URLField(allow_null=True)
+    previous = serializers.URLField(allow_null=True)
+    results = StudentAttendanceSerializer(many=True)
@@ -1,3 +1,324 @@
-from django.test import TestCase
+import datetime
+import uuid
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from restapi.batch import run_in_thread
+from restapi.renderers import msgpack
+from restapi.throttling import SWEEP_INTERVAL, CacheBuckets, LocalBuckets, parse_rate
+from schools.models import Admin, Job, School, SClass, Student, Teacher
+
+MSGPACK = 'application/msgpack'
+
+
+def as_json(value):
+    """
+    What the JSON renderer makes of a MessagePack value: UUIDs and datetimes as strings.
+    """
+    if isinstance(value, bytes) and len(value) == 16:
+        return str(uuid.UUID(bytes=value))
+    if isinstance(value, datetime.datetime):
+        return serializers.DateTimeField().to_representation(value)
+    if isinstance(value, dict):
+        return {as_json(key): as_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_json(item) for item in value]
+    return value
+
+
+@skipUnless(msgpack, 'msgpack is not installed')
+class MessagePackTests(TestCase):
+    """
+    Every endpoint answers in MessagePack with the same data as in JSON.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Admin.objects.create_user(
+            username='admin@example.com', email='admin@example.com', password='pw', school_name='Test School'
+        )
+        cls.school = School.objects.create(name='Test School', admin=cls.admin)
+        cls.classes = [SClass.objects.create(name=f'Class 0{i}', school=cls.school) for i in range(1, 4)]
+        Student.objects.bulk_create([
+            Student(name=f'Student {i:02d}', age=6 + i % 6, sclass=cls.classes[i % 3], admin=cls.admin)
+            for i in range(30)
+        ])
+        Teacher.objects.bulk_create([
+            Teacher(name=f'Teacher {i}', sclass=cls.classes[i % 3], admin=cls.admin) for i in range(3)
+        ])
+        # Outside the sync settle window, so the feed returns them
+        earlier = timezone.now() - datetime.timedelta(hours=1)
+        for model in (SClass, Student, Teacher):
+            model.objects.update(updated_at=earlier)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_both(self, url):
+        as_json_response = self.client.get(url, HTTP_ACCEPT='application/json')
+        as_msgpack_response = self.client.get(url, HTTP_ACCEPT=MSGPACK)
+        self.assertEqual(as_json_response.status_code, 200)
+        self.assertEqual(as_msgpack_response.status_code, 200)
+        self.assertEqual(as_msgpack_response['Content-Type'], MSGPACK)
+        return as_json_response.json(), msgpack.unpackb(as_msgpack_response.content, timestamp=3)
+
+    def test_endpoints_match_json(self):
+        sclass = self.classes[0]
+        student = Student.objects.filter(sclass=sclass).first()
+        urls = [
+            '/api/v1/schools/',
+            '/api/v1/sclasses/',
+            '/api/v1/students/',
+            '/api/v1/teachers/',
+            f'/api/v1/students/{student.pk}/',
+            f'/api/v1/sclasses/{sclass.pk}/students/',
+            f'/api/v1/sclasses/{sclass.pk}/roster/',
+            '/api/v1/archived-students/',
+            '/api/v1/jobs/',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data, packed = self.get_both(url)
+                self.assertEqual(as_json(packed), data)
+
+    def test_sync_matches_json(self):
+        data, packed = self.get_both('/api/v1/sync/')
+        self.assertEqual(len(packed['changes']), 36)
+        # Tokens are signed with the request time, the changes themselves must match
+        self.assertEqual(as_json(packed['changes']), data['changes'])
+
+    def test_native_types(self):
+        student = Student.objects.first()
+        data, packed = self.get_both(f'/api/v1/students/{student.pk}/')
+        self.assertEqual(packed['id'], student.pk.bytes)
+        self.assertEqual(packed['sclass'], student.sclass_id.bytes)
+        self.assertEqual(packed['created_at'], student.created_at)
+
+    def test_msgpack_request_body(self):
+        body = msgpack.packb({'name': 'New Student', 'age': 9, 'sclass': self.classes[1].pk.bytes, 'admin': self.admin.pk.bytes})
+        response = self.client.post('/api/v1/students/', body, content_type=MSGPACK, HTTP_ACCEPT=MSGPACK)
+        self.assertEqual(response.status_code, 201, response.content)
+        created = msgpack.unpackb(response.content, timestamp=3)
+        student = Student.objects.get(pk=uuid.UUID(bytes=created['id']))
+        self.assertEqual(student.sclass, self.classes[1])
+        data = self.client.get(f'/api/v1/students/{student.pk}/', HTTP_ACCEPT='application/json').json()
+        self.assertEqual(as_json(created), data)
+
+    def test_bulk_promotion_preview(self):
+        mapping = {self.classes[0].pk.bytes: self.classes[1].pk.bytes, self.classes[2].pk.bytes: None}
+        url = f'/api/v1/schools/{self.school.pk}/promote/'
+        packed = self.client.post(
+            url, msgpack.packb({'mapping': mapping, 'dry_run': True}), content_type=MSGPACK, HTTP_ACCEPT=MSGPACK
+        )
+        data = self.client.post(
+            url, {'mapping': {str(self.classes[0].pk): str(self.classes[1].pk), str(self.classes[2].pk): None}, 'dry_run': True},
+            content_type='application/json', HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(packed.status_code, 200, packed.content)
+        self.assertEqual(as_json(msgpack.unpackb(packed.content, timestamp=3)), data.json())
+
+
+class BatchTests(TestCase):
+    """
+    An atomic batch commits all of its requests or none.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Admin.objects.create_user(
+            username='batch@example.com', email='batch@example.com', password='pw', school_name='Test School'
+        )
+        school = School.objects.create(name='Test School', admin=cls.admin)
+        cls.sclass = SClass.objects.create(name='Class 01', school=school)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def create(self, name):
+        body = {'name': name, 'age': 9, 'sclass': str(self.sclass.pk), 'admin': str(self.admin.pk)}
+        return {'method': 'POST', 'path': '/api/v1/students/', 'body': body}
+
+    def batch(self, requests):
+        response = self.client.post('/api/v1/batch/', {'atomic': True, 'requests': requests}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_failure_rolls_back(self):
+        result = self.batch([
+            self.create('Kept Back'),
+            {'method': 'POST', 'path': '/api/v1/students/', 'body': {'name': 'No Class'}},
+            {'method': 'GET', 'path': '/api/v1/students/'},
+        ])
+        self.assertFalse(result['committed'])
+        self.assertEqual([response['status'] for response in result['responses']], [201, 400, 424])
+        self.assertFalse(Student.objects.filter(name='Kept Back').exists())
+
+    def test_success_commits(self):
+        result = self.batch([self.create('First'), self.create('Second'), {'method': 'GET', 'path': '/api/v1/students/'}])
+        self.assertTrue(result['committed'])
+        self.assertEqual([response['status'] for response in result['responses']], [201, 201, 200])
+        self.assertEqual(result['responses'][2]['body']['count'], 2)
+        self.assertEqual(Student.objects.filter(name__in=['First', 'Second']).count(), 2)
+
+
+class BatchReadTests(TransactionTestCase):
+    """
+    The reads of a plain batch run on the thread pool and come back in
+    request order. The pool threads have their own connections, so the data
+    is committed rather than kept in a test transaction.
+    """
+
+    def setUp(self):
+        self.admin = Admin.objects.create_user(
+            username='reads@example.com', email='reads@example.com', password='pw', school_name='Test School'
+        )
+        school = School.objects.create(name='Test School', admin=self.admin)
+        self.sclass = SClass.objects.create(name='Class 01', school=school)
+        self.client.force_login(self.admin)
+
+    def test_concurrent_reads_in_order(self):
+        missing = uuid.uuid4()
+        paths = [
+            '/api/v1/schools/',
+            f'/api/v1/sclasses/{self.sclass.pk}/',
+            f'/api/v1/students/{missing}/',
+            '/api/v1/sclasses/',
+            '/api/v1/unknown/',
+        ]
+        with mock.patch('restapi.batch.run_in_thread', wraps=run_in_thread) as pooled:
+            response = self.client.post(
+                '/api/v1/batch/', {'requests': [{'method': 'GET', 'path': path} for path in paths]},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(pooled.call_count, len(paths))
+        responses = response.json()['responses']
+        self.assertEqual([item['status'] for item in responses], [200, 200, 404, 200, 404])
+        self.assertEqual(responses[0]['body']['results'][0]['name'], 'Test School')
+        self.assertEqual(responses[1]['body']['name'], 'Class 01')
+        self.assertEqual(responses[3]['body']['count'], 1)
+
+
+class JobPayloadTests(TestCase):
+    """
+    Jobs are only queued with a payload their handler takes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Admin.objects.create_user(
+            username='jobs@example.com', email='jobs@example.com', password='pw', school_name='Test School'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def queue(self, name, payload):
+        return self.client.post('/api/v1/jobs/', {'name': name, 'payload': payload}, content_type='application/json')
+
+    def test_invalid_payloads(self):
+        for payload in ({'bogus': 1}, [1, 2], {'batch_size': -1}, {'batch_size': 'many'}):
+            with self.subTest(payload=payload):
+                response = self.queue('archive_departed', payload)
+                self.assertEqual(response.status_code, 400, response.content)
+                self.assertIn('payload', response.json())
+        self.assertEqual(self.queue('class_reports', {'school': 'nope'}).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_valid_payloads(self):
+        school = uuid.uuid4()
+        for name, payload, stored in [
+            ('archive_departed', {'batch_size': 100}, {'batch_size': 100}),
+            ('archive_departed', {}, {}),
+            ('class_reports', {'school': str(school)}, {'school': str(school)}),
+            ('class_reports', {'school': None}, {}),
+        ]:
+            with self.subTest(name=name, payload=payload):
+                response = self.queue(name, payload)
+                self.assertEqual(response.status_code, 201, response.content)
+                self.assertEqual(Job.objects.get(pk=response.json()['id']).payload, stored)
+
+
+class ThrottleTests:
+    """
+    Token buckets: a burst past the bucket is refused with Retry-After, the
+    bucket refills with time, and a request refused by the global bucket
+    keeps its tenant token. Run against each bucket store.
+    """
+    rates = {'read': '3/min', 'write': '3/min', 'bulk': '3/min', 'global': None}
+
+    def make_buckets(self):
+        raise NotImplementedError
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Admin.objects.create_user(
+            username='throttle@example.com', email='throttle@example.com', password='pw', school_name='Test School'
+        )
+
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('restapi.throttling.time', monotonic=lambda: self.now, time=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.buckets = self.make_buckets()
+        store = mock.patch('restapi.throttling._buckets', self.buckets)
+        store.start()
+        self.addCleanup(store.stop)
+        self.client.force_login(self.admin)
+
+    def get(self, count=1, **rates):
+        with override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {**self.rates, **rates},
+        }):
+            return [self.client.get('/api/v1/schools/') for _ in range(count)]
+
+    def test_burst_is_refused_with_retry_after(self):
+        responses = self.get(4)
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200, 429])
+        # One token every 20 seconds at 3/min
+        self.assertEqual(responses[-1]['Retry-After'], '20')
+        self.now += 5
+        self.assertEqual(self.get()[0]['Retry-After'], '15')
+
+    def test_bucket_refills(self):
+        self.get(3)
+        self.now += 20
+        self.assertEqual([response.status_code for response in self.get(2)], [200, 429])
+        self.now += 60
+        self.assertEqual([response.status_code for response in self.get(4)], [200, 200, 200, 429])
+
+    def test_refused_by_global_bucket_is_refunded(self):
+        self.assertEqual([response.status_code for response in self.get(3, **{'global': '1/min'})], [200, 429, 429])
+        # Only the request that got through took a tenant token
+        capacity, rate = parse_rate(self.rates['read'])
+        taken = [self.buckets.take(f'read:{self.admin.pk}', capacity, rate) for _ in range(3)]
+        self.assertEqual([delay == 0 for delay in taken], [True, True, False])
+
+
+class LocalThrottleTests(ThrottleTests, TestCase):
+
+    def make_buckets(self):
+        return LocalBuckets()
+
+    def test_refilled_buckets_are_swept(self):
+        self.get(3)
+        self.assertIn(f'read:{self.admin.pk}', self.buckets.buckets)
+        self.now += SWEEP_INTERVAL
+        self.get()
+        self.assertEqual(len(self.buckets.buckets), 1)
+        self.now += SWEEP_INTERVAL
+        self.buckets.take('other', 3, 3 / 60)
+        self.assertEqual(list(self.buckets.buckets), ['other'])
+
+
+class CacheThrottleTests(ThrottleTests, TestCase):
+
+    def make_buckets(self):
+        cache.clear()
+        return CacheBuckets()
@@ -0,0 +1,169 @@
+"""
+Tenant-aware request throttling for the REST API
+Every request takes a token from its admin's bucket for the request kind
+(read, write or bulk) and from one global bucket shared by all tenants, so a
+single integration cannot starve the database for every other school.
+"""
+import math
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+SWEEP_INTERVAL = 60  # Seconds between drops of refilled local buckets
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    Turn a DRF-style rate such as ``'600/min'`` into ``(capacity, tokens per second)``.
+    The bucket holds a full period's worth of requests, refilled evenly.
+    """
+    if rate is None:
+        return None
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class LocalBuckets:
+    """
+    Token buckets held in this process. Cheapest option, but every worker
+    process keeps its own buckets, so the effective limit scales with the
+    number of processes. Buckets that have refilled are dropped every
+    SWEEP_INTERVAL seconds: a missing bucket is a full one.
+    """
+
+    def __init__(self):
+        self.buckets = {}  # key -> (tokens, last update, time it is full again)
+        self.lock = threading.Lock()
+        self.next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+    def take(self, key, capacity, rate):
+        """
+        Take one token from ``key``; return 0 on success or the seconds until one is available.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now >= self.next_sweep:
+                self.sweep(now)
+            tokens, last, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                self.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+                return 0
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+        return (1 - tokens) / rate
+
+    def refund(self, key, capacity, rate):
+        with self.lock:
+            if key in self.buckets:
+                tokens, last, _ = self.buckets[key]
+                tokens = min(capacity, tokens + 1)
+                self.buckets[key] = (tokens, last, last + (capacity - tokens) / rate)
+
+    def sweep(self, now):
+        """
+        Drop the buckets that are full again; call with the lock held.
+        """
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[2] > now}
+        self.next_sweep = now + SWEEP_INTERVAL
+
+
+class CacheBuckets:
+    """
+    Token buckets in a cache backend shared by all processes (API_THROTTLE_CACHE).
+    Read-modify-write without a lock: under heavy contention a few extra
+    requests may get through, which is fine for load shedding.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        key = f'throttle:{key}'
+        tokens, last = self.cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - last) * rate)
+        timeout = math.ceil(capacity / rate)
+        if tokens >= 1:
+            self.cache.set(key, (tokens - 1, now), timeout)
+            return 0
+        self.cache.set(key, (tokens, now), timeout)
+        return (1 - tokens) / rate
+
+    def refund(self, key, capacity, rate):
+        key = f'throttle:{key}'
+        bucket = self.cache.get(key)
+        if bucket is not None:
+            self.cache.set(key, (min(capacity, bucket[0] + 1), bucket[1]), math.ceil(capacity / rate))
+
+
+_buckets = None
+
+
+def get_buckets():
+    """
+    The bucket store configured by API_THROTTLE_BACKEND ('local' or 'cache').
+    """
+    global _buckets
+    if _buckets is None:
+        if settings.API_THROTTLE_BACKEND == 'cache':
+            _buckets = CacheBuckets(settings.API_THROTTLE_CACHE)
+        else:
+            _buckets = LocalBuckets()
+    return _buckets
+
+
+class TenantRateThrottle(BaseThrottle):
+    """
+    Token bucket per admin and request kind, plus a global bucket.
+    Rates come from DEFAULT_THROTTLE_RATES under 'read', 'write', 'bulk' and
+    'global'. Views opt into the bulk rate with ``throttle_scope = 'bulk'``, or for
+    some actions only with ``bulk_actions = [...]``.
+    DRF answers refused requests with 429 and Retry-After.
+    """
+
+    def __init__(self):
+        self.delay = None
+
+    def get_scope(self, request, view):
+        if getattr(view, 'throttle_scope', None) == 'bulk' or getattr(view, 'action', None) in getattr(view, 'bulk_actions', ()):
+            return 'bulk'
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def get_rates(self):
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        rates = self.get_rates()
+        scope = self.get_scope(request, view)
+        tenant_rate = parse_rate(rates.get(scope))
+        global_rate = parse_rate(rates.get('global'))
+        user = request.user
+        ident = user.pk if user and user.is_authenticated else f'anon:{self.get_ident(request)}'
+        buckets = get_buckets()
+
+        tenant_key = f'{scope}:{ident}'
+        if tenant_rate:
+            self.delay = buckets.take(tenant_key, *tenant_rate)
+            if self.delay:
+                return False
+        if global_rate:
+            self.delay = buckets.take('global', *global_rate)
+            if self.delay:
+                # The request is refused anyway, do not charge the tenant for it
+                if tenant_rate:
+                    buckets.refund(tenant_key, *tenant_rate)
+                return False
+        return True
+
+    def wait(self):
+        return self.delay
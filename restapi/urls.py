@@ -11,8 +11,15 @@ router.register(r'schools', views.SchoolViewSet)
 router.register(r'sclasses', views.SClassViewSet)
 router.register(r'students', views.StudentViewSet)
 router.register(r'teachers', views.TeacherViewSet)
+router.register(r'archived-students', views.ArchivedStudentViewSet)
+router.register(r'archived-teachers', views.ArchivedTeacherViewSet)
+router.register(r'sync', views.SyncViewSet, basename='sync')
+router.register(r'jobs', views.JobViewSet)
+router.register(r'attendance', views.AttendanceViewSet)
+router.register(r'batch', views.BatchViewSet, basename='batch')
 
 urlpatterns = [
+    path('v1/events/', views.event_stream, name='event-stream'),
     path('v1/', include(router.urls)),
     path('v1/auth/', include('rest_framework.urls')),
 ]
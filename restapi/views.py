@@ -1,22 +1,62 @@
 """
 Django REST API views for the OrgSchool application
-Defines API endpoints for admins, schools, classes, students, and teachers.
+Defines API endpoints for admins, schools, classes, students, and teachers,
+read-only endpoints for archived students and teachers, attendance rates,
+and the live change stream.
 """
-from rest_framework import viewsets, status
+import asyncio
+import json
+import os
+import uuid
+
+from asgiref.sync import sync_to_async
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from schools.models import Admin, School, SClass, Student, Teacher
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from drf_yasg.utils import no_body, swagger_auto_schema
+from schools.archive import archive_member
+from schools.jobs import enqueue
+from schools.promotion import describe_promotion, next_class_mapping, promote_students
+from schools.sync import InvalidSyncToken, changes_since
+from schools.models import Admin, School, SClass, Student, Teacher, ArchivedStudent, ArchivedTeacher, Attendance, Job
 from .serializers import (
     AdminSerializer, SchoolSerializer, SClassSerializer, 
-    StudentSerializer, TeacherSerializer
+    StudentSerializer, TeacherSerializer,
+    ArchivedStudentSerializer, ArchivedTeacherSerializer,
+    PromotionSerializer, PromotionResultSerializer,
+    AssignmentSerializer, AssignmentResultSerializer,
+    SyncQuerySerializer, SyncSerializer, JobSerializer,
+    StudentPageSerializer, TeacherPageSerializer, RosterSerializer,
+    AttendanceDayQuerySerializer, AttendanceMarkSerializer, AttendanceRangeSerializer,
+    AttendanceDaySerializer, AttendanceMarkResultSerializer,
+    ClassAttendanceSerializer, StudentAttendancePageSerializer,
+    BatchSerializer, BatchResultSerializer
 )
 
 
-class AdminViewSet(viewsets.ReadOnlyModelViewSet):
+class OwnedQuerysetMixin:
+    """
+    Scopes a viewset to the current admin's rows with get_owned_queryset().
+    Schema generation runs without a request user and gets an empty queryset.
+    """
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return self.queryset.none()
+        return self.get_owned_queryset()
+
+
+class AdminViewSet(OwnedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Read-only API for Admin model. Only returns the current user's admin info.
     """
@@ -24,29 +64,80 @@ class AdminViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = AdminSerializer
     permission_classes = [IsAuthenticated]
     
-    def get_queryset(self):
+    def get_owned_queryset(self):
         # Only return the current admin
         return Admin.objects.filter(id=self.request.user.id)
 
 
-class SchoolViewSet(viewsets.ModelViewSet):
+class SchoolViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
     """
     CRUD API for School model. Only allows access to the user's schools.
     """
     queryset = School.objects.all()
     serializer_class = SchoolSerializer
     permission_classes = [IsAuthenticated]
+    bulk_actions = ['promote', 'assign']  # Throttled at the bulk rate
     
-    def get_queryset(self):
+    def get_owned_queryset(self):
         # Only return schools for the current admin
         return School.objects.filter(admin=self.request.user)
     
     def perform_create(self, serializer):
         # Set admin to current user on create
         serializer.save(admin=self.request.user)
+    
+    @swagger_auto_schema(
+        operation_description="Move every current student to the next class in one transaction",
+        request_body=PromotionSerializer,
+        responses={200: PromotionResultSerializer()}
+    )
+    @action(detail=True, methods=['post'])
+    def promote(self, request, pk=None):
+        """
+        End-of-year promotion: move the students of each mapped class to its
+        target class (or mark them as left) with set-based UPDATEs.
+        """
+        school = self.get_object()
+        serializer = PromotionSerializer(data=request.data, context={'school': school})
+        serializer.is_valid(raise_exception=True)
+        mapping = serializer.validated_data.get('mapping') or next_class_mapping(school)
+        dry_run = serializer.validated_data['dry_run']
+        counts = promote_students(school, mapping, dry_run=dry_run)
+        return Response({
+            'dry_run': dry_run,
+            'total': sum(counts.values()),
+            'classes': describe_promotion(school, mapping, counts),
+        })
 
+    
+    @swagger_auto_schema(
+        operation_description="Spread new or existing students over the classes by age band and target size; "
+                              "dry_run previews the class sizes",
+        request_body=AssignmentSerializer,
+        responses={200: AssignmentResultSerializer()}
+    )
+    @action(detail=True, methods=['post'])
+    def assign(self, request, pk=None):
+        """
+        Automatic class assignment: new students are created with one INSERT
+        and existing ones moved with one UPDATE, emptiest classes first.
+        """
+        from schools.balancing import assign_students  # Imported on first use to keep it off startup
+        school = self.get_object()
+        serializer = AssignmentSerializer(data=request.data, context={'school': school})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = assign_students(
+            school,
+            incoming=data.get('students', []),
+            student_ids=data.get('student_ids', []),
+            target_size=data['target_size'],
+            bands=data.get('bands'),
+            dry_run=data['dry_run'],
+        )
+        return Response({'dry_run': data['dry_run'], **result})
 
-class SClassViewSet(viewsets.ModelViewSet):
+class SClassViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
     """
     CRUD API for SClass model. Only allows access to classes in the user's schools.
     Includes custom actions for students and teachers in a class.
@@ -55,45 +146,167 @@ class SClassViewSet(viewsets.ModelViewSet):
     serializer_class = SClassSerializer
     permission_classes = [IsAuthenticated]
     
-    def get_queryset(self):
+    def get_owned_queryset(self):
         # Users can only see classes from their own schools
-        return SClass.objects.filter(school__admin=self.request.user)
+        return SClass.objects.filter(school_id__in=self.request.tenant.school_ids).select_related('school').with_counts()
     
     def perform_create(self, serializer):
         # Ensure the class is created under the user's school
-        school = School.objects.get(admin=self.request.user)
+        school = self.request.tenant.school
+        if school is None:
+            raise ValidationError({'school': 'Create a school first.'})
         serializer.save(school=school)
     
     @swagger_auto_schema(
-        operation_description="Get all students in this class",
-        responses={200: StudentSerializer(many=True)}
+        operation_description="Get a page of students in this class",
+        responses={200: StudentPageSerializer()}
     )
     @action(detail=True, methods=['get'])
     def students(self, request, pk=None):
         """
-        Get all students in this class
+        Get a page of students in this class
         """
         sclass = self.get_object()
-        students = Student.objects.filter(sclass=sclass)
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_roster_queryset(Student, sclass))
+        serializer = StudentSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
-        operation_description="Get all teachers in this class",
-        responses={200: TeacherSerializer(many=True)}
+        operation_description="Get a page of teachers in this class",
+        responses={200: TeacherPageSerializer()}
     )
     @action(detail=True, methods=['get'])
     def teachers(self, request, pk=None):
         """
-        Get all teachers in this class
+        Get a page of teachers in this class
+        """
+        sclass = self.get_object()
+        page = self.paginate_queryset(self.get_roster_queryset(Teacher, sclass))
+        serializer = TeacherSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+    
+    @swagger_auto_schema(
+        operation_description="Get the class, all of its teachers and a page of its students in one response",
+        responses={200: RosterSerializer()}
+    )
+    @action(detail=True, methods=['get'])
+    def roster(self, request, pk=None):
+        """
+        Get the class, its teachers and a page of its students.
+        Costs four queries whatever the class size: the class with its counts,
+        the teachers, the student count and the student page.
+        """
+        sclass = self.get_object()
+        teachers = self.get_roster_queryset(Teacher, sclass)
+        page = self.paginate_queryset(self.get_roster_queryset(Student, sclass))
+        students = self.get_paginated_response(StudentSerializer(page, many=True, context=self.get_serializer_context()).data)
+        return Response({
+            'sclass': self.get_serializer(sclass).data,
+            'teachers': TeacherSerializer(teachers, many=True, context=self.get_serializer_context()).data,
+            'students': students.data,
+        })
+    
+    def get_roster_queryset(self, model, sclass):
+        """
+        Students or teachers of ``sclass`` with everything their serializer reads joined in.
+        """
+        return model.objects.filter(sclass=sclass).select_related('sclass__school').order_by('name', 'id')
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Attendance of this class for one day",
+        query_serializer=AttendanceDayQuerySerializer,
+        responses={200: AttendanceDaySerializer()}
+    )
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Mark every current student of this class for a day in one statement, replacing earlier marks",
+        request_body=AttendanceMarkSerializer,
+        responses={200: AttendanceMarkResultSerializer()}
+    )
+    @action(detail=True, methods=['get', 'post'])
+    def attendance(self, request, pk=None):
+        """
+        Read or mark the attendance of this class for one day
         """
         sclass = self.get_object()
-        teachers = Teacher.objects.filter(sclass=sclass)
-        serializer = TeacherSerializer(teachers, many=True)
-        return Response(serializer.data)
+        if request.method == 'GET':
+            query = AttendanceDayQuerySerializer(data=request.query_params)
+            query.is_valid(raise_exception=True)
+            date = query.validated_data['date']
+            records = (
+                Attendance.objects.filter(sclass=sclass, date=date)
+                .order_by('student_id')
+                .values_list('student_id', 'status')
+            )
+            return Response({
+                'date': date,
+                'records': [{'student': student, 'status': Attendance.STATUS_NAMES[code]} for student, code in records],
+            })
+        from schools.attendance import mark_class  # Imported on first use to keep it off startup
+        serializer = AttendanceMarkSerializer(data=request.data, context={'sclass': sclass})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        counts = mark_class(sclass, data['date'], data['status'], data.get('exceptions'))
+        return Response({'date': data['date'], 'marked': sum(counts.values()), 'counts': counts})
 
 
-class StudentViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(OwnedQuerysetMixin, viewsets.GenericViewSet):
+    """
+    Attendance rates of the user's classes and students over a date range,
+    aggregated in the database.
+    """
+    queryset = Attendance.objects.all()
+    permission_classes = [IsAuthenticated]
+    bulk_actions = ['classes', 'students']  # Aggregates over up to ATTENDANCE_MAX_RANGE_DAYS of records
+    
+    def get_owned_queryset(self):
+        # Archived students' rows stay with their class, so scope by class
+        return Attendance.objects.filter(sclass__school_id__in=self.request.tenant.school_ids)
+    
+    def get_range(self):
+        """
+        The validated date range and the records it applies to.
+        """
+        query = AttendanceRangeSerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        data = query.validated_data
+        queryset = self.get_queryset()
+        if 'sclass' in data:
+            queryset = queryset.filter(sclass_id=data['sclass'])
+        return queryset, data['start'], data['end']
+    
+    @swagger_auto_schema(
+        operation_description="Attendance rate of each class between start and end",
+        query_serializer=AttendanceRangeSerializer,
+        responses={200: ClassAttendanceSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'])
+    def classes(self, request):
+        """
+        Attendance rate of each class, one GROUP BY query
+        """
+        from schools.attendance import class_rates
+        queryset, start, end = self.get_range()
+        return Response(class_rates(queryset, start, end))
+    
+    @swagger_auto_schema(
+        operation_description="A page of attendance rates per student between start and end",
+        query_serializer=AttendanceRangeSerializer,
+        responses={200: StudentAttendancePageSerializer()}
+    )
+    @action(detail=False, methods=['get'])
+    def students(self, request):
+        """
+        A page of attendance rates per student, one GROUP BY query per page
+        """
+        from schools.attendance import describe_student_rates, student_rates
+        queryset, start, end = self.get_range()
+        page = self.paginate_queryset(student_rates(queryset, start, end))
+        return self.get_paginated_response(describe_student_rates(page, queryset.db))
+
+
+class StudentViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
     """
     CRUD API for Student model. Only allows access to the user's students.
     """
@@ -101,15 +314,28 @@ class StudentViewSet(viewsets.ModelViewSet):
     serializer_class = StudentSerializer
     permission_classes = [IsAuthenticated]
     
-    def get_queryset(self):
+    def get_owned_queryset(self):
         # Users can only see their own students
-        return Student.objects.filter(admin=self.request.user)
+        return Student.objects.filter(admin=self.request.user).select_related('sclass__school')
     
     def perform_create(self, serializer):
         serializer.save(admin=self.request.user)
+    
+    @swagger_auto_schema(
+        operation_description="Move this student to the archive now (sets left_at if it is empty)",
+        request_body=no_body,
+        responses={200: ArchivedStudentSerializer()}
+    )
+    @action(detail=True, methods=['post'])
+    def archive(self, request, pk=None):
+        """
+        Move this student out of the students table into the archive
+        """
+        archived = archive_member(self.get_object())
+        return Response(ArchivedStudentSerializer(archived, context=self.get_serializer_context()).data)
 
 
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(OwnedQuerysetMixin, viewsets.ModelViewSet):
     """
     CRUD API for Teacher model. Only allows access to the user's teachers.
     """
@@ -117,9 +343,256 @@ class TeacherViewSet(viewsets.ModelViewSet):
     serializer_class = TeacherSerializer
     permission_classes = [IsAuthenticated]
     
-    def get_queryset(self):
+    def get_owned_queryset(self):
         # Users can only see their own teachers
-        return Teacher.objects.filter(admin=self.request.user)
+        return Teacher.objects.filter(admin=self.request.user).select_related('sclass__school')
     
     def perform_create(self, serializer):
         serializer.save(admin=self.request.user)
+    
+    @swagger_auto_schema(
+        operation_description="Move this teacher to the archive now (sets left_at if it is empty)",
+        request_body=no_body,
+        responses={200: ArchivedTeacherSerializer()}
+    )
+    @action(detail=True, methods=['post'])
+    def archive(self, request, pk=None):
+        """
+        Move this teacher out of the teachers table into the archive
+        """
+        archived = archive_member(self.get_object())
+        return Response(ArchivedTeacherSerializer(archived, context=self.get_serializer_context()).data)
+
+
+class ArchivedStudentViewSet(OwnedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only API for students who have left, newest departures first.
+    """
+    queryset = ArchivedStudent.objects.all()
+    serializer_class = ArchivedStudentSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_owned_queryset(self):
+        return ArchivedStudent.objects.filter(admin=self.request.user)
+
+
+class ArchivedTeacherViewSet(OwnedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only API for teachers who have left, newest departures first.
+    """
+    queryset = ArchivedTeacher.objects.all()
+    serializer_class = ArchivedTeacherSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_owned_queryset(self):
+        return ArchivedTeacher.objects.filter(admin=self.request.user)
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta-sync feed for offline clients: every class, student and teacher of the
+    current admin changed since ``token``, and tombstones for deleted ones.
+    Keep calling with the returned token while ``has_more`` is true.
+    """
+    permission_classes = [IsAuthenticated]
+    serializers = {
+        'sclass': SClassSerializer,
+        'student': StudentSerializer,
+        'teacher': TeacherSerializer,
+    }
+    
+    @swagger_auto_schema(
+        operation_description="Changes since the sync token, oldest first",
+        query_serializer=SyncQuerySerializer,
+        responses={200: SyncSerializer(), 410: 'Token expired or invalid; start a full sync'}
+    )
+    def list(self, request):
+        query = SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        limit = min(query.validated_data.get('limit') or settings.SYNC_PAGE_SIZE, settings.SYNC_PAGE_SIZE)
+        try:
+            rows, token, has_more = changes_since(request.user.pk, query.validated_data.get('token'), limit)
+        except InvalidSyncToken as exc:
+            return Response({'detail': str(exc), 'resync': True}, status=status.HTTP_410_GONE)
+        
+        changes = []
+        for kind, obj in rows:
+            if kind == 'tombstone':
+                changes.append({'type': obj.model, 'op': 'delete', 'id': obj.object_id, 'at': obj.deleted_at})
+            else:
+                data = self.serializers[kind](obj, context={'request': request}).data
+                changes.append({'type': kind, 'op': 'upsert', 'id': obj.pk, 'at': obj.updated_at, 'data': data})
+        return Response({'token': token, 'has_more': has_more, 'changes': changes})
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """
+    Several API calls in one round trip: each sub-request goes through the
+    regular router and view with the caller's session, and the responses come
+    back together, in order. Reads between two writes run concurrently.
+    Sub-requests are throttled like direct calls; the batch itself counts as
+    a bulk request.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bulk'
+    batchable = False  # No batches inside batches
+    
+    @swagger_auto_schema(
+        operation_description="Run up to BATCH_MAX_REQUESTS API calls and return all responses, optionally in one transaction",
+        request_body=BatchSerializer,
+        responses={200: BatchResultSerializer()}
+    )
+    def create(self, request):
+        from .batch import run_atomic_batch, run_batch  # Imported on first use to keep it off startup
+        batch = BatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        entries = batch.validated_data['requests']
+        if batch.validated_data['atomic']:
+            responses, committed = run_atomic_batch(request, entries)
+        else:
+            responses, committed = run_batch(request, entries), True
+        return Response({'committed': committed, 'responses': responses})
+
+
+class JobViewSet(OwnedQuerysetMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Background jobs of the current admin: queue public jobs, follow their
+    status and progress, and cancel them. Jobs run in `manage.py run_workers`.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    bulk_actions = ['create']  # Queuing a job starts heavy work
+    
+    def get_owned_queryset(self):
+        return Job.objects.filter(admin=self.request.user)
+    
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = enqueue(data['name'], admin=self.request.user, payload=data.get('payload'))
+    
+    @swagger_auto_schema(
+        operation_description="Cancel a queued or running job; running jobs stop at their next progress report",
+        request_body=no_body,
+        responses={200: JobSerializer(), 409: 'The job has already finished'}
+    )
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """
+        Cancel a queued or running job
+        """
+        job = self.get_object()
+        cancelled = Job.objects.filter(pk=job.pk, status__in=[Job.QUEUED, Job.RUNNING]).update(
+            status=Job.CANCELLED, finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        job.refresh_from_db()
+        if not cancelled:
+            return Response(self.get_serializer(job).data, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(job).data)
+    
+    @swagger_auto_schema(
+        operation_description="Download the file a finished job produced, e.g. the class_reports ZIP archive",
+        responses={200: 'The file', 404: 'The job has not produced a file'}
+    )
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Stream the file named in the job's result from the default storage
+        """
+        job = self.get_object()
+        name = (job.result or {}).get('file') if job.status == Job.SUCCEEDED else None
+        if not name or not default_storage.exists(name):
+            raise Http404('This job has no file to download.')
+        return FileResponse(default_storage.open(name), as_attachment=True, filename=f"{job.name}-{os.path.basename(name)}")
+
+
+def format_event(event, name=None):
+    """
+    One Server-Sent Events message.
+    """
+    lines = [f"id: {event['id']}"]
+    if name:
+        lines.append(f'event: {name}')
+    lines.append(f'data: {json.dumps(event, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def concerns_class(event, sclass_id):
+    if event['model'] == 'sclass':
+        return event['object'] == sclass_id
+    return event['data']['sclass_id'] == sclass_id
+
+
+async def stream_events(admin_id, sclass_id=None, last_id=None):
+    """
+    Yield the messages of one stream: a reconnect delay, the events missed
+    since ``last_id``, then live events, with a keep-alive comment when idle.
+    Ends when the reader falls too far behind; the client reconnects.
+    """
+    from schools.events import get_broadcaster  # Imported on first use to keep it off startup
+    broadcaster = get_broadcaster()
+    # Subscribe before replaying, so no event falls between the two
+    subscription = broadcaster.subscribe(admin_id)
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        if last_id is not None:
+            missed = await sync_to_async(broadcaster.replay, thread_sensitive=False)(admin_id, last_id)
+            if missed is None:
+                # Too old to replay: the client reloads what it shows (or catches up with /api/v1/sync/)
+                last_id = await sync_to_async(broadcaster.current, thread_sensitive=False)(admin_id)
+                yield format_event({'id': last_id}, 'reset')
+            else:
+                for event in missed:
+                    last_id = event['id']
+                    if sclass_id is None or concerns_class(event, sclass_id):
+                        yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                return
+            if last_id is not None and event['id'] <= last_id:
+                continue  # Already replayed
+            last_id = event['id']
+            if sclass_id is None or concerns_class(event, sclass_id):
+                yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@require_GET
+async def event_stream(request):
+    """
+    Server-Sent Events stream of the current admin's class, student and
+    teacher changes (schools.events); ``?sclass=<id>`` limits it to one class.
+    A reconnecting EventSource sends ``Last-Event-ID`` and receives the events
+    it missed, or a ``reset`` event when they are no longer kept.
+    """
+    tenant = request.tenant
+    if tenant is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_403_FORBIDDEN)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for as long as the client stays connected
+        return JsonResponse(
+            {'detail': 'Event streams are served by the ASGI application (orgschool.asgi).'},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+    sclass_id = request.GET.get('sclass')
+    if sclass_id:
+        try:
+            sclass_id = uuid.UUID(sclass_id)
+        except ValueError:
+            return JsonResponse({'sclass': ['Must be a valid UUID.']}, status=status.HTTP_400_BAD_REQUEST)
+        school_ids = await sync_to_async(lambda: tenant.school_ids)()
+        if not await SClass.objects.using(tenant.using).filter(pk=sclass_id, school_id__in=school_ids).aexists():
+            raise Http404
+    last_id = request.headers.get('Last-Event-ID', '')
+    last_id = int(last_id) if last_id.isdigit() else None
+
+    response = StreamingHttpResponse(stream_events(tenant.admin_id, sclass_id or None, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
@@ -2,9 +2,162 @@
 Django admin configuration for the OrgSchool application
 Registers models and customizes admin interface for Admin, School, SClass, Student, and Teacher.
 """
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
-from .models import Admin, School, SClass, Student, Teacher
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .jobs import JOB_HANDLERS, enqueue
+from .models import Admin, School, SClass, Student, Teacher, Job
+from .sharding import shard_for
+
+
+def estimated_count(model, using):
+    """
+    The database's own row estimate for ``model``'s table, or None where there is none (SQLite).
+    Free to read, unlike COUNT(*), which scans the table on InnoDB.
+    """
+    connection = connections[using]
+    if connection.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that shows the estimated total of an unfiltered changelist once the
+    table is past ADMIN_COUNT_ESTIMATE_THRESHOLD rows. Filtered and searched lists,
+    and small tables, are counted exactly.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables that grow with every school: estimated totals,
+    no second COUNT of the whole table for filtered lists, and no facet counts.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter typed into a text box, for relations with too many rows to list.
+    """
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # Not empty, so the filter is shown
+        return [('', '')]
+
+    def choices(self, changelist):
+        # The other active filters and the search go along as hidden inputs
+        yield {
+            'value': self.value() or '',
+            'params': [(key, value) for key, value in changelist.params.items() if key != self.parameter_name],
+        }
+
+
+class TenantFilter(InputFilter):
+    """
+    Rows of one tenant, picked by admin email. Subclasses name the path to the
+    admin id in ``field``. The admin is looked up first rather than joined,
+    so it also works on tables held in a tenant shard.
+    """
+    title = 'admin email'
+    parameter_name = 'admin_email'
+    field = 'admin'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            admin_ids = list(Admin.objects.filter(email=self.value().strip()).values_list('pk', flat=True))
+            return queryset.filter(**{f'{self.field}__in': admin_ids})
+        return queryset
+
+
+class SchoolTenantFilter(TenantFilter):
+    field = 'school__admin'
+
+
+class TenantClassFilter(admin.SimpleListFilter):
+    """
+    Filter by class, listing only the classes of the tenant chosen with
+    TenantFilter. Hidden until a tenant is chosen. Like TenantFilter, the
+    admin is looked up first, and the classes are read from its shard.
+    """
+    title = 'class'
+    parameter_name = 'sclass'
+
+    def lookups(self, request, model_admin):
+        email = request.GET.get(TenantFilter.parameter_name, '').strip()
+        if not email:
+            return []
+        lookups = []
+        for admin_id in Admin.objects.filter(email=email).values_list('pk', flat=True):
+            classes = (
+                SClass.objects.using(shard_for(admin_id)).filter(school__admin_id=admin_id)
+                .order_by('name').values_list('pk', 'name')
+            )
+            lookups.extend((str(pk), name) for pk, name in classes)
+        return lookups
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(sclass_id=self.value())
+        return queryset
+
+
+class JobNameFilter(admin.SimpleListFilter):
+    """
+    Registered job names, instead of a SELECT DISTINCT over the job table.
+    """
+    title = 'name'
+    parameter_name = 'job'
+
+    def lookups(self, request, model_admin):
+        return [(name, name) for name in sorted(JOB_HANDLERS)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(name=self.value())
+        return queryset
+
+
+class AgeFilter(admin.SimpleListFilter):
+    """
+    Fixed age bands, instead of a SELECT DISTINCT over all students.
+    """
+    title = 'age'
+    parameter_name = 'age_band'
+    bands = {'0-6': (0, 6), '7-10': (7, 10), '11-14': (11, 14), '15-18': (15, 18), '19+': (19, None)}
+
+    def lookups(self, request, model_admin):
+        return [(band, band) for band in self.bands]
+
+    def queryset(self, request, queryset):
+        if self.value() in self.bands:
+            low, high = self.bands[self.value()]
+            queryset = queryset.filter(age__gte=low)
+            return queryset if high is None else queryset.filter(age__lte=high)
+        return queryset
 
 
 @admin.register(Admin)
@@ -14,7 +167,7 @@ class AdminUserAdmin(UserAdmin):
     """
     list_display = ['username', 'email', 'school_name', 'is_staff', 'date_joined']
     list_filter = ['is_staff', 'is_superuser', 'is_active', 'date_joined']
-    search_fields = ['username', 'email', 'school_name']
+    search_fields = ['^username', '^email', '^school_name']  # Prefix matches can use the unique indexes
     
     fieldsets = UserAdmin.fieldsets + (
         ('School Information', {'fields': ('school_name',)}),
@@ -23,51 +176,85 @@ class AdminUserAdmin(UserAdmin):
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('School Information', {'fields': ('email', 'school_name')}),
     )
+    actions = ['delete_in_background']
+    
+    @admin.action(description='Delete selected admins and their data in the background')
+    def delete_in_background(self, request, queryset):
+        # Large schools take too long to cascade inside the request
+        for user in queryset:
+            enqueue('delete_admin', admin=user)
+        self.message_user(request, f'Queued {queryset.count()} deletion job(s).', messages.SUCCESS)
 
 
 @admin.register(School)
-class SchoolAdmin(admin.ModelAdmin):
+class SchoolAdmin(LargeTableAdmin):
     """
     Admin panel configuration for School model.
     """
     list_display = ['name', 'admin', 'created_at']
-    list_filter = ['created_at']
-    search_fields = ['name', 'admin__username', 'admin__email']
+    list_filter = [TenantFilter, 'created_at']
+    list_select_related = ['admin']
+    search_fields = ['^name']
+    ordering = ['name']
+    autocomplete_fields = ['admin']
 
 
 @admin.register(SClass)
-class SClassAdmin(admin.ModelAdmin):
+class SClassAdmin(LargeTableAdmin):
     """
     Admin panel configuration for SClass model.
+    Roster totals are annotated on the page query instead of counted per row.
     """
     list_display = ['name', 'school', 'get_student_count', 'get_teacher_count', 'created_at']
-    list_filter = ['school', 'created_at']
-    search_fields = ['name', 'school__name']
+    list_filter = [SchoolTenantFilter, 'created_at']
+    list_select_related = ['school']
+    search_fields = ['^name']
+    ordering = ['name']  # Also orders the class autocomplete
+    autocomplete_fields = ['school']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_counts()
     
     def get_student_count(self, obj):
-        return obj.students.count()
+        return obj.student_count
     get_student_count.short_description = 'Students'
     
     def get_teacher_count(self, obj):
-        return obj.teachers.count()
+        return obj.teacher_count
     get_teacher_count.short_description = 'Teachers'
 
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(LargeTableAdmin):
     """
     Admin configuration for the Student model
     """
     list_display = ['name', 'age', 'sclass', 'admin', 'created_at']
-    list_filter = ['age', 'sclass', 'created_at']
-    search_fields = ['name', 'sclass__name', 'admin__username']
+    list_filter = [TenantFilter, TenantClassFilter, AgeFilter, 'created_at']
+    list_select_related = ['sclass__school', 'admin']  # The class is shown with its school name
+    search_fields = ['^name']
+    autocomplete_fields = ['sclass', 'admin']
 
 
 @admin.register(Teacher)
-class TeacherAdmin(admin.ModelAdmin):
+class TeacherAdmin(LargeTableAdmin):
     """
     Admin configuration for the Teacher model
     """
     list_display = ['name', 'sclass', 'admin', 'created_at']
-    list_filter = ['sclass', 'created_at']
-    search_fields = ['name', 'sclass__name', 'admin__username']
+    list_filter = [TenantFilter, TenantClassFilter, 'created_at']
+    list_select_related = ['sclass__school', 'admin']  # The class is shown with its school name
+    search_fields = ['^name']
+    autocomplete_fields = ['sclass', 'admin']
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    """
+    Admin configuration for background jobs
+    """
+    list_display = ['name', 'admin', 'status', 'attempts', 'progress_done', 'progress_total', 'run_at', 'finished_at']
+    list_filter = ['status', JobNameFilter, TenantFilter]
+    list_select_related = ['admin']
+    search_fields = ['=name']
+    readonly_fields = [field.name for field in Job._meta.fields]
@@ -0,0 +1,88 @@
+"""
+Archive partition for students and teachers who have left
+Departed rows (``left_at`` set) are moved from the hot Student/Teacher tables
+into ArchivedStudent/ArchivedTeacher in small transactions, so everyday
+``admin=`` queries only scan current members while history is kept.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedStudent, ArchivedTeacher, Student, Teacher
+
+# Hot model -> archive model
+ARCHIVES = {
+    Student: ArchivedStudent,
+    Teacher: ArchivedTeacher,
+}
+
+# Columns copied as-is from the hot row
+COPIED_FIELDS = {
+    Student: ('id', 'name', 'age', 'sclass_id', 'admin_id', 'left_at', 'created_at', 'updated_at'),
+    Teacher: ('id', 'name', 'sclass_id', 'admin_id', 'left_at', 'created_at', 'updated_at'),
+}
+
+
+def departed(model, using, before=None):
+    """
+    Rows of ``model`` on ``using`` that have left, optionally only those that left before ``before``.
+    """
+    queryset = model.objects.using(using).filter(left_at__isnull=False)
+    if before is not None:
+        queryset = queryset.filter(left_at__lt=before)
+    return queryset
+
+
+def archive_chunk(model, queryset, batch_size):
+    """
+    Move up to ``batch_size`` rows of ``queryset`` into the archive in one
+    transaction and return how many were moved.
+    """
+    using = queryset.db
+    archive_model = ARCHIVES[model]
+    with transaction.atomic(using=using):
+        rows = list(
+            queryset.select_related('sclass__school')
+            .order_by('left_at', 'pk')
+            .select_for_update(of=('self',))[:batch_size]
+        )
+        if not rows:
+            return 0
+        archived_at = timezone.now()
+        archive_model.objects.using(using).bulk_create([
+            archive_model(
+                sclass_name=row.sclass.name,
+                school_name=row.sclass.school.name,
+                archived_at=archived_at,
+                **{field: getattr(row, field) for field in COPIED_FIELDS[model]},
+            )
+            for row in rows
+        ])
+        model.objects.using(using).filter(pk__in=[row.pk for row in rows]).delete()
+    return len(rows)
+
+
+def archive_departed(model, queryset, batch_size=500):
+    """
+    Archive every row of ``queryset`` chunk by chunk; yields the running total
+    after each chunk so callers can report progress.
+    """
+    total = 0
+    while True:
+        moved = archive_chunk(model, queryset, batch_size)
+        if not moved:
+            return
+        total += moved
+        yield total
+
+
+def archive_member(obj, left_at=None):
+    """
+    Archive a single student or teacher straight away and return the archive row.
+    """
+    model = type(obj)
+    if obj.left_at is None:
+        obj.left_at = left_at or timezone.now()
+        obj.save(update_fields=['left_at', 'updated_at'])
+    queryset = model.objects.using(obj._state.db).filter(pk=obj.pk)
+    archive_chunk(model, queryset, 1)
+    return ARCHIVES[model].objects.using(obj._state.db).get(pk=obj.pk)
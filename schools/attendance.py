@@ -0,0 +1,106 @@
+"""
+Attendance for the OrgSchool application
+Marks a whole class for a day with one multi-row INSERT and aggregates
+attendance rates per class or per student in SQL over a date range.
+"""
+from django.db import connections
+from django.db.models import Count, FloatField, Q
+from django.db.models.functions import Cast, Round
+
+from .models import ArchivedStudent, Attendance, Student
+
+STATUS_NAMES = Attendance.STATUS_NAMES
+STATUS_CODES = Attendance.STATUS_CODES
+
+
+def mark_class(sclass, date, status=Attendance.PRESENT, exceptions=None):
+    """
+    Record ``status`` on ``date`` for every current student of ``sclass``,
+    except those in ``exceptions`` (``{student id: status}``), replacing any
+    earlier marks for that day. One INSERT ... ON DUPLICATE KEY UPDATE
+    (ON CONFLICT elsewhere) writes the whole class.
+    Returns ``{status: students}``.
+    """
+    using = sclass._state.db
+    exceptions = exceptions or {}
+    student_ids = Student.objects.using(using).filter(sclass=sclass, left_at__isnull=True).values_list('pk', flat=True)
+    rows = [
+        Attendance(sclass=sclass, date=date, student_id=student_id, status=exceptions.get(student_id, status))
+        for student_id in student_ids
+    ]
+    conflict = {'update_conflicts': True, 'update_fields': ['status']}
+    if connections[using].features.supports_update_conflicts_with_target:
+        # MySQL has no conflict target, the primary key is implied
+        conflict['unique_fields'] = ['sclass', 'date', 'student']
+    Attendance.objects.using(using).bulk_create(rows, **conflict)
+    counts = dict.fromkeys(STATUS_CODES, 0)
+    for row in rows:
+        counts[STATUS_NAMES[row.status]] += 1
+    return counts
+
+
+def rate_annotations():
+    """
+    Aggregates for grouped attendance rows: days, records, one count per
+    status and the attendance rate (present or late over all records).
+    """
+    counts = {
+        name: Count('status', filter=Q(status=code))
+        for code, name in Attendance.STATUS_CHOICES
+    }
+    attended = Count('status', filter=Q(status__in=Attendance.ATTENDED))
+    return {
+        'days': Count('date', distinct=True),
+        'records': Count('status'),
+        **counts,
+        'rate': Round(Cast(attended, FloatField()) / Cast(Count('status'), FloatField()), 4),
+    }
+
+
+def class_rates(queryset, start, end):
+    """
+    Attendance per class of ``queryset`` between ``start`` and ``end``
+    (inclusive): one ``{'sclass', 'sclass_name', 'days', 'records', <status
+    counts>, 'rate'}`` entry per class with records, in class name order.
+    """
+    rows = (
+        queryset.filter(date__range=(start, end))
+        .values('sclass_id', 'sclass__name')
+        .annotate(**rate_annotations())
+        .order_by('sclass__name', 'sclass_id')
+    )
+    return [
+        {'sclass': row.pop('sclass_id'), 'sclass_name': row.pop('sclass__name'), **row}
+        for row in rows
+    ]
+
+
+def student_rates(queryset, start, end):
+    """
+    Attendance per student of ``queryset`` between ``start`` and ``end``
+    (inclusive), one row per student with records, in student id order.
+    Pass a page of it to describe_student_rates.
+    """
+    return (
+        queryset.filter(date__range=(start, end))
+        .values('student_id')
+        .annotate(**rate_annotations())
+        .order_by('student_id')
+    )
+
+
+def describe_student_rates(rows, using):
+    """
+    Turn student_rates rows into ``{'student', 'student_name', ...}`` entries.
+    Archived students keep their attendance, so their names come from the archive.
+    """
+    student_ids = [row['student_id'] for row in rows]
+    names = dict(Student.objects.using(using).filter(pk__in=student_ids).values_list('pk', 'name'))
+    missing = [pk for pk in student_ids if pk not in names]
+    if missing:
+        names.update(ArchivedStudent.objects.using(using).filter(pk__in=missing).values_list('pk', 'name'))
+    return [
+        {'student': row['student_id'], 'student_name': names.get(row['student_id']),
+         **{key: value for key, value in row.items() if key != 'student_id'}}
+        for row in rows
+    ]
@@ -0,0 +1,255 @@
+"""
+Automatic class assignment for the OrgSchool application
+Spreads incoming students, or existing ones being redistributed, over the
+classes of a school by age band, filling the emptiest classes first up to a
+target size. The assignment is computed with array operations and applied
+with one INSERT for new students and one CASE UPDATE for existing ones.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from functools import cache
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .events import publish_rosters
+from .fields import CompactUUIDField
+from .models import SClass, Student
+
+MAX_AGE = 200  # Upper end of the last inferred band
+
+
+@cache
+def get_numpy():
+    """
+    numpy, imported on first use to keep it off worker startup;
+    None when it is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:  # numpy is optional, the same assignment is computed in pure Python without it
+        return None
+    return numpy
+
+
+def check_bands(bands):
+    """
+    Raise ValueError if two different ``(low, high)`` bands overlap or one is empty.
+    Classes sharing a band are fine: students are spread over them.
+    """
+    distinct = sorted(set(bands))
+    for low, high in distinct:
+        if low > high:
+            raise ValueError(f'Age band {low}-{high} is empty.')
+    for (low, high), (next_low, next_high) in zip(distinct, distinct[1:]):
+        if next_low <= high:
+            raise ValueError(f'Age bands {low}-{high} and {next_low}-{next_high} overlap.')
+
+
+def balance(ages, lows, highs, counts, target_size):
+    """
+    Assign each student (by ``ages``) to a class (by ``lows``, ``highs`` and
+    current ``counts``). A student goes to a class whose age band contains
+    their age; within a band the next student always takes the seat that
+    leaves the classes most even, and no class grows past ``target_size``.
+    Students are taken by age, so ages are spread evenly over the band's
+    classes. Bands must not overlap (see check_bands).
+
+    Returns a list with one class index per student, -1 for students outside
+    every band or beyond the free seats of theirs.
+    """
+    numpy = get_numpy()
+    if numpy is None:
+        return balance_python(ages, lows, highs, counts, target_size)
+    if not len(ages) or not len(counts):
+        return [-1] * len(ages)
+    ages = numpy.asarray(ages, dtype=numpy.int64)
+    counts = numpy.asarray(counts, dtype=numpy.int64)
+    # Distinct bands in age order, and each class's band
+    bands, class_band = numpy.unique(numpy.column_stack([lows, highs]), axis=0, return_inverse=True)
+    class_band = class_band.ravel()
+    # Each student's band: the last one starting at or below their age, if it also ends above it
+    student_band = numpy.searchsorted(bands[:, 0], ages, side='right') - 1
+    student_band[(student_band < 0) | (ages > bands[numpy.maximum(student_band, 0), 1])] = -1
+
+    # One slot per free seat, ranked by the class size once it is taken
+    free = numpy.clip(target_size - counts, 0, None)
+    slot_class = numpy.repeat(numpy.arange(len(counts)), free)
+    slot_size = numpy.arange(len(slot_class)) - numpy.repeat(numpy.cumsum(free) - free, free) + numpy.repeat(counts, free)
+    order = numpy.lexsort((slot_class, slot_size, class_band[slot_class]))
+    slot_class = slot_class[order]
+    slot_start = numpy.searchsorted(class_band[slot_class], numpy.arange(len(bands)))
+    slots = numpy.bincount(class_band[slot_class], minlength=len(bands))
+
+    # The n-th youngest student of a band takes the band's n-th slot
+    student_order = numpy.lexsort((ages, student_band))
+    band = student_band[student_order]
+    rank = numpy.arange(len(ages)) - numpy.searchsorted(band, band)
+    placed = (band >= 0) & (rank < slots[numpy.maximum(band, 0)])
+    assignment = numpy.full(len(ages), -1, dtype=numpy.int64)
+    assignment[student_order[placed]] = slot_class[slot_start[band[placed]] + rank[placed]]
+    return assignment.tolist()
+
+
+def balance_python(ages, lows, highs, counts, target_size):
+    """
+    balance() without numpy: same result, slower on large imports.
+    """
+    bands = sorted(set(zip(lows, highs)))
+    band_index = {band: i for i, band in enumerate(bands)}
+    starts = [low for low, _ in bands]
+    class_band = [band_index[band] for band in zip(lows, highs)]
+    seats = sorted(
+        (class_band[i], count + seat, i)
+        for i, count in enumerate(counts)
+        for seat in range(max(target_size - count, 0))
+    )
+    band_seats = defaultdict(list)
+    for band, _, i in seats:
+        band_seats[band].append(i)
+
+    def band_of(age):
+        band = bisect_right(starts, age) - 1
+        return band if band >= 0 and age <= bands[band][1] else -1
+
+    student_bands = [band_of(age) for age in ages]
+    taken = defaultdict(int)
+    assignment = [-1] * len(ages)
+    for student in sorted(range(len(ages)), key=lambda s: (student_bands[s], ages[s], s)):
+        band = student_bands[student]
+        if band >= 0 and taken[band] < len(band_seats[band]):
+            assignment[student] = band_seats[band][taken[band]]
+            taken[band] += 1
+    return assignment
+
+
+def class_stats(school):
+    """
+    The classes of ``school`` in name order, as ``(id, name, current students, average age)``.
+    """
+    using = school._state.db
+    stats = dict(
+        (row['sclass_id'], (row['students'], row['age']))
+        for row in Student.objects.using(using)
+        .filter(sclass__school=school, left_at__isnull=True)
+        .order_by()
+        .values('sclass_id')
+        .annotate(students=models.Count('pk'), age=models.Avg('age'))
+    )
+    return [
+        (pk, name, *stats.get(pk, (0, None)))
+        for pk, name in SClass.objects.using(using).filter(school=school).order_by('name', 'id').values_list('pk', 'name')
+    ]
+
+
+def infer_bands(stats):
+    """
+    Age bands from the classes' current students: centred on each class's
+    average age, with the boundaries halfway between neighbouring averages,
+    so every age falls in a band. Classes of the same age share one. When no
+    class has students yet, all classes share one band; otherwise empty
+    classes get none and need an explicit band.
+    """
+    centres = {pk: round(age) for pk, _, students, age in stats if students}
+    if not centres:
+        return {pk: (0, MAX_AGE) for pk, *_ in stats}
+    ordered = sorted(set(centres.values()))
+    edges = {}
+    for i, centre in enumerate(ordered):
+        low = (ordered[i - 1] + centre) // 2 + 1 if i else 0
+        high = (centre + ordered[i + 1]) // 2 if i + 1 < len(ordered) else MAX_AGE
+        edges[centre] = (low, high)
+    return {pk: edges[centre] for pk, centre in centres.items()}
+
+
+def assign_students(school, incoming=(), student_ids=(), target_size=30, bands=None, dry_run=False):
+    """
+    Spread ``incoming`` new students (``{'name', 'age'}`` dicts) and the
+    current students ``student_ids`` of ``school`` over its classes with
+    balance(). ``bands`` maps class ids to ``(low, high)`` ages and limits the
+    assignment to those classes; without it bands are inferred (infer_bands).
+    Callers validate the ids and bands.
+
+    Unless ``dry_run``, creates the placed new students with one INSERT and
+    moves the placed existing ones with one UPDATE, in one transaction.
+    Unplaced students are not created or moved. Returns ``{'assigned',
+    'unplaced', 'unplaced_students', 'classes'}``: ``unplaced`` lists the
+    indexes of unplaced incoming students, ``classes`` has one ``{'sclass',
+    'sclass_name', 'low', 'high', 'before', 'after'}`` entry per class.
+    """
+    using = school._state.db
+    with transaction.atomic(using=using):
+        moving = Student.objects.using(using).filter(pk__in=list(student_ids), sclass__school=school, left_at__isnull=True)
+        if not dry_run:
+            # Lock the students being moved so the counts match what the UPDATE changes
+            moving = moving.select_for_update()
+        moving = list(moving.order_by('pk').values_list('pk', 'sclass_id', 'age'))
+        stats = class_stats(school)
+        if bands is None:
+            bands = infer_bands(stats)
+        moved_out = defaultdict(int)
+        for _, sclass_id, _ in moving:
+            moved_out[sclass_id] += 1
+        # Only classes with a band take students; the movers no longer count towards their class
+        banded = [(pk, name, students - moved_out[pk]) for pk, name, students, _ in stats if pk in bands]
+        assignment = balance(
+            [student['age'] for student in incoming] + [age for _, _, age in moving],
+            [bands[pk][0] for pk, _, _ in banded],
+            [bands[pk][1] for pk, _, _ in banded],
+            [students for _, _, students in banded],
+            target_size,
+        )
+        targets = [banded[i][0] if i >= 0 else None for i in assignment]
+        new_targets, move_targets = targets[:len(incoming)], targets[len(incoming):]
+
+        if not dry_run:
+            now = timezone.now()
+            Student.objects.using(using).bulk_create([
+                Student(name=student['name'], age=student['age'], sclass_id=target, admin_id=school.admin_id)
+                for student, target in zip(incoming, new_targets) if target is not None
+            ])
+            moves = defaultdict(list)
+            for (pk, sclass_id, _), target in zip(moving, move_targets):
+                if target is not None and target != sclass_id:
+                    moves[target].append(pk)
+            if moves:
+                Student.objects.using(using).filter(pk__in=[pk for pks in moves.values() for pk in pks]).update(
+                    sclass_id=models.Case(
+                        # Each Value needs the column type itself, the Case's does not reach it
+                        *[
+                            models.When(pk__in=pks, then=models.Value(target, output_field=CompactUUIDField()))
+                            for target, pks in moves.items()
+                        ],
+                        output_field=CompactUUIDField(),  # Same column type as the class id
+                    ),
+                    updated_at=now,  # update() skips auto_now
+                )
+            # Classes that gained or lost students
+            changed = {target for target in new_targets if target is not None} | set(moves)
+            changed.update(sclass_id for (_, sclass_id, _), target in zip(moving, move_targets) if target not in (None, sclass_id))
+            publish_rosters(school.admin_id, changed, using)
+
+    after = {pk: students for pk, _, students, _ in stats}
+    for target in new_targets:
+        if target is not None:
+            after[target] += 1
+    for (_, sclass_id, _), target in zip(moving, move_targets):
+        if target is not None:
+            after[sclass_id] -= 1
+            after[target] += 1
+    return {
+        'assigned': sum(target is not None for target in targets),
+        'unplaced': [i for i, target in enumerate(new_targets) if target is None],
+        'unplaced_students': [pk for (pk, _, _), target in zip(moving, move_targets) if target is None],
+        'classes': [
+            {
+                'sclass': pk,
+                'sclass_name': name,
+                'low': bands[pk][0] if pk in bands else None,
+                'high': bands[pk][1] if pk in bands else None,
+                'before': students,
+                'after': after[pk],
+            }
+            for pk, name, students, _ in stats
+        ],
+    }
@@ -0,0 +1,52 @@
+"""
+System checks for the OrgSchool application
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def is_process_local(alias='default'):
+    """
+    Whether the cache ``alias`` lives in each process's own memory.
+    """
+    return settings.CACHES[alias]['BACKEND'] in LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Caches that must agree across processes need a shared backend: on a
+    per-process cache a logout, password change, deactivation or new school
+    only reaches the process that handled it, and a moved tenant keeps being
+    routed to its old shard by the other processes.
+    """
+    if not is_process_local():
+        return []
+    errors = []
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.cached_db':
+        errors.append(Error(
+            'The cached_db session engine needs a shared cache.',
+            hint="Set CACHE_URL, or SESSION_ENGINE to 'django.contrib.sessions.backends.db'.",
+            id='schools.E001',
+        ))
+    if settings.AUTH_USER_CACHE_TIMEOUT:
+        errors.append(Error(
+            'The user cache (AUTH_USER_CACHE_TIMEOUT) needs a shared cache.',
+            hint='Set CACHE_URL, or AUTH_USER_CACHE_TIMEOUT to 0.',
+            id='schools.E002',
+        ))
+    if settings.TENANT_SCHOOLS_CACHE_TIMEOUT:
+        errors.append(Error(
+            'The tenant schools cache (TENANT_SCHOOLS_CACHE_TIMEOUT) needs a shared cache.',
+            hint='Set CACHE_URL, or TENANT_SCHOOLS_CACHE_TIMEOUT to 0.',
+            id='schools.E003',
+        ))
+    if settings.TENANT_SHARD_CACHE_TIMEOUT:
+        errors.append(Error(
+            'The tenant shard cache (TENANT_SHARD_CACHE_TIMEOUT) needs a shared cache.',
+            hint='Set CACHE_URL, or TENANT_SHARD_CACHE_TIMEOUT to 0.',
+            id='schools.E004',
+        ))
+    return errors
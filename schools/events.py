@@ -0,0 +1,288 @@
+"""
+Live change events for the OrgSchool application
+Saving or deleting a class, student or teacher publishes a small event to the
+admin's channel once the transaction commits (see schools.signals); the API
+streams each channel to the browser as Server-Sent Events. Set-based changes
+(class assignment, promotion) publish one ``roster`` event per class instead
+of one per student.
+
+Events carry a per-tenant sequence number as their id. The broadcaster keeps
+the last EVENTS_BUFFER events of each streamed tenant, so a stream that
+reconnects with ``Last-Event-ID`` gets what it missed, or a ``reset`` when
+that is gone.
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Fields sent with a saved row, besides its id
+EVENT_FIELDS = {
+    'sclass': ['name', 'school_id', 'updated_at'],
+    'student': ['name', 'age', 'sclass_id', 'left_at', 'updated_at'],
+    'teacher': ['name', 'sclass_id', 'left_at', 'updated_at'],
+}
+
+
+class Subscription:
+    """
+    One open stream: a queue on the event loop that serves it. Events may be
+    delivered from any thread. A reader that falls EVENTS_QUEUE_SIZE events
+    behind gets None and should end the stream; the client resumes from its
+    last event id.
+    """
+
+    def __init__(self, admin_id, size):
+        self.admin_id = admin_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(size)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.put, event)
+        except RuntimeError:  # The loop has closed, the stream is gone
+            pass
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroadcaster:
+    """
+    Events published and streamed in this process. Only tenants with an open
+    stream here are numbered and buffered; their state is dropped with their
+    last stream, and a later stream starts its numbers past every id this
+    process handed out, so an old ``Last-Event-ID`` gets a reset. Streams
+    served by another worker process never see these events: run a single
+    ASGI process, or use the cache backend.
+
+    Other backends subclass this and override publish(), replay(), current()
+    and, to learn of events from other processes, subscribe()/unsubscribe();
+    deliver() hands an event to this process's streams.
+    """
+
+    def __init__(self, buffer_size=1000, queue_size=1000):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+        self.history = defaultdict(partial(deque, maxlen=buffer_size))
+        self.sequence = {}
+        self.published = 0  # Events published in this process, at least every id handed out
+
+    def subscribe(self, admin_id):
+        """
+        Open a subscription to ``admin_id``'s events; call from the event loop of the stream.
+        """
+        subscription = Subscription(admin_id, self.queue_size)
+        with self.lock:
+            self.subscriptions[admin_id].add(subscription)
+            self.sequence.setdefault(admin_id, self.published)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.admin_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.admin_id]
+                    self.sequence.pop(subscription.admin_id, None)
+                    self.history.pop(subscription.admin_id, None)
+
+    def deliver(self, admin_id, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(admin_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def current(self, admin_id):
+        """
+        The id of ``admin_id``'s latest event, or the one its numbering
+        starts after when none was published since its first stream opened.
+        """
+        with self.lock:
+            return self.sequence.get(admin_id, 0)
+
+    def publish(self, admin_id, event):
+        """
+        Number ``event`` and send it to every stream of ``admin_id``; nothing
+        when this process streams none.
+        """
+        with self.lock:
+            # Counted even when dropped, so a stream resuming across the gap gets a reset
+            self.published += 1
+            if admin_id not in self.sequence:
+                return
+            self.sequence[admin_id] += 1
+            event = {'id': self.sequence[admin_id], **event}
+            self.history[admin_id].append(event)
+        self.deliver(admin_id, event)
+
+    def replay(self, admin_id, last_id):
+        """
+        The events of ``admin_id`` after ``last_id``, or None when some of
+        them are no longer kept (or ``last_id`` is from before a restart).
+        """
+        with self.lock:
+            sequence = self.sequence.get(admin_id, 0)
+            events = [event for event in self.history.get(admin_id, ()) if event['id'] > last_id]
+        if last_id > sequence or len(events) < sequence - last_id:
+            return None
+        return events
+
+
+class CacheBroadcaster(LocalBroadcaster):
+    """
+    Events shared by all processes through a cache backend (EVENTS_CACHE, e.g.
+    Redis or Memcached): each event is stored under its tenant's sequence
+    number, taken with an atomic incr. One thread per process polls the
+    sequence of the tenants it streams every EVENTS_POLL_INTERVAL seconds
+    and delivers the new events.
+    """
+
+    def __init__(self, alias='default', poll_interval=0.5, timeout=3600, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = caches[alias]
+        self.poll_interval = poll_interval
+        self.timeout = timeout  # How long events are kept for replay
+        self.seen = {}
+        self.poller = None
+
+    def sequence_key(self, admin_id):
+        return f'events:{admin_id}'
+
+    def event_key(self, admin_id, event_id):
+        return f'events:{admin_id}:{event_id}'
+
+    def current(self, admin_id):
+        return self.cache.get(self.sequence_key(admin_id), 0)
+
+    def publish(self, admin_id, event):
+        key = self.sequence_key(admin_id)
+        self.cache.add(key, 0, None)
+        event_id = self.cache.incr(key)
+        self.cache.set(self.event_key(admin_id, event_id), {'id': event_id, **event}, self.timeout)
+
+    def fetch(self, admin_id, first, last):
+        """
+        Events ``first`` to ``last`` of ``admin_id`` from the cache, or None if one has expired.
+        """
+        keys = [self.event_key(admin_id, event_id) for event_id in range(first, last + 1)]
+        found = self.cache.get_many(keys)
+        if len(found) < len(keys):
+            return None
+        return [found[key] for key in keys]
+
+    def replay(self, admin_id, last_id):
+        sequence = self.current(admin_id)
+        if last_id > sequence or sequence - last_id > self.buffer_size:
+            return None
+        return self.fetch(admin_id, last_id + 1, sequence)
+
+    def subscribe(self, admin_id):
+        subscription = super().subscribe(admin_id)
+        with self.lock:
+            self.seen.setdefault(admin_id, self.current(admin_id))
+            if self.poller is None:
+                self.poller = threading.Thread(target=self.poll, name='events-poller', daemon=True)
+                self.poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        super().unsubscribe(subscription)
+        with self.lock:
+            if subscription.admin_id not in self.subscriptions:
+                self.seen.pop(subscription.admin_id, None)
+
+    def poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self.lock:
+                seen = dict(self.seen)
+            if not seen:
+                continue
+            sequences = self.cache.get_many([self.sequence_key(admin_id) for admin_id in seen])
+            for admin_id, last in seen.items():
+                sequence = sequences.get(self.sequence_key(admin_id), 0)
+                if sequence <= last:
+                    continue
+                first = max(last + 1, sequence - self.buffer_size + 1)
+                keys = [self.event_key(admin_id, event_id) for event_id in range(first, sequence + 1)]
+                found = self.cache.get_many(keys)
+                with self.lock:
+                    if admin_id in self.seen:
+                        self.seen[admin_id] = sequence
+                # Events that expired before they were read are skipped; streams see the gap in the ids
+                for key in keys:
+                    if key in found:
+                        self.deliver(admin_id, found[key])
+
+
+_broadcaster = None
+
+
+def get_broadcaster():
+    """
+    The broadcaster configured by EVENTS_BACKEND: 'local', 'cache', or the
+    dotted path of a LocalBroadcaster subclass.
+    """
+    global _broadcaster
+    if _broadcaster is None:
+        options = {'buffer_size': settings.EVENTS_BUFFER, 'queue_size': settings.EVENTS_QUEUE_SIZE}
+        if settings.EVENTS_BACKEND == 'local':
+            _broadcaster = LocalBroadcaster(**options)
+        elif settings.EVENTS_BACKEND == 'cache':
+            _broadcaster = CacheBroadcaster(
+                settings.EVENTS_CACHE, settings.EVENTS_POLL_INTERVAL, settings.EVENTS_CACHE_TIMEOUT, **options
+            )
+        else:
+            _broadcaster = import_string(settings.EVENTS_BACKEND)(**options)
+    return _broadcaster
+
+
+def publish_on_commit(admin_id, event, using):
+    """
+    Publish ``event`` to ``admin_id``'s channel once the current transaction
+    on ``using`` commits (right away outside one); nothing on rollback.
+    """
+    event = {**event, 'at': timezone.now()}
+    transaction.on_commit(partial(get_broadcaster().publish, admin_id, event), using=using)
+
+
+def change_event(kind, instance, action):
+    """
+    The event for ``instance`` of ``kind`` (a SYNCED_MODELS key) being
+    ``'saved'`` or ``'deleted'``. Saves carry EVENT_FIELDS so clients can
+    update without refetching.
+    """
+    event = {'model': kind, 'action': action, 'object': instance.pk}
+    if action == 'saved':
+        event['data'] = {field: getattr(instance, field) for field in EVENT_FIELDS[kind]}
+    elif kind != 'sclass':
+        event['data'] = {'sclass_id': instance.sclass_id}
+    return event
+
+
+def publish_rosters(admin_id, class_ids, using):
+    """
+    Tell ``admin_id``'s streams that the members of ``class_ids`` changed in
+    bulk, without per-student events; clients reload those classes.
+    """
+    for sclass_id in sorted(set(class_ids), key=str):
+        publish_on_commit(admin_id, {'model': 'sclass', 'action': 'roster', 'object': sclass_id}, using)
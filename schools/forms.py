@@ -5,40 +5,39 @@ Defines forms for admin registration, login, and CRUD for students, teachers, an
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 from .models import School, SClass, Student, Teacher
-from crispy_forms.helper import FormHelper
-from crispy_forms.layout import Layout, Submit, Row, Column, Field
+from .sharding import assign_shard, use_shard
 
 Admin = get_user_model()
 
 
-class AdminRegistrationForm(UserCreationForm):
+class CrispyHelperMixin:
+    """
+    Builds the crispy FormHelper on first access, i.e. when the form is rendered.
+    ``helper_name`` names a builder in ``schools.layouts``.
+    """
+    helper_name = None
+
+    @cached_property
+    def helper(self):
+        from . import layouts
+        return getattr(layouts, self.helper_name)()
+
+
+class AdminRegistrationForm(CrispyHelperMixin, UserCreationForm):
     """
     Registration form for school administrators.
     Extends Django's UserCreationForm.
     """
     email = forms.EmailField(required=True)
     school_name = forms.CharField(max_length=128, required=True)
+    helper_name = 'admin_registration_helper'
     
     class Meta:
         model = Admin
         fields = ('username', 'email', 'school_name', 'password1', 'password2')
     
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            Row(
-                Column('username', css_class='form-group col-md-6 mb-0'),
-                Column('email', css_class='form-group col-md-6 mb-0'),
-                css_class='form-row'
-            ),
-            'school_name',
-            'password1',
-            'password2',
-            Submit('submit', 'Sign Up', css_class='btn btn-primary')
-        )
-    
     def clean_email(self):
         # Ensure email is unique
         email = self.cleaned_data.get('email')
@@ -60,98 +59,75 @@ class AdminRegistrationForm(UserCreationForm):
         user.school_name = self.cleaned_data['school_name']
         if commit:
             user.save()
-            # Create the school and default classes
-            school = School.objects.create(
-                name=user.school_name,
-                admin=user
-            )
-            # Create 4 default classes
-            for i in range(1, 5):
-                SClass.objects.create(
-                    name=f"Class 0{i}",
-                    school=school
+            # Create the school and default classes on the new tenant's shard
+            with use_shard(assign_shard(user)):
+                school = School.objects.create(
+                    name=user.school_name,
+                    admin=user
                 )
+                # Create 4 default classes
+                for i in range(1, 5):
+                    SClass.objects.create(
+                        name=f"Class 0{i}",
+                        school=school
+                    )
         return user
 
 
-class AdminLoginForm(AuthenticationForm):
+class AdminLoginForm(CrispyHelperMixin, AuthenticationForm):
     """
     Login form for administrators
     """
+    helper_name = 'admin_login_helper'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['username'].widget.attrs.update({'placeholder': 'Email'})
         self.fields['password'].widget.attrs.update({'placeholder': 'Password'})
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            'username',
-            'password',
-            Submit('submit', 'Login', css_class='btn btn-primary')
-        )
 
 
-class StudentForm(forms.ModelForm):
+class StudentForm(CrispyHelperMixin, forms.ModelForm):
     """
     Form for creating/editing students
     """
+    helper_name = 'student_helper'
+
     class Meta:
         model = Student
         fields = ['name', 'age', 'sclass']
     
     def __init__(self, *args, **kwargs):
-        admin = kwargs.pop('admin', None)
+        tenant = kwargs.pop('tenant', None)
         super().__init__(*args, **kwargs)
-        if admin:
-            # Filter classes by the admin's school
-            self.fields['sclass'].queryset = SClass.objects.filter(school__admin=admin)
-        
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            Row(
-                Column('name', css_class='form-group col-md-8 mb-0'),
-                Column('age', css_class='form-group col-md-4 mb-0'),
-                css_class='form-row'
-            ),
-            'sclass',
-            Submit('submit', 'Save Student', css_class='btn btn-primary')
-        )
-
-
-class TeacherForm(forms.ModelForm):
+        if tenant:
+            # Only the classes of the admin's schools
+            self.fields['sclass'].queryset = SClass.objects.filter(school_id__in=tenant.school_ids).select_related('school')
+
+
+class TeacherForm(CrispyHelperMixin, forms.ModelForm):
     """
     Form for creating/editing teachers
     """
+    helper_name = 'teacher_helper'
+
     class Meta:
         model = Teacher
         fields = ['name', 'sclass']
     
     def __init__(self, *args, **kwargs):
-        admin = kwargs.pop('admin', None)
+        tenant = kwargs.pop('tenant', None)
         super().__init__(*args, **kwargs)
-        if admin:
-            # Filter classes by the admin's school
-            self.fields['sclass'].queryset = SClass.objects.filter(school__admin=admin)
-        
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            'name',
-            'sclass',
-            Submit('submit', 'Save Teacher', css_class='btn btn-primary')
-        )
-
-
-class SClassForm(forms.ModelForm):
+        if tenant:
+            # Only the classes of the admin's schools
+            self.fields['sclass'].queryset = SClass.objects.filter(school_id__in=tenant.school_ids).select_related('school')
+
+
+class SClassForm(CrispyHelperMixin, forms.ModelForm):
     """
     Form for creating/editing classes
     """
+    helper_name = 'sclass_helper'
+
     class Meta:
         model = SClass
         fields = ['name']
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            'name',
-            Submit('submit', 'Save Class', css_class='btn btn-primary')
-        )
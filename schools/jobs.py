@@ -0,0 +1,187 @@
+"""
+Database-backed background jobs for the OrgSchool application
+Handlers are registered with ``@job('name')`` and queued with ``enqueue()``;
+`manage.py run_workers` claims queued rows from the Job table and runs them
+in a thread or process pool, retrying failures with exponential backoff.
+"""
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, models
+from django.utils import timezone
+
+from .models import Job
+from .sharding import use_tenant
+
+# Job name -> (handler, whether admins may queue it through the API, parameters form)
+JOB_HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    """
+    Raised by ``JobContext.progress`` once the job has been cancelled.
+    """
+
+
+def job(name, public=False, params=None):
+    """
+    Register ``handler(context, **payload)`` as the job ``name``.
+    Public jobs can be queued by admins through POST /api/v1/jobs/.
+    ``params`` is a Form with one optional field per handler argument; a
+    job without one takes no payload (see clean_payload).
+    """
+    def register(handler):
+        JOB_HANDLERS[name] = (handler, public, params)
+        return handler
+    return register
+
+
+def clean_payload(name, payload):
+    """
+    Check ``payload`` against the parameters of the job ``name`` and return
+    the handler's keyword arguments. Raises ValidationError unless it is a
+    JSON object of known, valid parameters.
+    """
+    if not isinstance(payload, dict):
+        raise ValidationError('The payload must be a JSON object.')
+    params = JOB_HANDLERS[name][2] or forms.Form
+    unknown = sorted(set(payload) - set(params.base_fields))
+    if unknown:
+        raise ValidationError(f"Unknown parameters: {', '.join(unknown)}.")
+    form = params(data=payload)
+    if not form.is_valid():
+        raise ValidationError(form.errors)
+    # Left out when empty, so the handler's default applies
+    return {key: form.cleaned_data[key] for key in payload if form.cleaned_data[key] is not None}
+
+
+def enqueue(name, admin=None, payload=None, max_attempts=None, run_at=None):
+    """
+    Queue the job ``name`` and return its Job row. Raises ValidationError
+    for a payload the handler does not take.
+    """
+    if name not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job: {name}')
+    return Job.objects.create(
+        name=name,
+        admin=admin,
+        payload=clean_payload(name, payload or {}),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class JobContext:
+    """
+    Passed to handlers: the Job row plus progress reporting.
+    """
+
+    def __init__(self, job):
+        self.job = job
+
+    def owned(self):
+        """
+        The job's row, as long as this worker still holds it.
+        """
+        return Job.objects.filter(pk=self.job.pk, status=Job.RUNNING, locked_by=self.job.locked_by)
+
+    def progress(self, done, total=None, message=''):
+        """
+        Record progress and refresh the job's lease. Raises JobCancelled if
+        the job was cancelled meanwhile, so handlers stop at a safe point.
+        """
+        fields = {
+            'progress_done': done,
+            'progress_message': message[:255],
+            'locked_at': timezone.now(),
+            'updated_at': timezone.now(),
+        }
+        if total is not None:
+            fields['progress_total'] = total
+        if not self.owned().update(**fields):
+            raise JobCancelled(f'{self.job} is no longer running')
+
+
+def claim_jobs(limit, worker=None):
+    """
+    Claim up to ``limit`` due jobs for ``worker`` and return their ids.
+    Each claim is a conditional UPDATE, so concurrent workers never run
+    the same job twice and no row locks are held. Running jobs whose lease
+    (JOB_LEASE_SECONDS without progress) ran out are claimed again.
+    """
+    now = timezone.now()
+    worker = worker or worker_name()
+    stale = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    due = (
+        models.Q(status=Job.QUEUED, run_at__lte=now)
+        | models.Q(status=Job.RUNNING, locked_at__lt=stale)
+    )
+    claimed = []
+    candidates = Job.objects.filter(due).order_by('run_at').values_list('pk', 'status', 'locked_at')[:limit * 2]
+    for pk, status, locked_at in candidates:
+        updated = Job.objects.filter(pk=pk, status=status, locked_at=locked_at).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=models.F('attempts') + 1,
+            updated_at=now,
+        )
+        if updated:
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def run_job(job_id):
+    """
+    Run a claimed job and record the outcome. Failed attempts are requeued
+    with exponential backoff until ``max_attempts`` is reached.
+    Safe to call from pool threads and processes.
+    """
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        context = JobContext(job)
+        handler = JOB_HANDLERS.get(job.name, (None,))[0]
+        try:
+            if handler is None:
+                raise LookupError(f'No handler registered for {job.name}')
+            if job.attempts > job.max_attempts:
+                # Workers died holding the job (lease expiry counts as an attempt)
+                raise RuntimeError(f'Gave up after {job.max_attempts} attempts')
+            with use_tenant(job.admin_id):
+                result = handler(context, **job.payload)
+        except JobCancelled:
+            return Job.CANCELLED
+        except Exception:
+            error = traceback.format_exc()
+            now = timezone.now()
+            if job.attempts < job.max_attempts:
+                delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+                context.owned().update(
+                    status=Job.QUEUED, run_at=now + timedelta(seconds=delay),
+                    error=error, locked_by='', locked_at=None, updated_at=now,
+                )
+                return Job.QUEUED
+            context.owned().update(
+                status=Job.FAILED, error=error, finished_at=now, updated_at=now,
+            )
+            return Job.FAILED
+
+        now = timezone.now()
+        context.owned().update(
+            status=Job.SUCCEEDED, result=result, error='', finished_at=now, updated_at=now,
+        )
+        return Job.SUCCEEDED
+    finally:
+        close_old_connections()
@@ -0,0 +1,80 @@
+"""
+Crispy form layouts for the OrgSchool application
+Imported on first form render (see ``CrispyHelperMixin``) so crispy_forms stays off the startup path.
+"""
+from crispy_forms.helper import FormHelper
+from crispy_forms.layout import Layout, Submit, Row, Column
+
+
+def admin_registration_helper():
+    """
+    Layout for AdminRegistrationForm.
+    """
+    helper = FormHelper()
+    helper.layout = Layout(
+        Row(
+            Column('username', css_class='form-group col-md-6 mb-0'),
+            Column('email', css_class='form-group col-md-6 mb-0'),
+            css_class='form-row'
+        ),
+        'school_name',
+        'password1',
+        'password2',
+        Submit('submit', 'Sign Up', css_class='btn btn-primary')
+    )
+    return helper
+
+
+def admin_login_helper():
+    """
+    Layout for AdminLoginForm.
+    """
+    helper = FormHelper()
+    helper.layout = Layout(
+        'username',
+        'password',
+        Submit('submit', 'Login', css_class='btn btn-primary')
+    )
+    return helper
+
+
+def student_helper():
+    """
+    Layout for StudentForm.
+    """
+    helper = FormHelper()
+    helper.layout = Layout(
+        Row(
+            Column('name', css_class='form-group col-md-8 mb-0'),
+            Column('age', css_class='form-group col-md-4 mb-0'),
+            css_class='form-row'
+        ),
+        'sclass',
+        Submit('submit', 'Save Student', css_class='btn btn-primary')
+    )
+    return helper
+
+
+def teacher_helper():
+    """
+    Layout for TeacherForm.
+    """
+    helper = FormHelper()
+    helper.layout = Layout(
+        'name',
+        'sclass',
+        Submit('submit', 'Save Teacher', css_class='btn btn-primary')
+    )
+    return helper
+
+
+def sclass_helper():
+    """
+    Layout for SClassForm.
+    """
+    helper = FormHelper()
+    helper.layout = Layout(
+        'name',
+        Submit('submit', 'Save Class', css_class='btn btn-primary')
+    )
+    return helper
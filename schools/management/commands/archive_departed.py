@@ -0,0 +1,73 @@
+"""
+Management command to move departed students and teachers into the archive tables
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from schools.archive import ARCHIVES, archive_departed, departed
+from schools.models import Admin
+
+
+class Command(BaseCommand):
+    help = (
+        'Move students and teachers whose left_at is set into ArchivedStudent/ArchivedTeacher, '
+        'one small transaction per batch, on every tenant database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=0,
+            help='Only archive rows that left at least this many days ago'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows moved per transaction'
+        )
+        parser.add_argument(
+            '--admin',
+            help='Only archive this admin (id or email)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many rows would be archived without moving them'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        before = timezone.now() - timedelta(days=options['days'])
+
+        admin_id = None
+        if options['admin']:
+            lookup = {'email': options['admin']} if '@' in options['admin'] else {'pk': options['admin']}
+            try:
+                admin_id = Admin.objects.get(**lookup).pk
+            except (Admin.DoesNotExist, ValidationError):
+                raise CommandError(f"Admin not found: {options['admin']}")
+
+        # Tenants that predate sharding still live on default
+        databases = sorted(set(settings.TENANT_SHARDS) | {DEFAULT_DB_ALIAS})
+        for using in databases:
+            for model in ARCHIVES:
+                queryset = departed(model, using, before)
+                if admin_id is not None:
+                    queryset = queryset.filter(admin_id=admin_id)
+                label = f'{using}: {model.__name__}'
+                if options['dry_run']:
+                    self.stdout.write(f'{label}: {queryset.count()} rows to archive')
+                    continue
+                total = 0
+                for total in archive_departed(model, queryset, options['batch_size']):
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'  {total} rows moved')
+                self.stdout.write(self.style.SUCCESS(f'{label}: {total} rows archived'))
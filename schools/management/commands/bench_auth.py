@@ -0,0 +1,173 @@
+"""
+Management command to measure password hashing cost and login/registration throughput
+"""
+import json
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from schools.forms import AdminLoginForm, AdminRegistrationForm
+from schools.models import Admin
+
+BENCH_DOMAIN = 'bench.invalid'
+PASSWORD = 'quartz-maple-7391'
+
+
+def hash_ms(hasher, repeat=3):
+    """
+    Fastest of ``repeat`` hashes with ``hasher``, in milliseconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hasher.encode(PASSWORD, hasher.salt())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 1)
+
+
+def run_concurrently(func, total, concurrency):
+    """
+    Call ``func(i)`` for ``i`` in ``range(total)`` from ``concurrency`` threads;
+    return the calls per second.
+    """
+    errors = []
+
+    def worker(indexes):
+        try:
+            for i in indexes:
+                func(i)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(range(n, total, concurrency),)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return round(total / (time.perf_counter() - start), 1)
+
+
+class Command(BaseCommand):
+    help = 'Time password hashing, logins and registrations, and check them against the budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'auth.json'),
+            help='Budget file to check against or update'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Write the current measurements as the new budget'
+        )
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=40,
+            help='Logins to time'
+        )
+        parser.add_argument(
+            '--registrations',
+            type=int,
+            default=10,
+            help='Registrations to time (the accounts are deleted afterwards)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.PASSWORD_HASH_WORKERS,
+            help='Threads sending logins and registrations at the same time'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.5,
+            help='Allowed drift from the budget, either way for hashing cost'
+        )
+
+    def handle(self, *args, **options):
+        budget_path = Path(options['budget'])
+        budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+        tolerance = 1 + options['tolerance']
+        results = {'policy': settings.PASSWORD_HASHER, 'hash_ms': {}}
+        failures = []
+
+        # Cost of one hash under each configurable hasher usable here
+        for path in settings.PASSWORD_HASHERS:
+            if not path.startswith('orgschool.'):
+                continue
+            hasher = import_string(path)()
+            try:
+                if hasher.library:
+                    hasher._load_library()
+            except ValueError:
+                self.stdout.write(f'{hasher.algorithm:<14} library not installed, skipped')
+                continue
+            results['hash_ms'][hasher.algorithm] = hash_ms(hasher)
+
+        run = uuid.uuid4().hex[:8]
+        try:
+            login_email = f'login-{run}@{BENCH_DOMAIN}'
+            Admin.objects.create(
+                username=f'bench-login-{run}', email=login_email, school_name=f'Bench {run}',
+                password=make_password(PASSWORD),
+            )
+
+            def log_in(i):
+                form = AdminLoginForm(data={'username': login_email, 'password': PASSWORD})
+                if not form.is_valid():
+                    raise CommandError(f'Bench login failed: {form.errors.as_text()}')
+
+            def register(i):
+                form = AdminRegistrationForm(data={
+                    'username': f'bench-{run}-{i}', 'email': f'{run}-{i}@{BENCH_DOMAIN}',
+                    'school_name': f'Bench {run} {i}', 'password1': PASSWORD, 'password2': PASSWORD,
+                })
+                if not form.is_valid():
+                    raise CommandError(f'Bench registration failed: {form.errors.as_text()}')
+                form.save()
+
+            results['login_per_s'] = run_concurrently(log_in, options['logins'], options['concurrency'])
+            results['register_per_s'] = run_concurrently(register, options['registrations'], options['concurrency'])
+        finally:
+            for admin in Admin.objects.filter(email__endswith=f'@{BENCH_DOMAIN}'):
+                admin.delete()
+
+        self.stdout.write(f"Policy {results['policy']}, {options['concurrency']} concurrent, {settings.PASSWORD_HASH_WORKERS} hash workers")
+        for algorithm, ms in results['hash_ms'].items():
+            self.stdout.write(f'  hash {algorithm:<14} {ms:8.1f} ms')
+            allowed = budget.get('hash_ms', {}).get(algorithm)
+            if allowed is not None and ms > allowed * tolerance:
+                failures.append(f'{algorithm}: {ms} ms per hash exceeds budget {allowed} ms')
+            elif allowed is not None and ms < allowed / tolerance:
+                failures.append(f'{algorithm}: {ms} ms per hash is far below budget {allowed} ms; was the cost lowered?')
+        for key in ('login_per_s', 'register_per_s'):
+            self.stdout.write(f'  {key:<19} {results[key]:8.1f}')
+            allowed = budget.get(key)
+            if allowed is not None and results[key] < allowed / tolerance:
+                failures.append(f'{key}: {results[key]} below budget {allowed}')
+
+        if options['update']:
+            budget_path.parent.mkdir(parents=True, exist_ok=True)
+            budget_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Updated budget {budget_path}'))
+            return
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} auth budget violation(s)')
+        self.stdout.write(self.style.SUCCESS('Password hashing and auth throughput within budget'))
@@ -0,0 +1,173 @@
+"""
+Management command to compare random and time-ordered UUID primary keys
+"""
+import json
+import time
+import uuid
+from pathlib import Path
+
+from django.apps.registry import Apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, models
+from django.utils import timezone
+
+from schools.fields import CompactUUIDField, uuid7, uuid7_floor
+
+# Throwaway tables, kept out of the project's app registry
+bench_apps = Apps()
+
+LAYOUTS = {'uuid4': uuid.uuid4, 'uuid7': uuid7}
+
+
+def bench_model(layout):
+    """
+    A student-shaped table keyed by ``layout`` ids, with an index on the creation time.
+    """
+    meta = type('Meta', (), {'app_label': 'schools', 'db_table': f'bench_ids_{layout}', 'apps': bench_apps})
+    return type(f'BenchIds{layout}', (models.Model,), {
+        '__module__': __name__,
+        'Meta': meta,
+        'id': CompactUUIDField(primary_key=True, default=LAYOUTS[layout], editable=False),
+        'admin_id': CompactUUIDField(),
+        'name': models.CharField(max_length=128),
+        'created_at': models.DateTimeField(db_index=True),
+    })
+
+
+MODELS = {layout: bench_model(layout) for layout in LAYOUTS}
+
+
+def table_bytes(connection, table):
+    """
+    Data plus index size of ``table``, where the backend reports it.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'ANALYZE TABLE {connection.ops.quote_name(table)}')
+            cursor.fetchall()
+            cursor.execute(
+                'SELECT DATA_LENGTH + INDEX_LENGTH FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+        else:
+            return None
+        return int(cursor.fetchone()[0])
+
+
+class Command(BaseCommand):
+    help = 'Time bulk inserts and recent-row range scans with random (v4) and time-ordered (v7) UUID keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'ids.json'),
+            help='Budget file to check against or update'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Write the current measurements as the new budget'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100000,
+            help='Rows inserted per layout'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per INSERT'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to run against; the tables are dropped afterwards'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.5,
+            help='Allowed drift from the budget'
+        )
+
+    def handle(self, *args, **options):
+        budget_path = Path(options['budget'])
+        budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+        tolerance = 1 + options['tolerance']
+        connection = connections[options['database']]
+        rows, batch_size = options['rows'], options['batch_size']
+        results = {}
+        failures = []
+
+        for layout, model in MODELS.items():
+            with connection.schema_editor() as editor:
+                editor.create_model(model)
+            try:
+                result = self.measure(model, connection, rows, batch_size)
+            finally:
+                with connection.schema_editor() as editor:
+                    editor.delete_model(model)
+            results[layout] = result
+
+            self.stdout.write(f'{layout}:')
+            for key, value in result.items():
+                self.stdout.write(f'  {key:<20} {value}')
+            allowed = budget.get(layout, {})
+            if 'insert_rows_per_s' in allowed and result['insert_rows_per_s'] < allowed['insert_rows_per_s'] / tolerance:
+                failures.append(f"{layout}: {result['insert_rows_per_s']} rows/s below budget {allowed['insert_rows_per_s']}")
+            if 'recent_scan_ms' in allowed and result['recent_scan_ms'] > allowed['recent_scan_ms'] * tolerance:
+                failures.append(f"{layout}: recent scan {result['recent_scan_ms']} ms exceeds budget {allowed['recent_scan_ms']}")
+
+        if options['update']:
+            budget_path.parent.mkdir(parents=True, exist_ok=True)
+            budget_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Updated budget {budget_path}'))
+            return
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} id layout budget violation(s)')
+        self.stdout.write(self.style.SUCCESS('Id layouts within budget'))
+
+    def measure(self, model, connection, rows, batch_size):
+        """
+        Insert ``rows`` rows, then read back the newest tenth: by primary key
+        range for time-ordered ids, through the creation time index otherwise.
+        """
+        objects = model.objects.using(connection.alias)
+        admin_ids = [uuid.uuid4() for _ in range(50)]
+        cutoff = None
+        elapsed = 0
+        for start in range(0, rows, batch_size):
+            if cutoff is None and start >= rows * 9 // 10:
+                cutoff = timezone.now()
+            now = timezone.now()
+            batch = [
+                model(admin_id=admin_ids[i % len(admin_ids)], name=f'Student {i:06d}', created_at=now)
+                for i in range(start, min(start + batch_size, rows))
+            ]
+            began = time.perf_counter()
+            objects.bulk_create(batch)
+            elapsed += time.perf_counter() - began
+
+        if model.__name__.endswith('uuid7'):
+            recent = objects.filter(pk__gte=uuid7_floor(cutoff)).order_by('pk')
+        else:
+            recent = objects.filter(created_at__gte=cutoff).order_by('created_at')
+        best = None
+        for _ in range(5):
+            began = time.perf_counter()
+            found = len(list(recent.values_list('pk', 'name')))
+            took = time.perf_counter() - began
+            best = took if best is None else min(best, took)
+        return {
+            'insert_rows_per_s': round(rows / elapsed),
+            'recent_rows': found,
+            'recent_scan_ms': round(best * 1000, 2),
+            'table_bytes': table_bytes(connection, model._meta.db_table),
+        }
@@ -4,6 +4,7 @@ Management command to create sample data for the OrgSchool application
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from schools.models import School, SClass, Student, Teacher
+from schools.sharding import assign_shard, shard_for, use_shard
 
 Admin = get_user_model()
 
@@ -51,87 +52,89 @@ class Command(BaseCommand):
                 self.style.WARNING(f'Admin user already exists: {admin_email}')
             )
         
-        # Create school
-        school, created = School.objects.get_or_create(
-            admin=admin,
-            defaults={'name': admin.school_name}
-        )
-        
-        if created:
-            self.stdout.write(
-                self.style.SUCCESS(f'Created school: {school.name}')
-            )
-        else:
-            self.stdout.write(
-                self.style.WARNING(f'School already exists: {school.name}')
+        # Everything below lives on the admin's shard; existing admins keep theirs
+        with use_shard(assign_shard(admin) if created else shard_for(admin.pk)):
+            # Create school
+            school, created = School.objects.get_or_create(
+                admin=admin,
+                defaults={'name': admin.school_name}
             )
         
-        # Create classes
-        classes_data = [
-            'Class 01', 'Class 02', 'Class 03', 'Class 04'
-        ]
-        
-        for class_name in classes_data:
-            sclass, created = SClass.objects.get_or_create(
-                name=class_name,
-                school=school
-            )
-            
             if created:
                 self.stdout.write(
-                    self.style.SUCCESS(f'Created class: {class_name}')
+                    self.style.SUCCESS(f'Created school: {school.name}')
+                )
+            else:
+                self.stdout.write(
+                    self.style.WARNING(f'School already exists: {school.name}')
                 )
         
-        # Create sample students
-        students_data = [
-            {'name': 'John Doe', 'age': 10, 'class': 'Class 01'},
-            {'name': 'Jane Smith', 'age': 11, 'class': 'Class 01'},
-            {'name': 'Bob Johnson', 'age': 12, 'class': 'Class 02'},
-            {'name': 'Alice Brown', 'age': 13, 'class': 'Class 02'},
-            {'name': 'Charlie Wilson', 'age': 14, 'class': 'Class 03'},
-            {'name': 'Eva Davis', 'age': 15, 'class': 'Class 03'},
-            {'name': 'Frank Miller', 'age': 16, 'class': 'Class 04'},
-            {'name': 'Grace Taylor', 'age': 17, 'class': 'Class 04'},
-        ]
+            # Create classes
+            classes_data = [
+                'Class 01', 'Class 02', 'Class 03', 'Class 04'
+            ]
         
-        for student_data in students_data:
-            sclass = SClass.objects.get(name=student_data['class'], school=school)
-            student, created = Student.objects.get_or_create(
-                name=student_data['name'],
-                admin=admin,
-                defaults={
-                    'age': student_data['age'],
-                    'sclass': sclass,
-                }
-            )
-            
-            if created:
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created student: {student.name}')
+            for class_name in classes_data:
+                sclass, created = SClass.objects.get_or_create(
+                    name=class_name,
+                    school=school
                 )
+            
+                if created:
+                    self.stdout.write(
+                        self.style.SUCCESS(f'Created class: {class_name}')
+                    )
         
-        # Create sample teachers
-        teachers_data = [
-            {'name': 'Mr. Anderson', 'class': 'Class 01'},
-            {'name': 'Ms. Thompson', 'class': 'Class 02'},
-            {'name': 'Dr. Roberts', 'class': 'Class 03'},
-            {'name': 'Prof. Williams', 'class': 'Class 04'},
-        ]
+            # Create sample students
+            students_data = [
+                {'name': 'John Doe', 'age': 10, 'class': 'Class 01'},
+                {'name': 'Jane Smith', 'age': 11, 'class': 'Class 01'},
+                {'name': 'Bob Johnson', 'age': 12, 'class': 'Class 02'},
+                {'name': 'Alice Brown', 'age': 13, 'class': 'Class 02'},
+                {'name': 'Charlie Wilson', 'age': 14, 'class': 'Class 03'},
+                {'name': 'Eva Davis', 'age': 15, 'class': 'Class 03'},
+                {'name': 'Frank Miller', 'age': 16, 'class': 'Class 04'},
+                {'name': 'Grace Taylor', 'age': 17, 'class': 'Class 04'},
+            ]
         
-        for teacher_data in teachers_data:
-            sclass = SClass.objects.get(name=teacher_data['class'], school=school)
-            teacher, created = Teacher.objects.get_or_create(
-                name=teacher_data['name'],
-                admin=admin,
-                defaults={
-                    'sclass': sclass,
-                }
-            )
+            for student_data in students_data:
+                sclass = SClass.objects.get(name=student_data['class'], school=school)
+                student, created = Student.objects.get_or_create(
+                    name=student_data['name'],
+                    admin=admin,
+                    defaults={
+                        'age': student_data['age'],
+                        'sclass': sclass,
+                    }
+                )
             
-            if created:
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created teacher: {teacher.name}')
+                if created:
+                    self.stdout.write(
+                        self.style.SUCCESS(f'Created student: {student.name}')
+                    )
+        
+            # Create sample teachers
+            teachers_data = [
+                {'name': 'Mr. Anderson', 'class': 'Class 01'},
+                {'name': 'Ms. Thompson', 'class': 'Class 02'},
+                {'name': 'Dr. Roberts', 'class': 'Class 03'},
+                {'name': 'Prof. Williams', 'class': 'Class 04'},
+            ]
+        
+            for teacher_data in teachers_data:
+                sclass = SClass.objects.get(name=teacher_data['class'], school=school)
+                teacher, created = Teacher.objects.get_or_create(
+                    name=teacher_data['name'],
+                    admin=admin,
+                    defaults={
+                        'sclass': sclass,
+                    }
                 )
+            
+                if created:
+                    self.stdout.write(
+                        self.style.SUCCESS(f'Created teacher: {teacher.name}')
+                    )
         
         self.stdout.write(
             self.style.SUCCESS('Successfully created sample data!')
@@ -0,0 +1,176 @@
+"""
+Management command to measure process startup imports against a checked-in budget
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each kind of process imports before it can do useful work
+SCENARIOS = {
+    # Every manage.py invocation
+    'setup': 'import django; django.setup()',
+    # A WSGI worker up to its first routed request
+    'worker': (
+        'import orgschool.wsgi; '
+        'from django.urls import get_resolver; '
+        'get_resolver().url_patterns'
+    ),
+}
+
+# Modules that must only load on first use, never at startup
+LAZY_MODULES = [
+    'drf_yasg.openapi',
+    'drf_yasg.codecs',
+    'drf_yasg.generators',
+    'swagger_spec_validator',
+    'crispy_forms.helper',
+    'crispy_forms.layout',
+    'numpy',
+]
+
+# This project's packages; other packages (Django, the stdlib) vary from run to run and are only counted in the total
+PROJECT_PACKAGES = ['orgschool', 'schools', 'restapi']
+
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def measure(code, repeat):
+    """
+    Run ``code`` under ``python -X importtime`` and return
+    ``{module: self time in microseconds}``, keeping the best of ``repeat`` runs.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'orgschool.settings'))
+    # The first run writes the bytecode, so edited modules are not timed compiling from source
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    best = {}
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        timings = {}
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if match:
+                timings[match.group(4)] = int(match.group(1))
+        for module, self_us in timings.items():
+            best[module] = min(self_us, best.get(module, self_us))
+    return best
+
+
+def by_package(timings):
+    """
+    Sum self times per top-level package.
+    """
+    packages = {}
+    for module, self_us in timings.items():
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return packages
+
+
+class Command(BaseCommand):
+    help = 'Measure startup import time per module (python -X importtime) and check it against the budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'importtime.json'),
+            help='Budget file to check against or update'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Write the current measurements as the new budget'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per scenario; the fastest time per module is kept'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed growth over the budget before a package is flagged'
+        )
+        parser.add_argument(
+            '--floor',
+            type=float,
+            default=2.0,
+            help='Growth in ms that is never flagged, whatever the tolerance'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Number of packages to list per scenario'
+        )
+
+    def exceeds(self, ms, allowed, options):
+        return ms - allowed > max(allowed * options['tolerance'], options['floor'])
+
+    def handle(self, *args, **options):
+        budget_path = Path(options['budget'])
+        budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+        # The total includes the database driver, so it is only comparable under the same engine
+        meta = {
+            'settings': os.environ.get('DJANGO_SETTINGS_MODULE', 'orgschool.settings'),
+            'engine': settings.DATABASES['default']['ENGINE'],
+        }
+        same_engine = budget.get('meta', {}).get('engine', meta['engine']) == meta['engine']
+        if not same_engine:
+            self.stdout.write(self.style.WARNING(
+                f"Budget recorded with {budget['meta']['engine']}, running with {meta['engine']}: "
+                'totals are not compared'
+            ))
+        results = {'meta': meta}
+        failures = []
+
+        for name, code in SCENARIOS.items():
+            timings = measure(code, options['repeat'])
+            packages = by_package(timings)
+            total_ms = sum(packages.values()) / 1000
+            results[name] = {
+                'total_ms': round(total_ms, 1),
+                'packages_ms': {package: round(packages.get(package, 0) / 1000, 1) for package in PROJECT_PACKAGES},
+            }
+
+            self.stdout.write(f'{name}: {total_ms:.1f} ms, {len(timings)} modules')
+            for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+                self.stdout.write(f'  {package:<28} {self_us / 1000:8.1f} ms')
+
+            for module in LAZY_MODULES:
+                if module in timings:
+                    failures.append(f'{name}: {module} is imported at startup')
+
+            limits = budget.get(name)
+            if not limits:
+                continue
+            if same_engine and self.exceeds(total_ms, limits['total_ms'], options):
+                failures.append(f"{name}: total {total_ms:.1f} ms exceeds budget {limits['total_ms']} ms")
+            for package, ms in results[name]['packages_ms'].items():
+                allowed = limits['packages_ms'].get(package, 0)
+                if self.exceeds(ms, allowed, options):
+                    failures.append(f'{name}: {package} {ms} ms exceeds budget {allowed} ms')
+
+        if options['update']:
+            budget_path.parent.mkdir(parents=True, exist_ok=True)
+            budget_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Updated budget {budget_path}'))
+            return
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} import budget violation(s)')
+        self.stdout.write(self.style.SUCCESS('Startup imports within budget'))
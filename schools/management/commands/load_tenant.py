@@ -0,0 +1,102 @@
+"""
+Management command to restore a tenant snapshot written by dump_tenant
+"""
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.db.models import Q
+
+from schools.models import Admin
+from schools.sharding import assign_shard, shard_for, tenant_graph
+from schools.snapshots import SnapshotError, load_tenant, read_header
+
+
+class Command(BaseCommand):
+    help = (
+        "Restore a snapshot written by dump_tenant with batched INSERTs in dependency order. "
+        "Loads into the dumped admin (created if this install does not have it) or into --admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('snapshot', help="Snapshot file; '-' for stdin")
+        parser.add_argument(
+            '--admin',
+            help='Admin id or email to own the restored rows instead of the dumped admin'
+        )
+        parser.add_argument(
+            '--remap-ids',
+            action='store_true',
+            help='Give every row a new id, e.g. to copy a school next to the original'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per INSERT/transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['snapshot'] == '-':
+            if options['admin'] is None:
+                raise CommandError('Reading from stdin needs --admin')
+            self.load(sys.stdin.buffer, self.get_admin(options['admin']), options)
+            return
+        try:
+            with open(options['snapshot'], 'rb') as inp:
+                admin = self.get_admin(options['admin']) if options['admin'] else self.dumped_admin(read_header(inp))
+                inp.seek(0)
+                self.load(inp, admin, options)
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['snapshot']}: {exc}")
+        except SnapshotError as exc:
+            raise CommandError(str(exc))
+
+    def load(self, inp, admin, options):
+        using = shard_for(admin.pk)
+        if not options['remap_ids']:
+            for model, queryset in tenant_graph(admin.pk, using):
+                if queryset.exists():
+                    raise CommandError(
+                        f'{admin} already has {model.__name__} rows on {using}; use --remap-ids to load a copy'
+                    )
+
+        def progress(label, rows):
+            self.stdout.write(f'  {label}: {rows} rows', ending='\r')
+
+        try:
+            counts = load_tenant(inp, admin, using, options['batch_size'], options['remap_ids'], progress)
+        except SnapshotError as exc:
+            raise CommandError(f'{exc}; the batches loaded so far were kept')
+        except IntegrityError as exc:
+            raise CommandError(
+                f'{exc}: these ids already exist on {using}; use --remap-ids to load a copy '
+                '(the batches loaded so far were kept)'
+            )
+        for label, rows in counts.items():
+            self.stdout.write(f'  {label}: {rows} rows')
+        self.stdout.write(self.style.SUCCESS(f'Loaded snapshot into {admin} on {using}'))
+
+    def get_admin(self, value):
+        lookup = {'email': value} if '@' in value else {'pk': value}
+        try:
+            return Admin.objects.get(**lookup)
+        except (Admin.DoesNotExist, ValidationError):
+            raise CommandError(f'Admin not found: {value}')
+
+    def dumped_admin(self, header):
+        """
+        The admin the snapshot was taken from, created from the header on a
+        new install (with its password hash, so the same login works).
+        """
+        fields = {name: Admin._meta.get_field(name).to_python(value) for name, value in header['admin'].items()}
+        admin = Admin.objects.filter(pk=fields['id']).first()
+        if admin is not None:
+            return admin
+        if Admin.objects.filter(Q(email=fields['email']) | Q(username=fields['username'])).exists():
+            raise CommandError(f"{fields['email']} exists here with another id; pass --admin to load into it")
+        admin = Admin.objects.create(**fields)
+        assign_shard(admin)
+        self.stdout.write(f'Created {admin}')
+        return admin
@@ -0,0 +1,90 @@
+"""
+Management command to move one tenant's data to another database shard
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from schools.models import Admin
+from schools.sharding import copy_batch, queryset_digest, set_shard, shard_for, tenant_graph
+from schools.sync import suppress_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy an admin's schools, classes, students, teachers and archives to another shard in batches, "
+        "verify the copy, then switch the tenant over. Run while the tenant is not being edited."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('admin', help='Admin id or email')
+        parser.add_argument('target', help='Database alias to move the tenant to')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows copied per INSERT/transaction'
+        )
+        parser.add_argument(
+            '--keep-source',
+            action='store_true',
+            help='Leave the rows on the source shard after switching'
+        )
+
+    def handle(self, *args, **options):
+        target = options['target']
+        if target not in settings.TENANT_SHARDS:
+            raise CommandError(f'{target} is not in TENANT_SHARDS')
+
+        lookup = {'email': options['admin']} if '@' in options['admin'] else {'pk': options['admin']}
+        try:
+            admin = Admin.objects.get(**lookup)
+        except (Admin.DoesNotExist, ValidationError):
+            raise CommandError(f"Admin not found: {options['admin']}")
+
+        source = shard_for(admin.pk)
+        if source == target:
+            raise CommandError(f'{admin} already lives on {target}')
+        for model, queryset in tenant_graph(admin.pk, target):
+            if queryset.exists():
+                raise CommandError(f'{target} already holds {model.__name__} rows for {admin}')
+
+        self.stdout.write(f'Moving {admin} from {source} to {target}')
+        for model, queryset in tenant_graph(admin.pk, source):
+            copied = 0
+            batch = []
+            for obj in queryset.order_by('pk').iterator(chunk_size=options['batch_size']):
+                batch.append(obj)
+                if len(batch) == options['batch_size']:
+                    with transaction.atomic(using=target):
+                        copy_batch(model, batch, target)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                with transaction.atomic(using=target):
+                    copy_batch(model, batch, target)
+                copied += len(batch)
+            self.stdout.write(f'  {model.__name__}: {copied} rows copied')
+
+        # Verify row counts and contents before switching reads over
+        source_graph = tenant_graph(admin.pk, source)
+        target_graph = tenant_graph(admin.pk, target)
+        for (model, source_qs), (_, target_qs) in zip(source_graph, target_graph):
+            expected, actual = queryset_digest(source_qs), queryset_digest(target_qs)
+            if expected != actual:
+                raise CommandError(
+                    f'{model.__name__} copy does not match the source '
+                    f'({expected[0]} rows on {source}, {actual[0]} on {target}); tenant not switched'
+                )
+
+        set_shard(admin.pk, target)
+        self.stdout.write(self.style.SUCCESS(f'Verified copy, {admin} now reads from {target}'))
+
+        if not options['keep_source']:
+            # Schools cascade to their classes, students and teachers on the source.
+            # The tenant still has these rows, so no tombstones for the sync feed.
+            with suppress_tombstones():
+                for model, queryset in reversed(source_graph):
+                    queryset.delete()
+            self.stdout.write(f'Removed source rows from {source}')
@@ -0,0 +1,82 @@
+"""
+Management command for the end-of-year promotion of a school's students
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from schools.models import Admin, School, SClass
+from schools.promotion import describe_promotion, next_class_mapping, promote_students
+from schools.sharding import use_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Move every current student of a school to the next class in one transaction. '
+        'Without --map each class moves to the next one by name and the last class stays.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('admin', help='Admin id or email')
+        parser.add_argument(
+            '--school',
+            help='School name, when the admin has more than one'
+        )
+        parser.add_argument(
+            '--map',
+            action='append',
+            default=[],
+            metavar='SOURCE=TARGET',
+            help='Class name or id to move from and to; leave TARGET empty to mark the students as left'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many students each class would move'
+        )
+
+    def handle(self, *args, **options):
+        lookup = {'email': options['admin']} if '@' in options['admin'] else {'pk': options['admin']}
+        try:
+            admin = Admin.objects.get(**lookup)
+        except (Admin.DoesNotExist, ValidationError):
+            raise CommandError(f"Admin not found: {options['admin']}")
+
+        with use_tenant(admin.pk):
+            schools = School.objects.filter(admin=admin)
+            if options['school']:
+                schools = schools.filter(name=options['school'])
+            schools = list(schools[:2])
+            if len(schools) != 1:
+                raise CommandError(f'{admin} has {"several" if schools else "no"} matching schools; use --school')
+            school = schools[0]
+
+            if options['map']:
+                mapping = {}
+                for entry in options['map']:
+                    source, sep, target = entry.partition('=')
+                    if not sep:
+                        raise CommandError(f'Expected SOURCE=TARGET, got {entry}')
+                    mapping[self.get_class(school, source)] = self.get_class(school, target) if target else None
+            else:
+                mapping = next_class_mapping(school)
+
+            counts = promote_students(school, mapping, dry_run=options['dry_run'])
+            for entry in describe_promotion(school, mapping, counts):
+                target = entry['target_name'] or 'left'
+                self.stdout.write(f"  {entry['sclass_name']} -> {target}: {entry['students']} students")
+
+        verb = 'would move' if options['dry_run'] else 'moved'
+        self.stdout.write(self.style.SUCCESS(f'{school}: {verb} {sum(counts.values())} students'))
+
+    def get_class(self, school, name_or_id):
+        sclasses = SClass.objects.filter(school=school)
+        try:
+            return sclasses.get(name=name_or_id.strip()).pk
+        except SClass.DoesNotExist:
+            pass
+        except SClass.MultipleObjectsReturned:
+            raise CommandError(f'Several classes are named {name_or_id}; use the class id')
+        try:
+            return sclasses.get(pk=name_or_id.strip()).pk
+        except (SClass.DoesNotExist, ValidationError):
+            raise CommandError(f'{school} has no class {name_or_id}')
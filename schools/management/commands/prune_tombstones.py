@@ -0,0 +1,21 @@
+"""
+Management command to delete sync tombstones past their retention
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from schools.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones older than SYNC_TOMBSTONE_DAYS; sync tokens that old are refused anyway'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+        for using in sorted(set(settings.TENANT_SHARDS) | {DEFAULT_DB_ALIAS}):
+            deleted, _ = Tombstone.objects.using(using).filter(deleted_at__lt=cutoff).delete()
+            self.stdout.write(f'{using}: {deleted} tombstones deleted')
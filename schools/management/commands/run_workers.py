@@ -0,0 +1,112 @@
+"""
+Management command to run background jobs from the Job table
+"""
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+# Pool processes unpickle this module before Django is set up,
+# so nothing that touches models is imported at module level.
+
+
+def init_process():
+    """
+    Pool process initializer: spawned processes start without Django set up.
+    """
+    django.setup()
+
+
+def process_job(job_id):
+    from schools.jobs import run_job
+    return run_job(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a thread or process pool until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOB_WORKERS,
+            help='Jobs run at the same time'
+        )
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default=settings.JOB_POOL,
+            help='Run jobs in threads (I/O-bound work) or processes (CPU-bound work)'
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=settings.JOB_POLL_SECONDS,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no job is due instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        from schools.jobs import claim_jobs, worker_name
+
+        if options['workers'] < 1:
+            raise CommandError('--workers must be positive')
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        if options['pool'] == 'process':
+            # Spawned, not forked: children must not share the parent's DB connections
+            executor = ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_process,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='job')
+
+        worker = worker_name()
+        self.stdout.write(f"{worker}: {options['workers']} {options['pool']} workers")
+        running = {}
+        with executor:
+            while not self.stopping:
+                free = options['workers'] - len(running)
+                if free:
+                    for job_id in claim_jobs(free, worker):
+                        running[executor.submit(process_job, job_id)] = job_id
+                    close_old_connections()
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.report(running.pop(future), future)
+            # Let running jobs finish; unclaimed ones stay queued for the next worker
+            for future in wait(running).done:
+                self.report(running.pop(future), future)
+        self.stdout.write(f'{worker}: stopped')
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            raise KeyboardInterrupt
+        self.stopping = True
+        self.stdout.write('Stopping after the running jobs finish (signal again to abort)')
+
+    def report(self, job_id, future):
+        try:
+            status = future.result()
+        except Exception as exc:  # The pool itself failed, the job keeps its lease
+            self.stderr.write(self.style.ERROR(f'{job_id}: {exc!r}'))
+            return
+        self.stdout.write(f'{job_id}: {status}')
@@ -0,0 +1,25 @@
+"""
+Middleware for the OrgSchool application
+"""
+from .sharding import shard_for, use_shard
+from .tenancy import Tenant
+
+
+class TenantShardMiddleware:
+    """
+    Route tenant models to the logged-in admin's shard for the whole request,
+    and attach the admin's tenant context as ``request.tenant`` (None when
+    logged out). The schools are only looked up when first used.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            request.tenant = None
+            return self.get_response(request)
+        alias = shard_for(user.pk)
+        request.tenant = Tenant(user.pk, alias)
+        with use_shard(alias):
+            return self.get_response(request)
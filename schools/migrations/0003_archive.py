@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0002_tenantshard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='left_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='left_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedStudent',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=128)),
+                ('sclass_name', models.CharField(max_length=128)),
+                ('school_name', models.CharField(max_length=128)),
+                ('left_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('age', models.IntegerField()),
+                ('admin', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_students', to=settings.AUTH_USER_MODEL)),
+                ('sclass', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='schools.sclass')),
+            ],
+            options={
+                'ordering': ['-left_at', 'id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['admin', '-left_at'], name='archivedstudent_admin_left')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTeacher',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=128)),
+                ('sclass_name', models.CharField(max_length=128)),
+                ('school_name', models.CharField(max_length=128)),
+                ('left_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('admin', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_teachers', to=settings.AUTH_USER_MODEL)),
+                ('sclass', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='schools.sclass')),
+            ],
+            options={
+                'ordering': ['-left_at', 'id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['admin', '-left_at'], name='archivedteacher_admin_left')],
+            },
+        ),
+    ]
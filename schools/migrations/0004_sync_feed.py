@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:26
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0003_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=16)),
+                ('object_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='sclass',
+            index=models.Index(fields=['school', 'updated_at'], name='sclass_school_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['admin', 'updated_at'], name='student_admin_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['admin', 'updated_at'], name='teacher_admin_updated'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='admin',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['admin', 'deleted_at'], name='tombstone_admin_deleted'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0005_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sclass',
+            index=models.Index(fields=['name'], name='sclass_name'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['name'], name='student_name'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['name'], name='teacher_name'),
+        ),
+    ]
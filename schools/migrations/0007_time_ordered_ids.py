@@ -0,0 +1,120 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:43
+
+from collections import defaultdict
+
+import schools.fields
+from django.db import migrations
+
+# Models whose primary keys become CompactUUIDField
+MODELS = ['admin', 'school', 'sclass', 'student', 'teacher']
+
+
+def uuid_columns(apps, cursor):
+    """
+    The id columns of MODELS and every column pointing at them, and the foreign
+    key constraints on those columns as (table, name, column, ref table, ref column).
+    """
+    targets = {apps.get_model('schools', name)._meta.db_table for name in MODELS}
+    columns = {(table, 'id') for table in targets}
+    for model in apps.get_models(include_auto_created=True):
+        for field in model._meta.local_fields:
+            if (field.many_to_one or field.one_to_one) and field.related_model._meta.db_table in targets:
+                columns.add((model._meta.db_table, field.column))
+    # Constraints also cover tables outside this app's state, e.g. django_admin_log
+    placeholders = ', '.join(['%s'] * len(targets))
+    cursor.execute(
+        'SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME '
+        'FROM information_schema.KEY_COLUMN_USAGE '
+        f'WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IN ({placeholders})',
+        sorted(targets),
+    )
+    constraints = cursor.fetchall()
+    columns |= {(table, column) for table, _, column, _, _ in constraints}
+    return columns, constraints
+
+
+def convert(apps, schema_editor, source_type, expression, target_type):
+    """
+    Rewrite the uuid columns in place on MySQL: widen to varbinary, convert
+    the values with ``expression``, then narrow to ``target_type``.
+    Other backends keep their column type (see schools.fields.stores_binary).
+    """
+    if not schools.fields.stores_binary(schema_editor.connection):
+        return
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        columns, constraints = uuid_columns(apps, cursor)
+        cursor.execute(
+            'SELECT TABLE_NAME, COLUMN_NAME, IS_NULLABLE FROM information_schema.COLUMNS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND DATA_TYPE = %s',
+            [source_type],
+        )
+        by_table = defaultdict(list)
+        for table, column, nullable in cursor.fetchall():
+            if (table, column) in columns:
+                by_table[table].append((quote(column), 'NULL' if nullable == 'YES' else 'NOT NULL'))
+
+    for table, name, column, _, _ in constraints:
+        schema_editor.execute(f'ALTER TABLE {quote(table)} DROP FOREIGN KEY {quote(name)}')
+    for table, table_columns in by_table.items():
+        widen = ', '.join(f'MODIFY {column} varbinary(32) {null}' for column, null in table_columns)
+        values = ', '.join(f'{column} = {expression.format(column)}' for column, _ in table_columns)
+        narrow = ', '.join(f'MODIFY {column} {target_type} {null}' for column, null in table_columns)
+        schema_editor.execute(f'ALTER TABLE {quote(table)} {widen}')
+        schema_editor.execute(f'UPDATE {quote(table)} SET {values}')
+        schema_editor.execute(f'ALTER TABLE {quote(table)} {narrow}')
+    for table, name, column, ref_table, ref_column in constraints:
+        schema_editor.execute(
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+            f'FOREIGN KEY ({quote(column)}) REFERENCES {quote(ref_table)} ({quote(ref_column)})'
+        )
+
+
+def to_binary(apps, schema_editor):
+    convert(apps, schema_editor, 'char', 'UNHEX({})', 'binary(16)')
+
+
+def to_char(apps, schema_editor):
+    convert(apps, schema_editor, 'binary', 'LOWER(HEX({}))', 'char(32)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0006_admin_search'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            # Existing random ids keep their values, only the MySQL column type changes.
+            # The hint lets the shard router run it on shards too (they hold the tenant tables).
+            database_operations=[migrations.RunPython(to_binary, to_char, hints={'model_name': 'student'})],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='admin',
+                    name='id',
+                    field=schools.fields.CompactUUIDField(default=schools.fields.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='school',
+                    name='id',
+                    field=schools.fields.CompactUUIDField(default=schools.fields.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='sclass',
+                    name='id',
+                    field=schools.fields.CompactUUIDField(default=schools.fields.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='student',
+                    name='id',
+                    field=schools.fields.CompactUUIDField(default=schools.fields.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='teacher',
+                    name='id',
+                    field=schools.fields.CompactUUIDField(default=schools.fields.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0007_time_ordered_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attendance',
+            fields=[
+                ('pk', models.CompositePrimaryKey('sclass', 'date', 'student', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'present'), (2, 'absent'), (3, 'late'), (4, 'excused')], default=1)),
+                ('sclass', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='attendance', to='schools.sclass')),
+                ('student', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='attendance', to='schools.student')),
+            ],
+            options={
+                'verbose_name_plural': 'Attendance',
+                'indexes': [models.Index(fields=['student', 'date'], name='attendance_student_date')],
+            },
+        ),
+    ]
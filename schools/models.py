@@ -1,11 +1,16 @@
 """
 Django models for the OrgSchool application
-Defines Admin, School, SClass, Student, and Teacher models.
+Defines Admin, School, SClass, Student, and Teacher models,
+plus the archive tables for students and teachers who have left and
+the tombstones that tell sync clients about deletions.
 """
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.hashers import make_password, check_password
+from django.db.models.functions import Coalesce
+from .fields import CompactUUIDField, uuid7
 
 
 class Admin(AbstractUser):
@@ -13,7 +18,7 @@ class Admin(AbstractUser):
     Custom user model for school administrators.
     Inherits from Django's AbstractUser and uses email as the username.
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Unique admin ID
+    id = CompactUUIDField(primary_key=True, default=uuid7, editable=False)  # Unique admin ID, time-ordered
     email = models.EmailField(unique=True)  # Admin email (login)
     school_name = models.CharField(max_length=128)  # Name of the school
     created_at = models.DateTimeField(auto_now_add=True)  # Creation timestamp
@@ -27,13 +32,27 @@ class Admin(AbstractUser):
         return f"{self.school_name} Admin ({self.email})"
 
 
+class TenantShard(models.Model):
+    """
+    Maps an Admin (tenant) to the database alias that holds its School graph.
+    Lives on the default database; see schools.sharding.
+    """
+    admin = models.OneToOneField(Admin, on_delete=models.CASCADE, primary_key=True, related_name='shard')  # Tenant
+    alias = models.CharField(max_length=64)  # Key of settings.DATABASES
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.admin_id} -> {self.alias}"
+
+
 class School(models.Model):
     """
     School model. Each school is managed by an Admin.
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Unique school ID
+    id = CompactUUIDField(primary_key=True, default=uuid7, editable=False)  # Unique school ID, time-ordered
     name = models.CharField(max_length=128)  # School name
-    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='schools')  # Admin owner
+    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='schools', db_constraint=False)  # Admin owner (may live on another database)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -41,19 +60,54 @@ class School(models.Model):
         return self.name
 
 
+class SClassQuerySet(models.QuerySet):
+    """
+    QuerySet for SClass with per-class roster totals.
+    """
+    def with_counts(self, search=None):
+        """
+        Annotate ``student_count`` and ``teacher_count`` as correlated subqueries,
+        optionally restricted to names containing ``search``. Unlike joining both
+        relations and counting, this does not multiply rows.
+        """
+        return self.annotate(
+            student_count=Coalesce(roster_count(Student, search), 0),
+            teacher_count=Coalesce(roster_count(Teacher, search), 0),
+        )
+
+
+def roster_count(model, search=None):
+    """
+    COUNT of ``model`` rows belonging to the outer SClass row.
+    """
+    rows = model.objects.filter(sclass=models.OuterRef('pk'))
+    if search:
+        rows = rows.filter(name__icontains=search)
+    return models.Subquery(
+        rows.order_by().values('sclass').annotate(total=models.Count('pk')).values('total'),
+        output_field=models.IntegerField(),
+    )
+
+
 class SClass(models.Model):
     """
     School class model. Each class belongs to a school.
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Unique class ID
+    id = CompactUUIDField(primary_key=True, default=uuid7, editable=False)  # Unique class ID, time-ordered
     name = models.CharField(max_length=128)  # Class name
     school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='sclasses')  # Parent school
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = SClassQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Class"
         verbose_name_plural = "Classes"
+        indexes = [
+            models.Index(fields=['school', 'updated_at'], name='sclass_school_updated'),  # Sync feed
+            models.Index(fields=['name'], name='sclass_name'),  # Admin prefix search
+        ]
     
     def __str__(self):
         return f"{self.school.name} - {self.name}"
@@ -63,14 +117,21 @@ class Student(models.Model):
     """
     Student model. Each student belongs to a class and an admin.
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Unique student ID
+    id = CompactUUIDField(primary_key=True, default=uuid7, editable=False)  # Unique student ID, time-ordered
     name = models.CharField(max_length=128)  # Student name
     age = models.IntegerField()  # Student age
     sclass = models.ForeignKey(SClass, on_delete=models.CASCADE, related_name='students')  # Class
-    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='students')    # Admin owner
+    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='students', db_constraint=False)    # Admin owner
+    left_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Departure, archived by `manage.py archive_departed`
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['admin', 'updated_at'], name='student_admin_updated'),  # Sync feed
+            models.Index(fields=['name'], name='student_name'),  # Admin prefix search
+        ]
+    
     def __str__(self):
         return f"{self.name} ({self.sclass.name})"
 
@@ -79,12 +140,170 @@ class Teacher(models.Model):
     """
     Teacher model. Each teacher belongs to a class and an admin.
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Unique teacher ID
+    id = CompactUUIDField(primary_key=True, default=uuid7, editable=False)  # Unique teacher ID, time-ordered
     name = models.CharField(max_length=128)  # Teacher name
     sclass = models.ForeignKey(SClass, on_delete=models.CASCADE, related_name='teachers')  # Class
-    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='teachers')    # Admin owner
+    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='teachers', db_constraint=False)    # Admin owner
+    left_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Departure, archived by `manage.py archive_departed`
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['admin', 'updated_at'], name='teacher_admin_updated'),  # Sync feed
+            models.Index(fields=['name'], name='teacher_name'),  # Admin prefix search
+        ]
+    
     def __str__(self):
         return f"{self.name} ({self.sclass.name})"
+
+
+class ArchivedRecord(models.Model):
+    """
+    Fields shared by the archive tables. Rows keep the id and timestamps of the
+    row they were moved from, plus a snapshot of the class and school names so
+    they stay readable after the class is gone.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)  # Id of the archived row
+    name = models.CharField(max_length=128)
+    sclass = models.ForeignKey(SClass, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')  # Class at departure
+    sclass_name = models.CharField(max_length=128)
+    school_name = models.CharField(max_length=128)
+    left_at = models.DateTimeField()  # Departure
+    archived_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField()  # Copied from the archived row
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        abstract = True
+        ordering = ['-left_at', 'id']
+    
+    def __str__(self):
+        return f"{self.name} ({self.sclass_name}, left {self.left_at:%Y-%m-%d})"
+
+
+class ArchivedStudent(ArchivedRecord):
+    """
+    A student who has left, moved out of the Student table.
+    """
+    age = models.IntegerField()
+    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='archived_students', db_constraint=False)
+    
+    class Meta(ArchivedRecord.Meta):
+        indexes = [models.Index(fields=['admin', '-left_at'], name='archivedstudent_admin_left')]
+
+
+class ArchivedTeacher(ArchivedRecord):
+    """
+    A teacher who has left, moved out of the Teacher table.
+    """
+    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='archived_teachers', db_constraint=False)
+    
+    class Meta(ArchivedRecord.Meta):
+        indexes = [models.Index(fields=['admin', '-left_at'], name='archivedteacher_admin_left')]
+
+
+class Tombstone(models.Model):
+    """
+    Records the deletion of a class, student or teacher for the sync feed.
+    Written by schools.signals; see schools.sync.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    admin = models.ForeignKey(Admin, on_delete=models.CASCADE, related_name='tombstones', db_constraint=False)  # Tenant
+    model = models.CharField(max_length=16)  # 'sclass', 'student' or 'teacher'
+    object_id = models.UUIDField()  # Id of the deleted row
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [models.Index(fields=['admin', 'deleted_at'], name='tombstone_admin_deleted')]
+    
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class Attendance(models.Model):
+    """
+    One student's attendance on one day. The highest-volume table (classes x
+    students x days), so rows are kept small: the key is (class, date,
+    student), which stores a class's day contiguously and serves the
+    (sclass, date) lookups, and a status code instead of a string. Date is in
+    the key and there are no foreign key constraints, so the MySQL table can
+    be partitioned by date range (see README). Rows are kept as history when
+    students are archived; deleting a class or a student deletes its
+    attendance (the student's in schools.signals).
+    """
+    PRESENT = 1
+    ABSENT = 2
+    LATE = 3
+    EXCUSED = 4
+    STATUS_CHOICES = [
+        (PRESENT, 'present'),
+        (ABSENT, 'absent'),
+        (LATE, 'late'),
+        (EXCUSED, 'excused'),
+    ]
+    STATUS_NAMES = dict(STATUS_CHOICES)
+    STATUS_CODES = {name: code for code, name in STATUS_CHOICES}  # The API uses the names
+    ATTENDED = [PRESENT, LATE]  # Count towards the attendance rate
+    
+    pk = models.CompositePrimaryKey('sclass', 'date', 'student')
+    # No separate FK indexes: the primary key and attendance_student_date lead with these columns
+    sclass = models.ForeignKey(SClass, on_delete=models.CASCADE, related_name='attendance', db_constraint=False, db_index=False)
+    date = models.DateField()
+    student = models.ForeignKey(Student, on_delete=models.DO_NOTHING, related_name='attendance', db_constraint=False, db_index=False)
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=PRESENT)
+    
+    class Meta:
+        verbose_name_plural = "Attendance"
+        indexes = [models.Index(fields=['student', 'date'], name='attendance_student_date')]  # Per-student ranges
+    
+    def __str__(self):
+        return f"{self.student_id} {self.date}: {self.get_status_display()}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by `manage.py run_workers`.
+    Lives on the default database; handlers are registered in schools.jobs.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=64)  # Registered handler
+    admin = models.ForeignKey(Admin, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')  # Tenant the job runs for
+    payload = models.JSONField(default=dict, blank=True)  # Handler arguments
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)  # Not picked up before this (retry backoff)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)  # Last failure
+    locked_by = models.CharField(max_length=128, blank=True)  # Worker running the job
+    locked_at = models.DateTimeField(null=True, blank=True)  # Claim time or last progress heartbeat
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at'),  # Worker polling
+            models.Index(fields=['admin', '-created_at'], name='job_admin_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
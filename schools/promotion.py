@@ -0,0 +1,101 @@
+"""
+End-of-year promotion for the OrgSchool application
+Moves every current student of a school from one class to the next with a
+couple of set-based UPDATEs instead of one save per student.
+"""
+from django.db import models, transaction
+from django.utils import timezone
+
+from .fields import CompactUUIDField
+from .models import SClass, Student
+
+
+def promotion_counts(school, mapping):
+    """
+    Return ``{source class id: current students}`` for the classes in ``mapping``.
+    """
+    counts = dict.fromkeys(mapping, 0)
+    rows = (
+        Student.objects.using(school._state.db)
+        .filter(sclass_id__in=list(mapping), left_at__isnull=True)
+        .order_by()
+        .values_list('sclass_id')
+        .annotate(total=models.Count('pk'))
+    )
+    counts.update(rows)
+    return counts
+
+
+def promote_students(school, mapping, dry_run=False):
+    """
+    Move the current students of ``school`` according to ``mapping``
+    (``{source class id: target class id or None}``). A ``None`` target marks
+    the students as having left (``left_at``), ready for archive_departed.
+
+    All moves happen in one CASE UPDATE, so chains such as 01 -> 02 -> 03 move
+    each student exactly once. Returns ``{source class id: moved students}``.
+    Callers validate that every class belongs to ``school``.
+    """
+    using = school._state.db
+    moves = {source: target for source, target in mapping.items() if target is not None}
+    leaving = [source for source, target in mapping.items() if target is None]
+    if dry_run:
+        return promotion_counts(school, mapping)
+
+    with transaction.atomic(using=using):
+        current = Student.objects.using(using).filter(left_at__isnull=True)
+        # Lock the affected rows so the counts match what the UPDATEs change
+        list(current.filter(sclass_id__in=list(mapping)).select_for_update().values_list('pk', flat=True))
+        counts = promotion_counts(school, mapping)
+        now = timezone.now()
+        # Leavers first, so students moving into a leaving class are not marked too
+        if leaving:
+            current.filter(sclass_id__in=leaving).update(left_at=now, updated_at=now)
+        if moves:
+            current.filter(sclass_id__in=list(moves)).update(
+                sclass_id=models.Case(
+                    # Each Value needs the column type itself, the Case's does not reach it
+                    *[
+                        models.When(sclass_id=source, then=models.Value(target, output_field=CompactUUIDField()))
+                        for source, target in moves.items()
+                    ],
+                    output_field=CompactUUIDField(),  # Same column type as the class id
+                ),
+                updated_at=now,  # update() skips auto_now
+            )
+        from .events import publish_rosters  # Imported on first use to keep it off startup
+        publish_rosters(school.admin_id, [*mapping, *moves.values()], using)
+    return counts
+
+
+def next_class_mapping(school):
+    """
+    Default mapping: each class moves to the next one by name
+    (``Class 01`` -> ``Class 02`` ...). The last class stays put; map it to
+    ``None`` explicitly to mark its students as left.
+    """
+    sclasses = list(
+        SClass.objects.using(school._state.db).filter(school=school).order_by('name', 'id').values_list('pk', flat=True)
+    )
+    return dict(zip(sclasses, sclasses[1:]))
+
+
+def describe_promotion(school, mapping, counts):
+    """
+    Return one ``{'sclass', 'sclass_name', 'target', 'target_name', 'students'}``
+    entry per source class, in class name order.
+    """
+    names = dict(SClass.objects.using(school._state.db).filter(school=school).values_list('pk', 'name'))
+    return sorted(
+        (
+            {
+                'sclass': source,
+                'sclass_name': names.get(source),
+                'target': target,
+                'target_name': names.get(target),
+                'students': counts.get(source, 0),
+            }
+            for source, target in mapping.items()
+        ),
+        key=lambda entry: (entry['sclass_name'] or '', str(entry['sclass'])),
+    )
@@ -0,0 +1,116 @@
+"""
+Printable class roster reports for the OrgSchool application
+Renders one HTML document per class in a pool of processes and streams them
+into a ZIP archive in the default storage, one document at a time.
+"""
+import multiprocessing
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import SClass, Student, Teacher
+
+PROGRESS_INTERVAL = 1.0  # Seconds between progress reports
+
+
+def render_class_report(sclass_id, using, generated_at):
+    """
+    Render the roster of one class: its school, current teachers and current
+    students with their ages. Returns ``(class id, HTML bytes)``.
+    Runs in the pool processes, so it takes the database alias explicitly.
+    """
+    sclass = SClass.objects.using(using).select_related('school').get(pk=sclass_id)
+    html = render_to_string('schools/class_report.html', {
+        'sclass': sclass,
+        'teachers': list(
+            Teacher.objects.using(using).filter(sclass_id=sclass_id, left_at__isnull=True)
+            .order_by('name', 'id').values('name')
+        ),
+        'students': list(
+            Student.objects.using(using).filter(sclass_id=sclass_id, left_at__isnull=True)
+            .order_by('name', 'id').values('name', 'age')
+        ),
+        'generated_at': generated_at,
+    })
+    return sclass_id, html.encode()
+
+
+def render_reports(class_ids, using, workers):
+    """
+    Yield ``(class id, HTML bytes)`` for ``class_ids`` as the pool finishes
+    them. At most two documents per worker are in flight, so memory stays
+    flat however many classes there are.
+    """
+    generated_at = timezone.now()
+    pending = iter(class_ids)
+    # Spawned, not forked: children must not share the parent's DB connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    ) as executor:
+        running = set()
+        while True:
+            for sclass_id in pending:
+                running.add(executor.submit(render_class_report, sclass_id, using, generated_at))
+                if len(running) >= workers * 2:
+                    break
+            if not running:
+                return
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def report_filenames(classes):
+    """
+    Map each ``(class id, class name)`` to a unique file name in the archive.
+    """
+    filenames = {}
+    used = set()
+    for sclass_id, class_name in classes:
+        try:
+            stem = get_valid_filename(class_name)
+        except SuspiciousFileOperation:  # Nothing usable left, e.g. only punctuation
+            stem = 'class'
+        filename, n = stem, 1
+        while filename in used:
+            n += 1
+            filename = f'{stem}_{n}'
+        used.add(filename)
+        filenames[sclass_id] = f'{filename}.html'
+    return filenames
+
+
+def build_report_archive(classes, using, name, progress=None, workers=None):
+    """
+    Render the reports of ``classes`` (``(id, name)`` pairs) and store them as
+    one ZIP archive under ``name`` in the default storage. The archive is
+    written to a temporary file as documents arrive and copied to storage in
+    chunks. ``progress(done, total, message)`` is called at most every
+    PROGRESS_INTERVAL seconds. Returns the stored name and the archive size in bytes.
+    """
+    filenames = report_filenames(classes)
+    total = len(filenames)
+    workers = max(1, min(workers or settings.REPORT_WORKERS, total))
+    reported = 0
+    with tempfile.TemporaryFile() as archive:
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            for done, (sclass_id, document) in enumerate(render_reports(list(filenames), using, workers), 1):
+                bundle.writestr(filenames[sclass_id], document)
+                if progress and (done == total or time.monotonic() - reported >= PROGRESS_INTERVAL):
+                    progress(done, total, f'Rendered {filenames[sclass_id]}')
+                    reported = time.monotonic()
+        size = archive.tell()
+        archive.seek(0)
+        return default_storage.save(name, File(archive)), size
@@ -0,0 +1,209 @@
+"""
+Tenant sharding for the OrgSchool application
+Each Admin (tenant) keeps its School/SClass/Student/Teacher (and archive) rows on one database
+alias from settings.TENANT_SHARDS. Admins, sessions and the TenantShard mapping
+table stay on ``default``; everything else is routed through the tenant context.
+"""
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# Models whose rows live on the tenant's shard (label_lower)
+TENANT_MODELS = {
+    'schools.school',
+    'schools.sclass',
+    'schools.student',
+    'schools.teacher',
+    'schools.archivedstudent',
+    'schools.archivedteacher',
+    'schools.tombstone',
+    'schools.attendance',
+}
+
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def is_tenant_model(model):
+    """
+    True for tenant model classes and instances (including lazy request users).
+    """
+    return model._meta.label_lower in TENANT_MODELS
+
+
+def shard_cache_key(admin_id):
+    return f'tenant-shard:{admin_id}'
+
+
+def choose_shard(admin_id):
+    """
+    Pick the shard for a new tenant from its UUID.
+    """
+    shards = settings.TENANT_SHARDS
+    return shards[admin_id.int % len(shards)]
+
+
+def shard_for(admin_id):
+    """
+    Return the database alias holding ``admin_id``'s data.
+    Tenants without a mapping row predate sharding and live on ``default``.
+    The alias is cached for TENANT_SHARD_CACHE_TIMEOUT seconds (0 to turn it off).
+    """
+    # Without other shards every tenant is on default (move_tenant only moves to TENANT_SHARDS)
+    if admin_id is None or settings.TENANT_SHARDS == [DEFAULT_DB_ALIAS]:
+        return DEFAULT_DB_ALIAS
+    timeout = settings.TENANT_SHARD_CACHE_TIMEOUT
+    key = shard_cache_key(admin_id)
+    alias = cache.get(key) if timeout else None
+    if alias is None:
+        from .models import TenantShard
+        alias = (
+            TenantShard.objects.filter(admin_id=admin_id).values_list('alias', flat=True).first()
+            or DEFAULT_DB_ALIAS
+        )
+        if timeout:
+            cache.set(key, alias, timeout)
+    return alias
+
+
+def assign_shard(admin):
+    """
+    Record the shard for a newly registered admin and return its alias.
+    An existing mapping is kept.
+    """
+    from .models import TenantShard
+    mapping, _ = TenantShard.objects.get_or_create(
+        admin_id=admin.pk, defaults={'alias': choose_shard(admin.pk)}
+    )
+    if settings.TENANT_SHARD_CACHE_TIMEOUT:
+        cache.set(shard_cache_key(admin.pk), mapping.alias, settings.TENANT_SHARD_CACHE_TIMEOUT)
+    return mapping.alias
+
+
+def set_shard(admin_id, alias):
+    """
+    Point ``admin_id`` at ``alias`` (used once a tenant has been moved).
+    """
+    from .models import TenantShard
+    TenantShard.objects.update_or_create(admin_id=admin_id, defaults={'alias': alias})
+    cache.delete(shard_cache_key(admin_id))
+
+
+def current_shard():
+    return _current_shard.get()
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Route tenant models to ``alias`` for the duration of the block.
+    """
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def use_tenant(admin_id):
+    """
+    Route tenant models to ``admin_id``'s shard for the duration of the block.
+    """
+    return use_shard(shard_for(admin_id))
+
+
+def tenant_graph(admin_id, using):
+    """
+    Return ``[(model, queryset)]`` for every row of a tenant on ``using``,
+    in dependency order (parents before children).
+    """
+    from .models import ArchivedStudent, ArchivedTeacher, Attendance, School, SClass, Student, Teacher, Tombstone
+    return [
+        (School, School.objects.using(using).filter(admin_id=admin_id)),
+        (SClass, SClass.objects.using(using).filter(school__admin_id=admin_id)),
+        (Student, Student.objects.using(using).filter(admin_id=admin_id)),
+        (Teacher, Teacher.objects.using(using).filter(admin_id=admin_id)),
+        (ArchivedStudent, ArchivedStudent.objects.using(using).filter(admin_id=admin_id)),
+        (ArchivedTeacher, ArchivedTeacher.objects.using(using).filter(admin_id=admin_id)),
+        (Tombstone, Tombstone.objects.using(using).filter(admin_id=admin_id)),
+        (Attendance, Attendance.objects.using(using).filter(sclass__school__admin_id=admin_id)),
+    ]
+
+
+def timestamp_fields(model):
+    """
+    Names of the auto_now/auto_now_add fields of ``model``.
+    """
+    return [
+        field.name for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+
+
+def copy_batch(model, objs, using):
+    """
+    Insert ``objs`` on ``using`` with their original primary keys and timestamps.
+    bulk_create runs auto_now/auto_now_add, so the timestamps are written back afterwards.
+    """
+    fields = timestamp_fields(model)
+    timestamps = [tuple(getattr(obj, name) for name in fields) for obj in objs]
+    model.objects.using(using).bulk_create(objs)
+    if not fields:
+        return
+    for obj, values in zip(objs, timestamps):
+        for name, value in zip(fields, values):
+            setattr(obj, name, value)
+    model.objects.using(using).bulk_update(objs, fields)
+
+
+def queryset_digest(queryset, chunk_size=2000):
+    """
+    Return ``(row count, sha1)`` over every concrete column, in primary key order.
+    """
+    fields = [field.attname for field in queryset.model._meta.concrete_fields]
+    digest = hashlib.sha1()
+    count = 0
+    for row in queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size):
+        digest.update(repr(row).encode())
+        count += 1
+    return count, digest.hexdigest()
+
+
+class TenantShardRouter:
+    """
+    Database router sending tenant models to the current tenant's shard.
+    Instance hints win over the context so related lookups stay on the
+    database the parent row came from.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if not is_tenant_model(model):
+            # The admin of a shard row (school.admin) is on default, not on the row's database
+            if instance is not None and is_tenant_model(instance):
+                return DEFAULT_DB_ALIAS
+            return None
+        if instance is not None:
+            if is_tenant_model(instance) and instance._state.db:
+                return instance._state.db
+            if instance._meta.label_lower == settings.AUTH_USER_MODEL.lower():
+                return shard_for(instance.pk)
+        return current_shard() or DEFAULT_DB_ALIAS
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Tenant rows reference their Admin across databases (no FK constraint)
+        if not (is_tenant_model(obj1) and is_tenant_model(obj2)):
+            return True
+        return obj1._state.db == obj2._state.db
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        if model_name is None:
+            return False
+        return f'{app_label}.{model_name}' in TENANT_MODELS
@@ -0,0 +1,141 @@
+"""
+Signal handlers for the OrgSchool application
+"""
+from django.contrib.auth.signals import user_logged_out
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_migrate
+from django.dispatch import receiver
+
+from .models import Admin, ArchivedStudent, Attendance, School, SClass, Student, Tombstone
+from .sharding import shard_for, tenant_graph
+from .sync import SYNCED_MODELS, suppress_tombstones, tombstones_suppressed
+
+
+@receiver(pre_migrate)
+def relax_shard_foreign_keys(sender, using, **kwargs):
+    """
+    Shards have no admin table. On MySQL, 0001_initial's admin foreign keys
+    (dropped again by 0009) can only be created there with foreign key checks
+    off, for the rest of this migrate run.
+    """
+    connection = connections[using]
+    if using != DEFAULT_DB_ALIAS and connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET foreign_key_checks = 0')
+
+
+@receiver(pre_delete, sender=Admin)
+def delete_sharded_tenant(sender, instance, using, **kwargs):
+    """
+    Cascade an Admin delete to its rows on another shard.
+    The ORM only cascades within the database the Admin is deleted from.
+    """
+    alias = shard_for(instance.pk)
+    if alias == using or alias == DEFAULT_DB_ALIAS:
+        # Clear the tenant's attendance in one query, delete_student_attendance skips admin deletes
+        Attendance.objects.using(using).filter(sclass__school__admin_id=instance.pk).delete()
+        return
+    with suppress_tombstones():
+        for model, queryset in reversed(tenant_graph(instance.pk, alias)):
+            queryset.delete()
+
+
+@receiver(pre_delete, sender=Student)
+def delete_student_attendance(sender, instance, using, origin=None, **kwargs):
+    """
+    Attendance has no database constraint to cascade from students: delete a
+    student's attendance with them, unless they were just archived, whose
+    attendance is kept as history.
+    """
+    if isinstance(origin, Admin):
+        return
+    archived = ArchivedStudent.objects.using(using).filter(pk=instance.pk).values('pk')
+    Attendance.objects.using(using).filter(student_id=instance.pk).exclude(student_id__in=archived).delete()
+
+
+@receiver(post_save, sender=Admin)
+@receiver(post_delete, sender=Admin)
+def invalidate_cached_admin(sender, instance, **kwargs):
+    """
+    Drop the cached copy the auth backend serves to requests, e.g. after a
+    profile edit, a password change or last_login being set at login.
+    """
+    # Imported on first use: the backend and its hashing pool stay off startup
+    from orgschool.backends import invalidate_user
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_admin(sender, request, user, **kwargs):
+    if user is not None:
+        from orgschool.backends import invalidate_user
+        invalidate_user(user.pk)
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def invalidate_tenant_schools(sender, instance, **kwargs):
+    """
+    Drop the cached school list of the school's admin (request.tenant).
+    """
+    from .tenancy import invalidate_schools  # Imported on first use to keep it off startup
+    invalidate_schools(instance.admin_id)
+
+
+def owner_id(sender, instance, using):
+    """
+    The admin owning a class, student or teacher; None for a class whose school is gone.
+    """
+    if sender is not SClass:
+        return instance.admin_id
+    if SClass.school.is_cached(instance):
+        return instance.school.admin_id
+    return School.objects.using(using).filter(pk=instance.school_id).values_list('admin_id', flat=True).first()
+
+
+def record_tombstone(sender, instance, using, origin=None, **kwargs):
+    """
+    Leave a tombstone for the sync feed when a class, student or teacher is deleted.
+    """
+    if tombstones_suppressed() or isinstance(origin, Admin):
+        return
+    admin_id = owner_id(sender, instance, using)
+    if admin_id is None:
+        return
+    Tombstone.objects.using(using).create(
+        admin_id=admin_id,
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+def publish_saved(sender, instance, using, raw=False, **kwargs):
+    """
+    Stream the change to the owner's open event streams after commit.
+    """
+    admin_id = None if raw else owner_id(sender, instance, using)
+    if admin_id is not None:
+        from .events import change_event, publish_on_commit  # Imported on first use to keep it off startup
+        publish_on_commit(admin_id, change_event(sender._meta.model_name, instance, 'saved'), using)
+
+
+def publish_deleted(sender, instance, using, origin=None, **kwargs):
+    """
+    Stream the delete after commit. Members removed with their class or
+    school are left out: the class event covers them.
+    """
+    if tombstones_suppressed() or isinstance(origin, Admin):
+        return
+    if sender is not SClass and isinstance(origin, (School, SClass)):
+        return
+    admin_id = owner_id(sender, instance, using)
+    if admin_id is not None:
+        from .events import change_event, publish_on_commit
+        publish_on_commit(admin_id, change_event(sender._meta.model_name, instance, 'deleted'), using)
+
+
+for synced_model in SYNCED_MODELS.values():
+    label = synced_model._meta.label_lower
+    post_delete.connect(record_tombstone, sender=synced_model, dispatch_uid=f'tombstone-{label}')
+    post_save.connect(publish_saved, sender=synced_model, dispatch_uid=f'events-saved-{label}')
+    post_delete.connect(publish_deleted, sender=synced_model, dispatch_uid=f'events-deleted-{label}')
@@ -0,0 +1,186 @@
+"""
+Tenant snapshots for the OrgSchool application
+Dumps one admin's schools, classes, students, teachers and their history
+to a gzipped JSON-lines stream and restores it, optionally under new ids.
+Both directions stream in batches, so memory does not grow with the tenant.
+
+Layout: a header line, then for each model of tenant_graph a line naming the
+model and its columns followed by one JSON array per row, then a trailer
+with the row counts so truncated files are rejected.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from .sharding import copy_batch, tenant_graph
+from .tenancy import invalidate_schools
+
+FORMAT = 'orgschool-tenant'
+VERSION = 1
+
+# Admin columns kept in the header, to recreate the account on another install
+ADMIN_FIELDS = ['id', 'email', 'username', 'school_name', 'password', 'first_name', 'last_name', 'date_joined']
+
+
+class SnapshotError(Exception):
+    """
+    The file is not a tenant snapshot this version can load, or is incomplete.
+    """
+
+
+def encode(value):
+    """
+    JSON for the column types of the tenant models.
+    """
+    if isinstance(value, uuid.UUID):
+        return value.hex
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot encode {type(value).__name__}')
+
+
+def write_line(out, data):
+    out.write(json.dumps(data, default=encode, separators=(',', ':')).encode())
+    out.write(b'\n')
+
+
+def dump_tenant(admin, using, out, batch_size=2000):
+    """
+    Write ``admin``'s rows on ``using`` to the binary file ``out``, read in
+    one transaction so the tables agree with each other.
+    Returns ``{model label: rows}``.
+    """
+    counts = {}
+    with transaction.atomic(using=using), gzip.GzipFile(fileobj=out, mode='wb') as stream:
+        write_line(stream, {
+            'format': FORMAT,
+            'version': VERSION,
+            'dumped_at': timezone.now(),
+            'admin': {name: getattr(admin, name) for name in ADMIN_FIELDS},
+        })
+        for model, queryset in tenant_graph(admin.pk, using):
+            columns = [field.attname for field in model._meta.concrete_fields]
+            write_line(stream, {'model': model._meta.label_lower, 'columns': columns})
+            rows = 0
+            for row in queryset.order_by('pk').values_list(*columns).iterator(chunk_size=batch_size):
+                write_line(stream, row)
+                rows += 1
+            counts[model._meta.label_lower] = rows
+        write_line(stream, {'end': True, 'counts': counts})
+    return counts
+
+
+def read_snapshot(inp):
+    """
+    Iterate over the decoded lines of a snapshot, header first.
+    """
+    with gzip.GzipFile(fileobj=inp, mode='rb') as stream:
+        try:
+            for line in stream:
+                yield json.loads(line)
+        except (OSError, EOFError, ValueError) as exc:
+            raise SnapshotError(f'Unreadable snapshot: {exc}')
+
+
+def check_header(header):
+    """
+    Raise SnapshotError unless ``header`` starts a snapshot this version can load.
+    """
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise SnapshotError('Not a tenant snapshot')
+    if header.get('version') != VERSION:
+        raise SnapshotError(f"Snapshot version {header.get('version')} is not supported (expected {VERSION})")
+    return header
+
+
+def read_header(inp):
+    """
+    The header of a snapshot: format, version, dump time and the admin.
+    """
+    return check_header(next(read_snapshot(inp), None))
+
+
+def id_remapper():
+    """
+    A function giving every UUID a new one, the same each time it is asked,
+    without keeping a table: the first 64 bits (the creation time of
+    time-ordered ids) are kept and the rest hashed with a fresh salt.
+    """
+    salt = os.urandom(16)
+
+    def remap(value):
+        digest = hashlib.blake2b(value.bytes, key=salt, digest_size=8).digest()
+        # Keep the RFC 4122 variant bits
+        low = int.from_bytes(digest, 'big') & (1 << 62) - 1 | 0b10 << 62
+        return uuid.UUID(int=value.int >> 64 << 64 | low)
+    return remap
+
+
+def load_tenant(inp, admin, using, batch_size=1000, remap_ids=False, progress=None):
+    """
+    Restore the snapshot in the binary file ``inp`` for ``admin`` on ``using``:
+    rows are created in dependency order, ``batch_size`` rows per INSERT and
+    transaction. Every row is owned by ``admin`` whatever admin was dumped.
+    With ``remap_ids`` every id gets a new value (references follow), so the
+    same snapshot can be loaded next to the original.
+    ``progress(model label, rows)`` is called after each batch.
+    Returns ``{model label: rows}``.
+    """
+    models = {model._meta.label_lower: model for model, _ in tenant_graph(admin.pk, using)}
+    remap = id_remapper() if remap_ids else None
+    lines = read_snapshot(inp)
+    check_header(next(lines, None))
+
+    counts = {}
+    model = fields = None
+    batch = []
+
+    def flush():
+        with transaction.atomic(using=using):
+            copy_batch(model, batch, using)
+        counts[model._meta.label_lower] += len(batch)
+        if progress:
+            progress(model._meta.label_lower, counts[model._meta.label_lower])
+        batch.clear()
+
+    for line in lines:
+        if isinstance(line, list):
+            if model is None:
+                raise SnapshotError('Row before any model line')
+            values = {}
+            for field, value in zip(fields, line):
+                value = field.to_python(value)
+                if field.attname == 'admin_id':
+                    value = admin.pk
+                elif remap and isinstance(value, uuid.UUID):
+                    value = remap(value)
+                values[field.attname] = value
+            batch.append(model(**values))
+            if len(batch) == batch_size:
+                flush()
+        elif 'model' in line:
+            if batch:
+                flush()
+            model = models.get(line['model'])
+            if model is None:
+                raise SnapshotError(f"Unknown model {line['model']}")
+            by_column = {field.attname: field for field in model._meta.concrete_fields}
+            missing = [column for column in line['columns'] if column not in by_column]
+            if missing:
+                raise SnapshotError(f"{line['model']} has no columns {', '.join(missing)}; migrate first")
+            fields = [by_column[column] for column in line['columns']]
+            counts[line['model']] = 0
+        elif line.get('end'):
+            if batch:
+                flush()
+            if line['counts'] != counts:
+                raise SnapshotError(f"Row counts {counts} do not match the snapshot's {line['counts']}")
+            invalidate_schools(admin.pk)
+            return counts
+    raise SnapshotError('Snapshot is truncated')
@@ -0,0 +1,75 @@
+"""
+Background job handlers for the OrgSchool application
+See schools.jobs for the queue and `manage.py run_workers` for the workers.
+"""
+from django import forms
+
+from .archive import ARCHIVES, archive_departed, departed
+from .jobs import job
+from .models import Admin, SClass
+from .sharding import shard_for
+
+
+class ArchiveParams(forms.Form):
+    batch_size = forms.IntegerField(min_value=1, required=False)
+
+
+@job('archive_departed', public=True, params=ArchiveParams)
+def archive_departed_job(context, batch_size=500):
+    """
+    Move the job admin's departed students and teachers into the archive tables.
+    """
+    using = shard_for(context.job.admin_id)
+    querysets = [
+        (model, departed(model, using).filter(admin_id=context.job.admin_id))
+        for model in ARCHIVES
+    ]
+    total = sum(queryset.count() for _, queryset in querysets)
+    moved = {}
+    done = 0
+    for model, queryset in querysets:
+        moved[model.__name__] = 0
+        for count in archive_departed(model, queryset, batch_size):
+            context.progress(done + count, total, f'Archiving {model.__name__} rows')
+            moved[model.__name__] = count
+        done += moved[model.__name__]
+    return moved
+
+
+@job('delete_admin')
+def delete_admin_job(context):
+    """
+    Delete an admin with everything they own, outside the web request.
+    """
+    admin = Admin.objects.get(pk=context.job.admin_id)
+    context.progress(0, 1, f'Deleting {admin}')
+    deleted, by_model = admin.delete()
+    return {'deleted': deleted, 'rows': by_model}
+
+
+class ClassReportsParams(forms.Form):
+    school = forms.UUIDField(required=False)
+
+    def clean_school(self):
+        school = self.cleaned_data['school']
+        return None if school is None else str(school)  # Stored in the JSON payload
+
+
+@job('class_reports', public=True, params=ClassReportsParams)
+def class_reports_job(context, school=None):
+    """
+    Render a printable roster for every class of the job admin (or of one of
+    their schools) and bundle them into a ZIP archive in the default storage.
+    """
+    # Imported on first use: the report pool (multiprocessing) stays off startup
+    from .reports import build_report_archive
+    using = shard_for(context.job.admin_id)
+    sclasses = SClass.objects.using(using).filter(school__admin_id=context.job.admin_id)
+    if school is not None:
+        sclasses = sclasses.filter(school_id=school)
+    classes = list(sclasses.order_by('name', 'id').values_list('pk', 'name'))
+    context.progress(0, len(classes), 'Rendering class reports')
+    name, size = build_report_archive(
+        classes, using, f'reports/{context.job.pk}.zip', progress=context.progress,
+    )
+    return {'file': name, 'classes': len(classes), 'bytes': size}
@@ -0,0 +1,26 @@
+"""
+Template tags for the OrgSchool static asset bundles
+"""
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+TAGS = {
+    'css': '<link rel="stylesheet" href="{}">',
+    'js': '<script src="{}"></script>',
+}
+
+
+@register.simple_tag
+def asset_bundle(kind):
+    """
+    Render the tags for an ASSET_BUNDLES entry: the built bundle when
+    USE_ASSET_BUNDLES is on, otherwise every source file individually.
+    """
+    bundle = settings.ASSET_BUNDLES[kind]
+    if settings.USE_ASSET_BUNDLES:
+        return format_html(TAGS[kind], static(bundle['output']))
+    return format_html_join('\n    ', TAGS[kind], ((static(name),) for name in bundle['sources']))
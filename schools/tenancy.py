@@ -0,0 +1,57 @@
+"""
+Request-scoped tenant context for the OrgSchool application
+TenantShardMiddleware attaches a Tenant as ``request.tenant``. It resolves the
+logged-in admin's schools once per request, and with a shared cache
+(TENANT_SCHOOLS_CACHE_TIMEOUT) across requests, so views, forms and viewsets
+filter on ``school_id`` instead of joining through ``school__admin``. Saving
+or deleting a School drops the cached entry (see schools.signals).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+
+def schools_cache_key(admin_id):
+    return f'tenant-schools:{admin_id}'
+
+
+def invalidate_schools(admin_id):
+    cache.delete(schools_cache_key(admin_id))
+
+
+class Tenant:
+    """
+    The current admin and their schools, on the shard ``using``.
+    """
+    def __init__(self, admin_id, using):
+        self.admin_id = admin_id
+        self.using = using
+
+    @cached_property
+    def schools(self):
+        """
+        The admin's schools, oldest first, with only ``id`` and ``name`` loaded.
+        """
+        from .models import School
+        timeout = settings.TENANT_SCHOOLS_CACHE_TIMEOUT
+        key = schools_cache_key(self.admin_id)
+        rows = cache.get(key) if timeout else None
+        if rows is None:
+            rows = list(
+                School.objects.using(self.using).filter(admin_id=self.admin_id)
+                .order_by('created_at').values_list('id', 'name')
+            )
+            if timeout:
+                cache.set(key, rows, timeout)
+        return [School.from_db(self.using, ['id', 'name', 'admin_id'], (pk, name, self.admin_id)) for pk, name in rows]
+
+    @cached_property
+    def school_ids(self):
+        return [school.pk for school in self.schools]
+
+    @property
+    def school(self):
+        """
+        The admin's first school, or None before one is created.
+        """
+        return self.schools[0] if self.schools else None
@@ -1,3 +1,557 @@
-from django.test import TestCase
+import random
+import tempfile
+import uuid
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from orgschool.backends import ModelBackend, user_cache_key
+from schools import sync
+from schools.archive import archive_departed, archive_member, departed
+from schools.attendance import mark_class
+from schools.events import LocalBroadcaster
+from schools.balancing import balance, balance_python, get_numpy
+from schools.jobs import JOB_HANDLERS, JobCancelled, JobContext, claim_jobs, enqueue, run_job
+from schools.models import Admin, ArchivedStudent, Attendance, Job, School, SClass, Student, Teacher, TenantShard, Tombstone
+from schools.promotion import promote_students
+from schools.sharding import copy_batch, queryset_digest, set_shard, shard_for, tenant_graph, use_tenant
+from schools.sync import InvalidSyncToken, changes_since, make_token, sources
+
+# A shard besides the default database, for the multi-database tests
+SHARD = next((alias for alias in settings.TENANT_SHARDS if alias != DEFAULT_DB_ALIAS), None)
+
+
+def create_admin(email):
+    return Admin.objects.create_user(username=email, email=email, password='pw', school_name='Test School')
+
+
+def create_tenant(admin, students=6):
+    """
+    A school with two classes, ``students`` students and a teacher, on the current shard.
+    """
+    school = School.objects.create(name='Test School', admin=admin)
+    classes = [SClass.objects.create(name=f'Class 0{i}', school=school) for i in (1, 2)]
+    Student.objects.bulk_create([
+        Student(name=f'Student {i:02d}', age=6 + i % 3, sclass=classes[i % 2], admin=admin)
+        for i in range(students)
+    ])
+    Teacher.objects.create(name='Teacher', sclass=classes[0], admin=admin)
+    return school, classes
+
+
+@skipUnless(SHARD, 'TENANT_SHARDS lists no shard besides default')
+class ShardingTests(TestCase):
+    """
+    Tenant rows on a shard, their admin on the default database.
+    """
+    databases = {DEFAULT_DB_ALIAS, SHARD} if SHARD else {DEFAULT_DB_ALIAS}
+
+    def test_tenant_rows_go_to_the_shard(self):
+        admin = create_admin('sharded@example.com')
+        set_shard(admin.pk, SHARD)
+        with use_tenant(admin.pk):
+            school, classes = create_tenant(admin)
+        self.assertEqual(school._state.db, SHARD)
+        self.assertFalse(School.objects.using(DEFAULT_DB_ALIAS).filter(admin_id=admin.pk).exists())
+        self.assertEqual(Student.objects.using(SHARD).filter(admin_id=admin.pk).count(), 6)
+        # Related lookups from the admin and from shard rows stay on the shard
+        self.assertEqual(list(admin.schools.all()), [school])
+        self.assertEqual(classes[0].students.count(), 3)
+
+    def test_admin_of_a_shard_row(self):
+        admin = create_admin('owner@example.com')
+        set_shard(admin.pk, SHARD)
+        with use_tenant(admin.pk):
+            create_tenant(admin)
+        school = School.objects.using(SHARD).get(admin_id=admin.pk)
+        # The foreign key has no constraint, the admin is read from default
+        self.assertEqual(school.admin, admin)
+        self.assertEqual(school.admin._state.db, DEFAULT_DB_ALIAS)
+
+    def test_shard_change_from_another_process(self):
+        admin = create_admin('elsewhere@example.com')
+        set_shard(admin.pk, SHARD)
+        self.assertEqual(shard_for(admin.pk), SHARD)
+        # As move_tenant in another process: the mapping changes, this process's cache is not cleared
+        TenantShard.objects.filter(admin_id=admin.pk).update(alias=DEFAULT_DB_ALIAS)
+        self.assertEqual(shard_for(admin.pk), DEFAULT_DB_ALIAS)
+
+    def test_move_tenant(self):
+        admin = create_admin('mover@example.com')
+        create_tenant(admin)
+        before = [queryset_digest(queryset) for _, queryset in tenant_graph(admin.pk, DEFAULT_DB_ALIAS)]
+        call_command('move_tenant', admin.email, SHARD, stdout=StringIO())
+        self.assertEqual(shard_for(admin.pk), SHARD)
+        self.assertEqual([queryset_digest(queryset) for _, queryset in tenant_graph(admin.pk, SHARD)], before)
+        self.assertFalse(School.objects.using(DEFAULT_DB_ALIAS).filter(admin_id=admin.pk).exists())
+
+    def test_move_tenant_stops_on_a_bad_copy(self):
+        admin = create_admin('partial@example.com')
+        create_tenant(admin)
+
+        def copy_all_but_one(model, objs, using):
+            copy_batch(model, objs[:-1] if model is Student else objs, using)
+
+        with mock.patch('schools.management.commands.move_tenant.copy_batch', copy_all_but_one):
+            with self.assertRaisesMessage(CommandError, 'tenant not switched'):
+                call_command('move_tenant', admin.email, SHARD, stdout=StringIO())
+        self.assertEqual(shard_for(admin.pk), DEFAULT_DB_ALIAS)
+        self.assertEqual(Student.objects.using(DEFAULT_DB_ALIAS).filter(admin_id=admin.pk).count(), 6)
+
+
+def random_classes(rng):
+    """
+    Non-overlapping age bands, some shared by several classes, with current
+    class sizes, some already at or past the target.
+    """
+    lows, highs = [], []
+    low = rng.randint(0, 4)
+    for _ in range(rng.randint(1, 5)):
+        high = low + rng.randint(0, 4)
+        for _ in range(rng.randint(1, 3)):
+            lows.append(low)
+            highs.append(high)
+        low = high + rng.randint(1, 3)
+    counts = [rng.randint(0, 12) for _ in lows]
+    return lows, highs, counts
+
+
+@skipUnless(get_numpy(), 'numpy is not installed')
+class BalanceTests(SimpleTestCase):
+    """
+    The numpy and pure Python assignments agree.
+    """
+
+    def test_matches_pure_python(self):
+        rng = random.Random(44)
+        for case in range(500):
+            lows, highs, counts = random_classes(rng)
+            # Ages inside, between and outside the bands
+            ages = [rng.randint(0, max(highs) + 3) for _ in range(rng.randint(0, 60))]
+            target_size = rng.randint(1, 15)
+            with self.subTest(case=case):
+                expected = balance_python(ages, lows, highs, counts, target_size)
+                self.assertEqual(balance(ages, lows, highs, counts, target_size), expected)
+
+    def test_no_classes(self):
+        self.assertEqual(balance([7, 8], [], [], [], 30), balance_python([7, 8], [], [], [], 30))
+
+
+class MarkClassTests(TestCase):
+    """
+    Marking a class writes one row per current student and day, and marking
+    the same day again replaces the statuses.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin('attendance@example.com')
+        _, classes = create_tenant(cls.admin)
+        cls.sclass = classes[0]
+        cls.students = list(cls.sclass.students.order_by('name'))
+
+    def statuses(self, date):
+        return dict(Attendance.objects.filter(sclass=self.sclass, date=date).values_list('student_id', 'status'))
+
+    def test_mark_and_remark(self):
+        today = timezone.localdate()
+        counts = mark_class(self.sclass, today)
+        self.assertEqual(counts, {'present': 3, 'absent': 0, 'late': 0, 'excused': 0})
+        self.assertEqual(self.statuses(today), {student.pk: Attendance.PRESENT for student in self.students})
+
+        late = self.students[0]
+        counts = mark_class(self.sclass, today, Attendance.ABSENT, {late.pk: Attendance.LATE})
+        self.assertEqual(counts, {'present': 0, 'absent': 2, 'late': 1, 'excused': 0})
+        expected = {student.pk: Attendance.ABSENT for student in self.students[1:]}
+        self.assertEqual(self.statuses(today), {late.pk: Attendance.LATE, **expected})
+
+    def test_departed_students_are_not_marked(self):
+        today = timezone.localdate()
+        departed = self.students[-1]
+        Student.objects.filter(pk=departed.pk).update(left_at=timezone.now())
+        mark_class(self.sclass, today)
+        self.assertNotIn(departed.pk, self.statuses(today))
+        self.assertEqual(len(self.statuses(today)), 2)
+
+    def test_deleting_a_student_deletes_their_attendance(self):
+        today = timezone.localdate()
+        mark_class(self.sclass, today)
+        removed, kept = self.students[0], self.students[1]
+        removed_pk = removed.pk
+        removed.delete()
+        self.assertFalse(Attendance.objects.filter(student_id=removed_pk).exists())
+        self.assertIn(kept.pk, self.statuses(today))
+
+    def test_archived_students_keep_their_attendance(self):
+        today = timezone.localdate()
+        mark_class(self.sclass, today)
+        archived = self.students[0]
+        archive_member(archived)
+        self.assertEqual(self.statuses(today)[archived.pk], Attendance.PRESENT)
+
+
+class SnapshotTests(TestCase):
+    """
+    dump_tenant and load_tenant round-trip a tenant; --remap-ids loads a copy
+    next to the original with its references intact.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin('snapshot@example.com')
+        cls.school, classes = create_tenant(cls.admin)
+        mark_class(classes[0], timezone.localdate())
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'tenant.jsonl.gz')
+        call_command('dump_tenant', self.admin.email, output=self.path, stderr=StringIO())
+
+    def test_load_copy_with_new_ids(self):
+        originals = {
+            model: set(queryset.values_list('pk', flat=True))
+            for model, queryset in tenant_graph(self.admin.pk, DEFAULT_DB_ALIAS)
+        }
+        call_command('load_tenant', self.path, remap_ids=True, stdout=StringIO())
+
+        copy = School.objects.exclude(pk=self.school.pk).get(admin=self.admin)
+        self.assertEqual(copy.name, self.school.name)
+        for model in (School, SClass, Student, Teacher):
+            with self.subTest(model=model.__name__):
+                pks = set(model.objects.values_list('pk', flat=True))
+                self.assertEqual(len(pks), 2 * len(originals[model]))
+                self.assertTrue(originals[model] <= pks)
+        # The copied rows point at the copied classes, not at the originals
+        classes = set(SClass.objects.filter(school=copy).values_list('pk', flat=True))
+        copied = Student.objects.exclude(pk__in=originals[Student])
+        self.assertEqual(set(copied.values_list('sclass_id', flat=True)), classes)
+        self.assertEqual(
+            sorted(copied.values_list('name', 'age', 'sclass__name')),
+            sorted(Student.objects.filter(pk__in=originals[Student]).values_list('name', 'age', 'sclass__name')),
+        )
+        marks = Attendance.objects.filter(sclass__school=copy)
+        self.assertEqual(marks.count(), 3)
+        self.assertEqual(
+            set(marks.values_list('student_id', flat=True)),
+            set(copied.filter(sclass__name='Class 01').values_list('pk', flat=True)),
+        )
+
+    def test_load_over_existing_rows_needs_remap(self):
+        with self.assertRaisesMessage(CommandError, 'use --remap-ids'):
+            call_command('load_tenant', self.path, stdout=StringIO())
+        self.assertEqual(School.objects.filter(admin=self.admin).count(), 1)
+
+
+class SyncTests(TestCase):
+    """
+    The delta-sync feed pages through rows sharing a timestamp without gaps,
+    reports deletes as tombstones once they settle, and refuses tokens past
+    the tombstone retention.
+    """
+    databases = set(settings.TENANT_SHARDS) | {DEFAULT_DB_ALIAS}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin('sync@example.com')
+        create_tenant(cls.admin)
+        # One bulk change: every row shares its updated_at
+        cls.changed = timezone.now() - timedelta(minutes=1)
+        for _, queryset, _ in sources(cls.admin.pk)[:3]:
+            queryset.model.objects.filter(pk__in=queryset.values('pk')).update(updated_at=cls.changed)
+
+    def sync_all(self, token=None, limit=2):
+        """
+        Follow the feed page by page; return the ``(kind, id)`` rows and the last token.
+        """
+        rows = []
+        while True:
+            page, token, has_more = changes_since(self.admin.pk, token, limit)
+            self.assertLessEqual(len(page), limit)
+            rows += [(kind, obj.pk) for kind, obj in page]
+            if not has_more:
+                return rows, token
+
+    def later(self, seconds):
+        return mock.patch.object(sync, 'timezone', mock.Mock(now=lambda: timezone.now() + timedelta(seconds=seconds)))
+
+    def test_pages_through_a_shared_timestamp(self):
+        rows, token = self.sync_all()
+        # 2 classes, 6 students and a teacher, each once, in (kind, id) order
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows, sorted(set(rows), key=lambda row: (row[0], str(row[1]))))
+        self.assertEqual(changes_since(self.admin.pk, token)[0], [])
+
+    def test_delete_shows_up_as_a_tombstone(self):
+        _, token = self.sync_all()
+        student = Student.objects.filter(admin=self.admin).first()
+        deleted = student.pk
+        student.delete()
+        # Inside the settle window the delete waits for the next sync
+        self.assertEqual(changes_since(self.admin.pk, token)[0], [])
+        with self.later(settings.SYNC_SETTLE_SECONDS + 1):
+            rows, _, has_more = changes_since(self.admin.pk, token)
+        self.assertFalse(has_more)
+        self.assertEqual([(kind, obj.model, obj.object_id) for kind, obj in rows], [('tombstone', 'student', deleted)])
+
+    def test_prune_tombstones_expires_old_tokens(self):
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+        expired = timezone.now() - retention - timedelta(days=1)
+        Tombstone.objects.create(admin=self.admin, model='student', object_id=uuid.uuid4(), deleted_at=expired)
+        kept = Tombstone.objects.create(admin=self.admin, model='student', object_id=uuid.uuid4())
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.filter(admin=self.admin)), [kept])
+        # A token from before the pruned deletes could miss them: the client has to resync in full
+        with self.assertRaises(InvalidSyncToken):
+            changes_since(self.admin.pk, make_token((expired, 'student', '')))
+
+
+class JobTests(TestCase):
+    """
+    Workers claim due jobs once, failed attempts are retried with backoff,
+    an expired lease lets another worker take over, and a cancelled job
+    stops at its next progress report.
+    """
+
+    def setUp(self):
+        self.calls = []
+        handlers = mock.patch.dict(JOB_HANDLERS, {'test': (self.handle, False, None)})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+        # run_job closes the worker's connections between jobs, which would end the test transaction
+        connections = mock.patch('schools.jobs.close_old_connections')
+        connections.start()
+        self.addCleanup(connections.stop)
+
+    def handle(self, context):
+        self.calls.append(context.job.attempts)
+        return self.outcome(context)
+
+    def outcome(self, context):
+        return {'ok': True}
+
+    def test_due_jobs_are_claimed_once(self):
+        due = [enqueue('test'), enqueue('test')]
+        enqueue('test', run_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(sorted(claim_jobs(10, 'worker-1')), sorted(job.pk for job in due))
+        self.assertEqual(claim_jobs(10, 'worker-2'), [])
+        for job in Job.objects.filter(pk__in=[job.pk for job in due]):
+            self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'worker-1', 1))
+
+    def test_success(self):
+        job = enqueue('test')
+        claim_jobs(1, 'worker-1')
+        self.assertEqual(run_job(job.pk), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.locked_by), (Job.SUCCEEDED, {'ok': True}, 'worker-1'))
+
+    def test_retries_with_backoff_then_fails(self):
+        def fail(context):
+            raise ValueError('boom')
+        self.outcome = fail
+        job = enqueue('test', max_attempts=3)
+        for attempt, delay in ((1, settings.JOB_RETRY_DELAY), (2, settings.JOB_RETRY_DELAY * 2)):
+            self.assertEqual(claim_jobs(1, 'worker-1'), [job.pk])
+            before = timezone.now()
+            self.assertEqual(run_job(job.pk), Job.QUEUED)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.locked_by), (Job.QUEUED, attempt, ''))
+            self.assertIn('boom', job.error)
+            self.assertGreaterEqual(job.run_at, before + timedelta(seconds=delay))
+            self.assertLessEqual(job.run_at, timezone.now() + timedelta(seconds=delay))
+            # Not due before its backoff has passed
+            self.assertEqual(claim_jobs(1, 'worker-1'), [])
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(claim_jobs(1, 'worker-1'), [job.pk])
+        self.assertEqual(run_job(job.pk), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(self.calls, [1, 2, 3])
+
+    def test_expired_lease_is_claimed_again(self):
+        job = enqueue('test')
+        claim_jobs(1, 'worker-1')
+        stale = JobContext(Job.objects.get(pk=job.pk))
+        # Still within the lease: nobody else takes it
+        self.assertEqual(claim_jobs(1, 'worker-2'), [])
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+        )
+        self.assertEqual(claim_jobs(1, 'worker-2'), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.attempts), ('worker-2', 2))
+        # The first worker lost the job and stops at its next progress report
+        with self.assertRaises(JobCancelled):
+            stale.progress(1)
+
+    def test_cancelled_job_stops_at_progress(self):
+        def cancelled_midway(context):
+            context.progress(1, 3)
+            Job.objects.filter(pk=context.job.pk).update(status=Job.CANCELLED)
+            context.progress(2, 3)
+            self.fail('progress() did not stop the cancelled job')
+        self.outcome = cancelled_midway
+        job = enqueue('test')
+        claim_jobs(1, 'worker-1')
+        self.assertEqual(run_job(job.pk), Job.CANCELLED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress_done, job.progress_total), (Job.CANCELLED, 1, 3))
+
+
+@override_settings(AUTH_USER_CACHE_TIMEOUT=300)
+class UserCacheTests(TestCase):
+    """
+    The auth backend's cached admin is dropped when the admin is saved,
+    deactivated or logs out.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = create_admin('cached@example.com')
+        self.backend = ModelBackend()
+
+    def cached(self):
+        return cache.get(user_cache_key(self.admin.pk))
+
+    def test_save_evicts(self):
+        self.backend.get_user(self.admin.pk)
+        self.assertIsNotNone(self.cached())
+        self.admin.first_name = 'Renamed'
+        self.admin.save()
+        self.assertIsNone(self.cached())
+        self.assertEqual(self.backend.get_user(self.admin.pk).first_name, 'Renamed')
+
+    def test_deactivated_admin_is_logged_out(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/api/v1/admins/').status_code, 200)
+        self.assertIsNotNone(self.cached())
+        self.admin.is_active = False
+        self.admin.save()
+        self.assertIsNone(self.cached())
+        self.assertEqual(self.client.get('/api/v1/admins/').status_code, 403)
+
+    def test_logout_evicts(self):
+        self.client.force_login(self.admin)
+        self.backend.get_user(self.admin.pk)
+        self.assertIsNotNone(self.cached())
+        self.client.logout()
+        self.assertIsNone(self.cached())
+
+
+class EventReplayTests(SimpleTestCase):
+    """
+    A reconnecting stream gets the events after its Last-Event-ID while they
+    are buffered, and None (a reset) once some are gone.
+    """
+
+    async def test_replay(self):
+        broadcaster = LocalBroadcaster(buffer_size=3)
+        admin_id = uuid.uuid4()
+        subscription = broadcaster.subscribe(admin_id)
+        for number in range(5):
+            broadcaster.publish(admin_id, {'number': number})
+        self.assertEqual(broadcaster.current(admin_id), 5)
+        self.assertEqual([(await subscription.get())['id'] for _ in range(5)], [1, 2, 3, 4, 5])
+
+        self.assertEqual(broadcaster.replay(admin_id, 5), [])
+        self.assertEqual([event['id'] for event in broadcaster.replay(admin_id, 3)], [4, 5])
+        self.assertEqual([event['number'] for event in broadcaster.replay(admin_id, 2)], [2, 3, 4])
+        # Event 2 has left the buffer
+        self.assertIsNone(broadcaster.replay(admin_id, 1))
+        # An id this broadcaster never handed out, e.g. from before a restart
+        self.assertIsNone(broadcaster.replay(admin_id, 9))
+
+    async def test_replay_after_the_last_stream_left(self):
+        broadcaster = LocalBroadcaster(buffer_size=3)
+        admin_id = uuid.uuid4()
+        broadcaster.unsubscribe(broadcaster.subscribe(admin_id))
+        broadcaster.publish(admin_id, {'number': 0})  # Nobody streams it, it is dropped
+        broadcaster.subscribe(admin_id)
+        # Numbering resumes past the dropped event, so the stream learns it missed one
+        self.assertEqual(broadcaster.current(admin_id), 1)
+        self.assertIsNone(broadcaster.replay(admin_id, 0))
+        broadcaster.publish(admin_id, {'number': 1})
+        self.assertEqual(broadcaster.replay(admin_id, 1), [{'id': 2, 'number': 1}])
+
+
+class PromotionTests(TestCase):
+    """
+    Promotion moves each current student once, in one UPDATE, and bumps
+    updated_at so the sync feed sends the moves.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin('promotion@example.com')
+        cls.school, classes = create_tenant(cls.admin)
+        cls.first, cls.second = classes
+        cls.third = SClass.objects.create(name='Class 03', school=cls.school)
+        cls.earlier = timezone.now() - timedelta(days=1)
+        Student.objects.filter(admin=cls.admin).update(updated_at=cls.earlier)
+
+    def members(self, sclass):
+        return set(Student.objects.filter(sclass=sclass, left_at__isnull=True).values_list('pk', flat=True))
+
+    def test_chain_moves_each_student_once(self):
+        before = {sclass: self.members(sclass) for sclass in (self.first, self.second)}
+        left = Student.objects.filter(sclass=self.first).first()
+        Student.objects.filter(pk=left.pk).update(left_at=self.earlier)
+
+        counts = promote_students(self.school, {self.first.pk: self.second.pk, self.second.pk: self.third.pk})
+        self.assertEqual(counts, {self.first.pk: 2, self.second.pk: 3})
+        self.assertEqual(self.members(self.first), set())
+        self.assertEqual(self.members(self.second), before[self.first] - {left.pk})
+        self.assertEqual(self.members(self.third), before[self.second])
+        # The student who had left stays where they were, untouched
+        left.refresh_from_db()
+        self.assertEqual((left.sclass_id, left.updated_at), (self.first.pk, self.earlier))
+        moved = Student.objects.filter(left_at__isnull=True)
+        self.assertFalse(moved.filter(updated_at__lte=self.earlier).exists())
+
+    def test_leavers_are_marked(self):
+        leaving = self.members(self.second)
+        promote_students(self.school, {self.first.pk: self.second.pk, self.second.pk: None})
+        marked = Student.objects.filter(left_at__isnull=False)
+        self.assertEqual(set(marked.values_list('pk', flat=True)), leaving)
+        self.assertFalse(marked.filter(updated_at__lte=self.earlier).exists())
+        # Students moving into the leaving class are not marked
+        self.assertEqual(len(self.members(self.second)), 3)
+
+    def test_dry_run_only_counts(self):
+        counts = promote_students(self.school, {self.first.pk: self.second.pk}, dry_run=True)
+        self.assertEqual(counts, {self.first.pk: 3})
+        self.assertEqual(len(self.members(self.first)), 3)
+
+
+class ArchiveTests(TestCase):
+    """
+    archive_departed moves every departed row into the archive, one small
+    transaction per batch, and leaves current members alone.
+    """
+
+    def test_moves_departed_rows_in_batches(self):
+        admin = create_admin('archive@example.com')
+        _, classes = create_tenant(admin, students=8)
+        current = Student.objects.filter(admin=admin).order_by('name').first()
+        Student.objects.filter(admin=admin).exclude(pk=current.pk).update(left_at=timezone.now())
+        departed_ids = set(departed(Student, DEFAULT_DB_ALIAS).values_list('pk', flat=True))
+
+        progress = list(archive_departed(Student, departed(Student, DEFAULT_DB_ALIAS), batch_size=3))
+        self.assertEqual(progress, [3, 6, 7])
+        self.assertEqual(list(Student.objects.filter(admin=admin)), [current])
+        archived = ArchivedStudent.objects.filter(admin=admin)
+        self.assertEqual(set(archived.values_list('pk', flat=True)), departed_ids)
+        self.assertEqual(set(archived.values_list('school_name', flat=True)), {'Test School'})
+        self.assertEqual(
+            set(archived.values_list('sclass_name', flat=True)), {sclass.name for sclass in classes},
+        )
@@ -9,9 +9,14 @@ from django.contrib import messages
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from .models import School, SClass, Student, Teacher, Admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from .models import SClass, Student, Teacher, Admin
 from .forms import AdminRegistrationForm, AdminLoginForm, StudentForm, TeacherForm, SClassForm
 
+# Students/teachers shown per page on the class detail page
+CLASS_DETAIL_PAGE_SIZE = 25
+
 
 def about_view(request):
     """
@@ -26,11 +31,8 @@ def home_view(request):
     """
     context = {}
     if request.user.is_authenticated:
-        try:
-            school = School.objects.get(admin=request.user)
-            context['school_name'] = school.name
-        except School.DoesNotExist:
-            context['school_name'] = request.user.school_name
+        school = request.tenant.school
+        context['school_name'] = school.name if school else request.user.school_name
     return render(request, 'schools/index.html', context)
 
 
@@ -60,28 +62,39 @@ class ClassListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         """
-        Get the queryset of classes for the logged-in admin's school.
+        Get the classes of the logged-in admin's schools, with their roster totals.
         """
-        try:
-            school = School.objects.get(admin=self.request.user)
-            return SClass.objects.filter(school=school)
-        except School.DoesNotExist:
-            return SClass.objects.none()
+        return SClass.objects.filter(school_id__in=self.request.tenant.school_ids).with_counts()
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator for a total that is already known (e.g. from an annotation),
+    so paging does not issue its own COUNT query.
+    """
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        return self.known_count
 
 
 @login_required
 def class_detail_view(request, class_id=None, class_name=None):
     """
     Detail view for a specific class.
+    Students and teachers are paginated and can be searched by name. The
+    class row carries both totals, so the page costs three queries whatever
+    the class size: the class, one page of students, one page of teachers.
     """
+    search = request.GET.get('q', '').strip()
+    classes = SClass.objects.filter(school_id__in=request.tenant.school_ids).with_counts(search)
     if class_id:
-        sclass = get_object_or_404(SClass, id=class_id, school__admin=request.user)
+        sclass = get_object_or_404(classes, id=class_id)
     elif class_name:
-        try:
-            school = School.objects.get(admin=request.user)
-            sclass = get_object_or_404(SClass, name=class_name, school=school)
-        except School.DoesNotExist:
-            sclass = None
+        sclass = classes.filter(name=class_name).order_by('created_at').first()
     else:
         sclass = None
     
@@ -89,13 +102,20 @@ def class_detail_view(request, class_id=None, class_name=None):
         messages.error(request, "Class not found or you don't have permission to view it.")
         return redirect('schools:class_list')
     
-    students = Student.objects.filter(sclass=sclass)
-    teachers = Teacher.objects.filter(sclass=sclass)
+    students = Student.objects.filter(sclass=sclass).only('id', 'name', 'age').order_by('name', 'id')
+    teachers = Teacher.objects.filter(sclass=sclass).only('id', 'name').order_by('name', 'id')
+    if search:
+        students = students.filter(name__icontains=search)
+        teachers = teachers.filter(name__icontains=search)
+    
+    student_paginator = CountedPaginator(students, CLASS_DETAIL_PAGE_SIZE, sclass.student_count)
+    teacher_paginator = CountedPaginator(teachers, CLASS_DETAIL_PAGE_SIZE, sclass.teacher_count)
     
     context = {
         'sclass': sclass,
-        'students': students,
-        'teachers': teachers,
+        'search': search,
+        'students': student_paginator.get_page(request.GET.get('student_page')),
+        'teachers': teacher_paginator.get_page(request.GET.get('teacher_page')),
     }
     return render(request, 'schools/class_detail.html', context)
 
@@ -126,10 +146,10 @@ class StudentCreateView(LoginRequiredMixin, CreateView):
     
     def get_form_kwargs(self):
         """
-        Pass the logged-in admin to the form.
+        Pass the logged-in admin's tenant context to the form.
         """
         kwargs = super().get_form_kwargs()
-        kwargs['admin'] = self.request.user
+        kwargs['tenant'] = self.request.tenant
         return kwargs
     
     def form_valid(self, form):
@@ -157,10 +177,10 @@ class StudentUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_form_kwargs(self):
         """
-        Pass the logged-in admin to the form.
+        Pass the logged-in admin's tenant context to the form.
         """
         kwargs = super().get_form_kwargs()
-        kwargs['admin'] = self.request.user
+        kwargs['tenant'] = self.request.tenant
         return kwargs
 
 
@@ -205,10 +225,10 @@ class TeacherCreateView(LoginRequiredMixin, CreateView):
     
     def get_form_kwargs(self):
         """
-        Pass the logged-in admin to the form.
+        Pass the logged-in admin's tenant context to the form.
         """
         kwargs = super().get_form_kwargs()
-        kwargs['admin'] = self.request.user
+        kwargs['tenant'] = self.request.tenant
         return kwargs
     
     def form_valid(self, form):
@@ -236,10 +256,10 @@ class TeacherUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_form_kwargs(self):
         """
-        Pass the logged-in admin to the form.
+        Pass the logged-in admin's tenant context to the form.
         """
         kwargs = super().get_form_kwargs()
-        kwargs['admin'] = self.request.user
+        kwargs['tenant'] = self.request.tenant
         return kwargs
 
 